@@ -0,0 +1,15 @@
+import streamlit as st
+
+from autoop.core.ml.dataset import Dataset
+from autoop.functional.ingestion import profile_table
+
+
+def preview_dataset(dataset: Dataset) -> None:
+    """Show the profile of a dataset's columns, computed when it was
+    registered, or its data if it was not profiled."""
+    profile = profile_table(dataset.metadata)
+    if profile is None:
+        st.write(dataset.read())
+    else:
+        st.write(f"{dataset.metadata['num_rows']} rows")
+        st.dataframe(profile)
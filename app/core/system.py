@@ -1,8 +1,12 @@
 from autoop.core.storage import LocalStorage
 from autoop.core.database import Database
-from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.artifact import Artifact, ArtifactHandle
+from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.formats import get_format
 from autoop.core.storage import Storage
-from typing import List
+from autoop.functional.ingestion import ingest_csv
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
 
 
 class ArtifactRegistry():
@@ -31,6 +35,67 @@ class ArtifactRegistry():
         """
         self._storage.save(artifact.data, artifact.asset_path)
         # save the metadata in the database
+        self._set_entry(artifact)
+
+    def ingest_dataset(self,
+                       source: Any,
+                       name: str,
+                       asset_path: str,
+                       version: str = "1.0.0",
+                       format: str = "columnar",
+                       chunksize: int = 65536) -> ArtifactHandle:
+        """
+        Registers a dataset by streaming a CSV file into storage chunk by
+        chunk, so the file never has to fit in memory.
+
+        Args:
+            source (Any): Path or readable file object of the CSV.
+            name (str): The name of the dataset.
+            asset_path (str): The storage path of the dataset.
+            version (str, optional): The version of the dataset.
+            format (str, optional): The format to store the dataset in.
+            Defaults to "columnar".
+            chunksize (int, optional): Number of rows parsed at a time.
+
+        Returns:
+            ArtifactHandle: A handle to the registered dataset, whose
+            metadata holds its schema and column statistics.
+        """
+        metadata = ingest_csv(source, self._storage, asset_path,
+                              format=format, chunksize=chunksize)
+        dataset = Dataset(name=name, asset_path=asset_path,
+                          version=version, data=None, metadata=metadata)
+        entry = self._set_entry(dataset)
+        return ArtifactHandle(dataset.id, entry, self._loader(entry))
+
+    def save_metadata(self, artifact: Artifact):
+        """
+        Saves the metadata of a registered artifact, such as a schema
+        inferred after registration, leaving its other fields and its
+        data as they are.
+
+        Args:
+            artifact (Artifact): The artifact, with its updated metadata.
+
+        Raises:
+            KeyError: If the artifact is not registered.
+        """
+        entry = self._database.get("artifacts", artifact.id)
+        if entry is None:
+            raise KeyError(f"Artifact {artifact.id} is not registered")
+        self._database.set("artifacts", artifact.id,
+                           {**entry, "metadata": artifact.metadata})
+
+    def _set_entry(self, artifact: Artifact) -> Dict[str, Any]:
+        """
+        Saves the registry entry of an artifact, without its data.
+
+        Args:
+            artifact (Artifact): The artifact.
+
+        Returns:
+            Dict[str, Any]: The saved entry.
+        """
         entry = {
             "name": artifact.name,
             "version": artifact.version,
@@ -40,33 +105,75 @@ class ArtifactRegistry():
             "type": artifact.type,
         }
         self._database.set("artifacts", artifact.id, entry)
+        return entry
 
-    def list(self, type: str = None) -> List[Artifact]:
+    def list_metadata(self, type: str = None) -> List[Dict[str, Any]]:
+        """
+        Lists the metadata of all artifacts without reading their data.
+
+        Args:
+            type (str, optional): Filter artifacts by type. Defaults to None.
+
+        Returns:
+            List[Dict[str, Any]]: The registry entry of each artifact,
+            with its id under the key "id".
+        """
+        return [{"id": id, **data} for id, data in self._entries(type)]
+
+    def list(self, type: str = None) -> List[ArtifactHandle]:
         """
         Lists all artifacts in the registry.
 
+        The data of each artifact is only read from storage when its
+        `data` attribute is first accessed. Columnar datasets are
+        memory-mapped, so reading a few of their columns only touches
+        those columns. The handles pickle without their data.
+
         Args:
             type (str, optional): Filter artifacts by type. Defaults to None.
 
         Returns:
-            List[Artifact]: A list of artifacts in the registry.
-        """
-        entries = self._database.list("artifacts")
-        artifacts = []
-        for id, data in entries:
-            if type is not None and data["type"] != type:
-                continue
-            artifact = Artifact(
-                name=data["name"],
-                version=data["version"],
-                asset_path=data["asset_path"],
-                tags=data["tags"],
-                metadata=data["metadata"],
-                data=self._storage.load(data["asset_path"]),
-                type=data["type"],
-            )
-            artifacts.append(artifact)
-        return artifacts
+            List[ArtifactHandle]: A list of handles to the artifacts in
+            the registry.
+        """
+        return [
+            ArtifactHandle(id, data, self._loader(data))
+            for id, data in self._entries(type)
+        ]
+
+    def _loader(self, entry: Dict[str, Any]) -> Callable[[], Any]:
+        """
+        Builds the function that fetches the data of an artifact. Datasets
+        in formats that decode to views on the payload, like the columnar
+        one, are memory-mapped; other artifacts are loaded whole, since
+        parsing them reads every byte anyway. A memory map cannot be
+        pickled: convert it with bytes() first.
+
+        Args:
+            entry (Dict[str, Any]): The registry entry of the artifact.
+
+        Returns:
+            Callable[[], Any]: The loader of the artifact's data.
+        """
+        if entry["type"] == "dataset":
+            encoding = get_format(entry["metadata"].get("format", "csv"))
+            if encoding is not None and not encoding.cached:
+                return partial(self._storage.map, entry["asset_path"])
+        return partial(self._storage.load, entry["asset_path"])
+
+    def _entries(self, type: str = None) -> List[tuple]:
+        """
+        Reads the registry entries, optionally filtered by type.
+
+        Args:
+            type (str, optional): Filter artifacts by type. Defaults to None.
+
+        Returns:
+            List[tuple]: The id and entry of each artifact.
+        """
+        if type is None:
+            return self._database.list("artifacts")
+        return self._database.query("artifacts", type=type)
 
     def get(self, artifact_id: str) -> Artifact:
         """
@@ -85,10 +192,26 @@ class ArtifactRegistry():
             asset_path=data["asset_path"],
             tags=data["tags"],
             metadata=data["metadata"],
-            data=self._storage.load(data["asset_path"]),
+            data=self._loader(data)(),
             type=data["type"],
         )
 
+    def get_latest(self, name: str) -> Optional[Artifact]:
+        """
+        Retrieves the highest version of an artifact by name.
+
+        Args:
+            name (str): The name of the artifact.
+
+        Returns:
+            Optional[Artifact]: The latest version of the artifact, or None
+            if no artifact has that name.
+        """
+        latest = self._database.latest("artifacts", name)
+        if latest is None:
+            return None
+        return self.get(latest[0])
+
     def delete(self, artifact_id: str):
         """
         Deletes an artifact from the registry.
@@ -129,7 +252,8 @@ class AutoMLSystem:
 
         The first time this method is called, it creates an instance of the
         AutoMLSystem class and initializes its storage and database.
-        Subsequent calls will return the same instance.
+        Subsequent calls will return the same instance, refreshed with the
+        registry entries that changed on disk since the previous call.
 
         Returns:
             AutoMLSystem: The instance of the AutoMLSystem class.
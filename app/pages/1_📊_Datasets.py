@@ -2,23 +2,32 @@ from typing import List, Optional, Tuple
 import streamlit as st
 import pandas as pd
 from app.core.system import AutoMLSystem
+from app.core.preview import preview_dataset
+from autoop.core.ml.artifact import ArtifactHandle
 from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.feature import Feature
+from autoop.core.ml.formats import DATASET_FORMATS, get_format
 from autoop.functional.feature import detect_feature_types
 
 
+PREVIEW_ROWS = 5  # rows parsed to preview an upload
+
+
 class DatasetManagement:
     def __init__(self):
         """Initialize AutoML system and load available datasets."""
         self.automl = AutoMLSystem.get_instance()
         self.datasets = self._list()
 
-    def _list(self) -> List[Dataset]:
+    def _list(self) -> List[ArtifactHandle]:
         """
         Loads the list of available datasets from the AutoML system registry.
+        Only the metadata is read; a dataset's data is fetched when the
+        dataset is selected.
 
         Returns:
-            List[Dataset]: A list of datasets registered in the AutoML system.
+            List[ArtifactHandle]: A list of handles to the datasets
+            registered in the AutoML system.
         """
         return self.automl.registry.list(type="dataset")
 
@@ -30,24 +39,30 @@ class DatasetManagement:
 
         if uploaded_file:
             try:
-                df = pd.read_csv(uploaded_file)
+                # only parse the preview; registering streams the file
+                df = pd.read_csv(uploaded_file, nrows=PREVIEW_ROWS)
+                uploaded_file.seek(0)
                 st.write("Preview of Uploaded Dataset:")
-                st.dataframe(df.head())
+                st.dataframe(df)
 
                 dataset_name = st.text_input("Enter a name forthe dataset:",
                                              value="uploaded_dataset")
                 dataset_version = st.text_input("Enter a \
                                                 version for the dataset:",
                                                 value="1.0.0")
+                dataset_format = st.selectbox(
+                    "Select a storage format:", DATASET_FORMATS,
+                    index=DATASET_FORMATS.index("columnar"))
 
                 if st.button("Register Dataset"):
-                    dataset = Dataset.from_dataframe(
+                    extension = get_format(dataset_format).extension
+                    self.automl.registry.ingest_dataset(
+                        uploaded_file,
                         name=dataset_name,
-                        asset_path=f"{dataset_name}.csv",
-                        data=df,
+                        asset_path=f"{dataset_name}.{extension}",
                         version=dataset_version,
+                        format=dataset_format,
                     )
-                    self.automl.registry.register(dataset)
                     st.success(f"Dataset '{dataset_name}' with version\
                                '{dataset_version}' was registered\
                                 successfully!")
@@ -68,8 +83,10 @@ class DatasetManagement:
             Tuple[List[Feature], Feature, str]: A tuple containing the
             list of input features, the target feature, and the task type.
         """
-        df = dataset.read()
-        features = detect_feature_types(dataset)
+        # the schema is cached in the dataset's metadata at registration,
+        # or saved to the registry when it is inferred for older datasets
+        features = detect_feature_types(
+            dataset, sample=True, persist=self.automl.registry.save_metadata)
         numerical_features = [f.name for
                               f in features if f.type == "numerical"]
         categorical_features = [f.name for
@@ -90,7 +107,7 @@ class DatasetManagement:
                 Feature(name=feature_name, type=feature_type))
 
         target_feature_name = st.selectbox("Select target feature:",
-                                           df.columns)
+                                           [f.name for f in features])
         if target_feature_name in numerical_features:
             feature_type = "numerical"
             task_type = "regression"
@@ -120,7 +137,8 @@ class DatasetManagement:
                 name=dataset.name,
                 asset_path=dataset.asset_path,
                 version=dataset.version,
-                data=dataset.data
+                data=dataset.data,
+                metadata=dataset.metadata
             )
         return None
 
@@ -130,9 +148,8 @@ def main():
 
     dataset = page.select_dataset()
     if dataset:
-        df = dataset.read()
         st.write(f"Dataset selected: {dataset.name}")
-        st.write(df)
+        preview_dataset(dataset)
 
         st.header("Feature Selection")
         input_features, target_feature, task_type = page._features(dataset)
@@ -142,8 +159,7 @@ def main():
 
     dataset = page.preview_datasets()
     if dataset:
-        df = dataset.read()
-        st.write(df)
+        preview_dataset(dataset)
 
 
 if __name__ == "__main__":
@@ -1,13 +1,16 @@
 import os
 import pickle
+import pandas as pd
 import streamlit as st
 from typing import Optional, List, Tuple, Union
 
-from autoop.core.ml.artifact import Artifact
-from autoop.core.ml.feature import Feature
+from autoop.core.ml.artifact import Artifact, ArtifactHandle
+from autoop.core.ml.feature import ENCODINGS, Feature
 from autoop.functional.feature import detect_feature_types
+from autoop.functional.preprocessing import HASH_BUCKETS, TOP_K
 
 
+from autoop.core.ml.leaderboard import leaderboard
 from autoop.core.ml.pipeline import Pipeline
 
 from autoop.core.ml.model.regression.multiple_linear_regression import (
@@ -24,13 +27,17 @@ from autoop.core.ml.model.classification.support_vector import (
 )
 from autoop.core.ml.model.classification.decision_tree import DTreeClassifier
 
-from autoop.core.ml.metric import get_metric, METRICS
+from autoop.core.ml.metric import get_metric, Metric, METRICS
 from app.core.system import AutoMLSystem
+from app.core.preview import preview_dataset
 from autoop.core.ml.dataset import Dataset
 
 
 st.set_page_config(page_title="Modelling", page_icon="📈")
 
+BOOTSTRAP_REPLICATES = 1000  # resamples of the test metrics' intervals
+LEADERBOARD_JOBS = 2  # worker processes per comparison, shared server
+
 
 def write_helper_text(text: str):
     st.write(f"<p style=\"color: #888;\">{text}</p>", unsafe_allow_html=True)
@@ -48,12 +55,15 @@ class PipelineModelling:
         self.automl = AutoMLSystem.get_instance()
         self.datasets = self._list()
 
-    def _list(self) -> List[Dataset]:
+    def _list(self) -> List[ArtifactHandle]:
         """
         Loads the list of available datasets from the AutoML system registry.
+        Only the metadata is read; a dataset's data is fetched when the
+        dataset is selected.
 
         Returns:
-            List[Dataset]: A list of datasets registered in the AutoML system.
+            List[ArtifactHandle]: A list of handles to the datasets
+            registered in the AutoML system.
         """
         return self.automl.registry.list(type="dataset")
 
@@ -78,7 +88,8 @@ class PipelineModelling:
                 name=dataset.name,
                 asset_path=dataset.asset_path,
                 version=dataset.version,
-                data=dataset.data
+                data=dataset.data,
+                metadata=dataset.metadata
             )
         return None
 
@@ -96,12 +107,15 @@ class PipelineModelling:
             Tuple[List[Feature], Feature, str]: A tuple containing the
             list of input features, the target feature, and the task type.
         """
-        df = dataset.read()
-        features = detect_feature_types(dataset)
+        # the schema is cached in the dataset's metadata at registration,
+        # or saved to the registry when it is inferred for older datasets
+        features = detect_feature_types(
+            dataset, sample=True, persist=self.automl.registry.save_metadata)
         numerical_features = [f.name for
                               f in features if f.type == "numerical"]
         categorical_features = [f.name for
                                 f in features if f.type == "categorical"]
+        encodings = {f.name: f.encoding for f in features}
 
         input_features = []
         input_feature_names = st.multiselect("Select input features",
@@ -114,12 +128,17 @@ class PipelineModelling:
                 feature_type = "categorical"
             else:
                 raise ValueError(f"Unknown feature type for {feature_name}")
+            encoding, params = "onehot", {}
+            if feature_type == "categorical":
+                encoding, params = self._encoding(feature_name,
+                                                  encodings[feature_name])
             input_features.append(
-                Feature(name=feature_name, type=feature_type))
+                Feature(name=feature_name, type=feature_type,
+                        encoding=encoding, encoding_params=params))
 
         available_features = [
-            feature for feature in df.columns if
-            feature not in input_feature_names
+            feature.name for feature in features if
+            feature.name not in input_feature_names
         ]
 
         target_feature_name = st.selectbox("Select target feature:",
@@ -135,6 +154,29 @@ class PipelineModelling:
         st.write(f"Detected Task Type: {task_type}")
         return input_features, target_feature, task_type
 
+    def _encoding(self, feature_name: str,
+                  default: str) -> Tuple[str, dict]:
+        """
+        Prompts the user for the encoding of a categorical feature.
+
+        Parameters:
+            feature_name (str): The name of the feature.
+            default (str): The encoding detected for the feature.
+
+        Returns:
+            Tuple[str, dict]: The encoding and its parameters.
+        """
+        encoding = st.selectbox(f"Encoding of {feature_name}:", ENCODINGS,
+                                index=ENCODINGS.index(default))
+        if encoding == "hashing":
+            return encoding, {"buckets": st.number_input(
+                f"Hash buckets of {feature_name}:", 2, 1 << 20,
+                HASH_BUCKETS)}
+        if encoding == "topk":
+            return encoding, {"k": st.number_input(
+                f"Levels kept of {feature_name}:", 1, 10000, TOP_K)}
+        return encoding, {}
+
     def models(self, task_type: str) -> Union[LassoRegression, RidgeRegression,
                                               MultipleLinearRegression,
                                               KNearestClassifier,
@@ -220,7 +262,8 @@ class PipelineModelling:
                 model=model,
                 input_features=input_features,
                 target_feature=target_feature,
-                split=test_size
+                split=test_size,
+                bootstrap=BOOTSTRAP_REPLICATES
             )
 
         if st.button("Show Pipeline Summary"):
@@ -249,17 +292,57 @@ class PipelineModelling:
 
             st.header("Pipeline Results")
             st.write("Test Metrics:")
+            intervals = {metric_obj.name: (low, high) for metric_obj, low,
+                         high in results["test intervals"]}
             for metric_obj, value in results["test metrics"]:
-                st.write(f"{metric_obj.name}: {value}")
+                if metric_obj.name in intervals:
+                    low, high = intervals[metric_obj.name]
+                    st.write(f"{metric_obj.name}: {value} "
+                             f"(95% CI {low:.4f} to {high:.4f})")
+                else:
+                    st.write(f"{metric_obj.name}: {value}")
 
             st.write("Training Metrics:")
             for metric_obj, value in results["training metrics"]:
                 st.write(f"{metric_obj.name}: {value}")
 
+    def compare_models(self, pipeline: Pipeline, metrics: List[Metric]):
+        """
+        Train every model of the task type on the pipeline's data in
+        parallel and display them ranked by the chosen metric.
+
+        Parameters:
+        pipeline (Pipeline): the pipeline giving the data and split
+        metrics (List[Metric]): the selected metrics to rank by
+
+        Returns:
+        None
+        """
+        if not metrics:
+            st.write("Select a metric to compare the models.")
+            return
+        metric_name = st.selectbox("Rank models by:",
+                                   [metric.name for metric in metrics])
+        time_budget = st.slider("Time budget (seconds)", 5, 600, 60)
+        if st.button("Compare Models"):
+            metric = next(metric for metric in metrics
+                          if metric.name == metric_name)
+            rows = leaderboard(pipeline, metric=metric,
+                               time_budget=time_budget,
+                               n_jobs=LEADERBOARD_JOBS)
+            st.dataframe(pd.DataFrame([
+                {"model": row["model"], "status": row["status"],
+                 **{result_metric.name: value
+                    for result_metric, value in row["metrics"]},
+                 "fit time (s)": row["fit_time"]}
+                for row in rows
+            ]))
+
     def save(self, pipeline: Pipeline):
         """
         Prompts the user for a name and version, trains the pipeline,
-        and saves it as an artifact.
+        and saves it as an artifact, with the inference plan that applies
+        its fitted transforms and model.
 
         Args:
             pipeline (Pipeline): The configured pipeline object to be
@@ -273,13 +356,15 @@ class PipelineModelling:
 
         if st.button("Train and Save Pipeline"):
             try:
+                pipeline.execute()
                 artifact_data = {
                     "model": pipeline.model,
+                    "plan": pipeline.inference_plan(),
                     "input_features": [feature.name for feature
                                        in pipeline._input_features],
                     "target_feature": pipeline._target_feature.name,
                     "split_ratio": pipeline._split,
-                    "metrics": [metric.name for metric in pipeline._metrics],
+                    "metrics": [metric.name for metric in pipeline.metrics],
                 }
 
                 serialized_data = pickle.dumps(artifact_data)
@@ -305,8 +390,7 @@ def main():
     st.header("Step 1: Load the Dataset")
     dataset = page._select_dataset()
     if dataset:
-        df = dataset.read()
-        st.write(df)
+        preview_dataset(dataset)
 
         st.header("Step 2: Feature Selection")
         input_features, target_feature, task_type = page._features(dataset)
@@ -330,6 +414,9 @@ def main():
         st.header("Step 7: Train and Evaluate Model")
         page.train(pipeline)
 
+        st.header("Step 8: Compare All Models")
+        page.compare_models(pipeline, metrics)
+
         st.header("Extra requirements: Save the pipeline")
         page.save(pipeline)
 
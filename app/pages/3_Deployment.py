@@ -2,12 +2,18 @@ import pandas as pd
 import streamlit as st
 from app.core.system import AutoMLSystem
 import pickle
+import tempfile
 
+from autoop.core.ml.metric import get_metric
+from autoop.core.ml.scoring import BatchScorer
 from autoop.core.storage import NotFoundError
 
 
 st.set_page_config(page_title="Deployment")
 
+PREVIEW_ROWS = 5  # rows parsed to preview an upload, and of predictions
+SCORING_JOBS = 2  # worker processes per scoring request, shared server
+
 
 def write_helper_text(text: str):
     st.write(f"<p style=\"color: #888;\">{text}</p>", unsafe_allow_html=True)
@@ -73,16 +79,18 @@ class DeploymentPage:
         """Allow the user to upload a dataset."""
         uploaded_file = st.file_uploader("Upload Dataset:", type=["csv"])
         if uploaded_file:
-            dataset = pd.read_csv(uploaded_file)
+            # only preview the upload, it is scored chunk by chunk
+            preview = pd.read_csv(uploaded_file, nrows=PREVIEW_ROWS)
+            uploaded_file.seek(0)
             st.write("### Uploaded Dataset")
-            st.write(dataset.head())
-            return dataset
+            st.write(preview)
+            return uploaded_file, preview
         return None
 
-    def validate_dataset(self, dataset, pipeline_data):
+    def validate_dataset(self, preview, pipeline_data):
         """Check if the dataset matches the pipeline input features."""
         pipeline_features = set(pipeline_data.get('input_features'))
-        dataset_features = set(dataset.columns)
+        dataset_features = set(preview.columns)
         missing_features = pipeline_features - dataset_features
 
         if missing_features:
@@ -92,25 +100,54 @@ class DeploymentPage:
         st.success("Dataset is compatible with the pipeline.")
         return True
 
-    def generate_predictions(self, pipeline_data, dataset):
-        model = pipeline_data['model']
-
-        input_features = pipeline_data.get('input_features')
+    def generate_predictions(self, pipeline_data, uploaded_file, preview):
+        """
+        Score the uploaded dataset chunk by chunk with the pipeline's
+        inference plan, which encodes and scales the features as in
+        training, and offer the predictions as a download. The metrics
+        are evaluated if the dataset has the target.
+        """
+        plan = pipeline_data.get('plan')
+        if plan is None:
+            st.error("This pipeline was saved without an inference plan.\
+                     Please train and save it again.")
+            return
         target_feature = pipeline_data.get('target_feature')
-
-        X = dataset[input_features].values
-        predictions = model.predict(X)
-
-        st.write("### Predictions")
-        st.write(predictions)
-
-        if target_feature in dataset.columns:
-            y_true = dataset[target_feature].values
-            metrics = [pickle.loads(metric) for
-                       metric in pipeline_data.get('metrics')]
+        if target_feature not in preview.columns:
+            target_feature = None
+        metrics = [get_metric(name) for
+                   name in pipeline_data.get('metrics')]
+
+        if not st.button("Generate Predictions"):
+            return
+        status = st.empty()
+
+        def report(rows: int, rows_per_second: float):
+            status.write(f"Scored {rows:,} rows ({rows_per_second:,.0f}\
+                         rows/sec)")
+
+        # the predictions are streamed to disk rather than held
+        with tempfile.TemporaryFile() as output:
+            try:
+                summary = BatchScorer(plan, n_jobs=SCORING_JOBS).score(
+                    uploaded_file, output, metrics=metrics,
+                    target=target_feature, progress=report)
+            except ValueError as e:
+                st.error(f"Error generating predictions: {e}")
+                return
+            report(summary["num_rows"], summary["rows_per_second"])
+
+            st.write("### Predictions")
+            output.seek(0)
+            st.write(pd.read_csv(output, nrows=PREVIEW_ROWS))
+            output.seek(0)
+            st.download_button("Download Predictions", output,
+                               file_name="predictions.csv",
+                               mime="text/csv")
+
+        if summary["metrics"]:
             st.write("### Metrics")
-            for metric in metrics:
-                result = metric.evaluate(y_true, predictions)
+            for metric, result in summary["metrics"]:
                 st.write(f"{metric.name}: {result}")
 
     def run(self):
@@ -120,12 +157,14 @@ class DeploymentPage:
 
         if pipeline_data:
             st.header("Step 2: Upload Dataset")
-            dataset = self.upload_dataset()
+            upload = self.upload_dataset()
 
-            if dataset is not None:
-                if self.validate_dataset(dataset, pipeline_data):
+            if upload is not None:
+                uploaded_file, preview = upload
+                if self.validate_dataset(preview, pipeline_data):
                     st.header("Step 3: Generate Predictions")
-                    self.generate_predictions(pipeline_data, dataset)
+                    self.generate_predictions(pipeline_data, uploaded_file,
+                                              preview)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,79 @@
-
 import json
-from typing import Tuple, List, Union
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, List, Union
 import os
 
-from autoop.core.storage import Storage
+from autoop.core.sqlite import SQLiteConnection
+from autoop.core.storage import Storage, NotFoundError
+
+
+def version_key(version: str) -> str:
+    """Turn a version string into a key that sorts in version order
+    Numeric parts are zero padded, so "1.10.0" sorts after "1.9.0".
+    Args:
+        version (str): The version string, e.g. "1.0.0"
+    Returns:
+        str: A key whose string order matches the version order
+    """
+    parts = str(version).split(".")
+    return ".".join(part.zfill(10) if part.isdigit() else part
+                    for part in parts)
+
+
+def _matches(entry: dict, filters: dict) -> bool:
+    """Check an entry against the filters of Database.query
+    Args:
+        entry (dict): The entry to check
+        filters (dict): Field values to match; "tag" matches one of the
+        entry's tags
+    Returns:
+        bool: Whether the entry matches all filters
+    """
+    for field, value in filters.items():
+        if field == "tag":
+            if value not in entry.get("tags", []):
+                return False
+        elif entry.get(field) != value:
+            return False
+    return True
 
 
 class Database():
-    def __init__(self, storage: Storage):
+    JOURNAL_KEY = "journal.log"
+    SNAPSHOT_KEY = "snapshot.json"
+    GENERATION_KEY = "generation"
+    _MISSING = "missing"
+
+    def __init__(self, storage: Storage, journaled: bool = False,
+                 compact_threshold: int = 1000):
+        """Initialize the database and load its entries from storage
+        Args:
+            storage (Storage): The storage to persist the entries in
+            journaled (bool): Append mutations to a single journal instead
+            of writing one object per entry. Defaults to False.
+            compact_threshold (int): Number of journal records after which
+            the journal is folded into a snapshot in the background. Only
+            used in journaled mode.
+        """
         self._storage = storage
+        self._journaled = journaled
+        self._compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._compactor = None
         self._data = {}
+        self._dirty = set()
+        self._deleted = set()
+        self._batch_depth = 0
+        self._journal_records = 0
+        self._journal_offset = 0
+        self._epoch = 0
+        self._snapshot_fingerprint = None
+        self._generation = None
+        self._fingerprints = {}
         self._load()
 
     def set(self, collection: str, id: str, entry: dict) -> dict:
@@ -24,10 +88,13 @@ class Database():
         assert isinstance(entry, dict), "Data must be a dictionary"
         assert isinstance(collection, str), "Collection must be a string"
         assert isinstance(id, str), "ID must be a string"
-        if not self._data.get(collection, None):
-            self._data[collection] = {}
-        self._data[collection][id] = entry
-        self._persist()
+        with self._lock:
+            if not self._data.get(collection, None):
+                self._data[collection] = {}
+            self._data[collection][id] = entry
+            self._dirty.add((collection, id))
+            self._deleted.discard((collection, id))
+            self._persist()
         return entry
 
     def get(self, collection: str, id: str) -> Union[dict, None]:
@@ -51,11 +118,14 @@ class Database():
         Returns:
             None
         """
-        if not self._data.get(collection, None):
-            return
-        if self._data[collection].get(id, None):
-            del self._data[collection][id]
-        self._persist()
+        with self._lock:
+            if not self._data.get(collection, None):
+                return
+            if id in self._data[collection]:
+                del self._data[collection][id]
+                self._dirty.discard((collection, id))
+                self._deleted.add((collection, id))
+            self._persist()
 
     def list(self, collection: str) -> List[Tuple[str, dict]]:
         """Lists all data in a collection
@@ -65,37 +135,573 @@ class Database():
             List[Tuple[str, dict]]: A list of tuples containing the id
             and data for each item in the collection
         """
-        if not self._data.get(collection, None):
-            return []
-        return [(id, data) for id, data in self._data[collection].items()]
+        with self._lock:
+            if not self._data.get(collection, None):
+                return []
+            return [(id, data) for id, data in self._data[collection].items()]
+
+    def query(self, collection: str,
+              **filters: str) -> List[Tuple[str, dict]]:
+        """Lists the data in a collection that matches the given fields
+        Args:
+            collection (str): The collection to list the data from
+            **filters (str): Values the entries must have, for example
+            type="dataset". The special filter tag matches entries whose
+            tags contain the value.
+        Returns:
+            List[Tuple[str, dict]]: A list of tuples containing the id
+            and data for each matching item
+        """
+        return [(id, data) for id, data in self.list(collection)
+                if _matches(data, filters)]
+
+    def latest(self, collection: str, name: str,
+               **filters: str) -> Optional[Tuple[str, dict]]:
+        """Get the entry with the highest version for a name
+        Args:
+            collection (str): The collection to search
+            name (str): The name of the entry
+            **filters (str): Additional filters, as in query
+        Returns:
+            Optional[Tuple[str, dict]]: The id and data of the latest
+            version, or None if there is no entry with that name
+        """
+        entries = self.query(collection, name=name, **filters)
+        if not entries:
+            return None
+        return max(entries, key=lambda item: version_key(
+            item[1].get("version", "")))
 
     def refresh(self):
-        """Refresh the database by loading the data from storage"""
-        self._load()
+        """Refresh the database with the changes made in storage
+        Only entries whose storage fingerprint changed are reloaded. The
+        refresh is a single small read when nothing changed: the
+        generation token written on every flush in file mode, or the
+        snapshot fingerprint and journal tail in journaled mode.
+        """
+        with self._lock:
+            if self._journaled:
+                self._refresh_journal()
+            else:
+                self._refresh_entries()
+
+    @contextmanager
+    def batch(self) -> Iterator["Database"]:
+        """Group several mutations into a single flush
+        Mutations made inside the block are written to storage together
+        when the outermost block exits; in journaled mode that is a single
+        append and fsync. Other threads wait until the batch is flushed.
+        Returns:
+            Iterator[Database]: This database
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._persist()
+
+    def compact(self):
+        """Fold the journal into a snapshot and drop the folded records
+        The snapshot starts a new epoch, whose records go to a journal of
+        their own, so a journal is only ever appended to and the offsets
+        of other instances into it stay valid; an instance that loaded
+        the previous snapshot reloads on its next refresh. The fold and
+        the switch hold the journal lock, so no record is appended to
+        the folded journal meanwhile. The fold reads the storage, not
+        this instance's data, so it leaves out unflushed batches.
+        Does nothing when the database is not journaled.
+        """
+        if not self._journaled:
+            return
+        with self._compaction_lock:
+            with self._locked_journal():
+                snapshot = self._read_snapshot()
+                data = snapshot["data"]
+                epoch = snapshot.get("epoch", 0)
+                records, _ = self._read_journal(self._journal_key(epoch))
+                for record in records:
+                    self._apply(data, record)
+                self._storage.save(
+                    json.dumps({"data": data, "epoch": epoch + 1}).encode(),
+                    self.SNAPSHOT_KEY)
+                try:
+                    self._storage.delete(self._journal_key(epoch))
+                except NotFoundError:
+                    pass
+            with self._lock:
+                self._refresh_journal()
 
     def _persist(self):
-        """Persist the data to storage"""
-        for collection, data in self._data.items():
-            if not data:
-                continue
-            for id, item in data.items():
-                self._storage.save(json.dumps(item).encode(),
-                                   f"{collection}{os.sep}{id}")
+        """Persist the changed entries to storage
+
+        Only entries that were set or deleted since the last flush are
+        written, so the cost of a mutation does not depend on the size
+        of the database.
+        """
+        if self._batch_depth:
+            return
+        if self._journaled:
+            self._persist_journal()
+            return
+        if not self._dirty and not self._deleted:
+            return
+        for collection, id in self._dirty:
+            item = self._data[collection][id]
+            key = f"{collection}{os.sep}{id}"
+            self._storage.save(json.dumps(item).encode(), key)
+            self._fingerprints[(collection, id)] = self._fingerprint(key)
+        self._dirty.clear()
 
         # for things that were deleted, we need to remove them from the storage
-        keys = self._storage.list("")
-        for key in keys:
-            collection, id = key.split(os.sep)[-2:]
-            if not self._data.get(collection, id):
+        for collection, id in self._deleted:
+            self._fingerprints.pop((collection, id), None)
+            try:
                 self._storage.delete(f"{collection}{os.sep}{id}")
+            except NotFoundError:
+                # never flushed, or already removed by another instance
+                pass
+        self._deleted.clear()
+
+        # a fresh token tells other instances that something changed
+        self._write_generation()
+
+    def _adopt_generation(self):
+        """Write a generation token into a tree that has none, e.g. one
+        written before tokens, once it was read in full, so that the
+        next refresh of an unchanged tree is a single small read. A token
+        written by a flush during the read is left to the next refresh.
+        """
+        if self._generation is None and self._read_generation() is None:
+            self._write_generation()
+
+    def _write_generation(self):
+        """Write a fresh generation token, which other instances compare
+        to the one they last read to skip refreshing an unchanged tree
+        """
+        self._generation = uuid.uuid4().hex
+        self._storage.save(self._generation.encode(), self.GENERATION_KEY)
+
+    def _persist_journal(self):
+        """Append the changed entries to the journal in a single write
+
+        The records are not numbered: instances sharing the storage all
+        append to the journal, and its order is the order they are
+        replayed in. The append holds the journal lock and first picks
+        up a compaction, so it goes to the journal of the latest epoch.
+        The tail of the journal is read back after the append, so the
+        records of other instances appended before these are applied
+        first, and the records are counted once.
+        """
+        records = []
+        for collection, id in self._dirty:
+            records.append({"op": "set",
+                            "collection": collection, "id": id,
+                            "entry": self._data[collection][id]})
+        for collection, id in self._deleted:
+            records.append({"op": "delete",
+                            "collection": collection, "id": id})
+        self._dirty.clear()
+        self._deleted.clear()
+        if not records:
+            return
+        with self._locked_journal():
+            self._refresh_journal()
+            self._storage.append(self._encode_records(records),
+                                 self._journal_key(self._epoch))
+            self._replay_journal()
+        if self._journal_records >= self._compact_threshold:
+            self._schedule_compaction()
+
+    def _schedule_compaction(self):
+        """Start a background compaction unless one is already running"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    @contextmanager
+    def _locked_journal(self) -> Iterator[None]:
+        """Hold the journal lock, between the threads of this instance and
+        between the processes sharing the storage, see Storage.lock
+        Returns:
+            Iterator[None]: Nothing, the lock is held in the block
+        """
+        with self._journal_lock, self._storage.lock(self.JOURNAL_KEY):
+            yield
+
+    def _journal_key(self, epoch: int) -> str:
+        """The key of the journal of a compaction epoch
+        Epoch 0, before any compaction, keeps the original journal key.
+        Args:
+            epoch (int): The epoch, as recorded in the snapshot
+        Returns:
+            str: The key of its journal
+        """
+        if not epoch:
+            return self.JOURNAL_KEY
+        return f"journal.{epoch}.log"
+
+    def _read_snapshot(self) -> dict:
+        """Read the last snapshot
+        Returns:
+            dict: Its "data" and, after a compaction, its "epoch"
+        """
+        try:
+            return json.loads(self._storage.load(self.SNAPSHOT_KEY))
+        except NotFoundError:
+            return {"data": {}}
+
+    @staticmethod
+    def _encode_records(records: List[dict]) -> bytes:
+        """Encode journal records as newline-delimited JSON
+        Args:
+            records (List[dict]): The records to encode
+        Returns:
+            bytes: The encoded records
+        """
+        lines = [json.dumps(record) + "\n" for record in records]
+        return "".join(lines).encode()
+
+    def _read_journal(self, key: str,
+                      offset: int = 0) -> Tuple[List[dict], int]:
+        """Read the complete records from a journal
+        Args:
+            key (str): The key of the journal, see _journal_key
+            offset (int): Byte offset to start reading at
+        Returns:
+            Tuple[List[dict], int]: The records in the order they were
+            appended, and the offset just past the last complete record
+        """
+        try:
+            raw = self._storage.load_from(key, offset)
+        except NotFoundError:
+            return [], offset
+        records = []
+        # the last element is empty, or a record that is still being written
+        for line in raw.split(b"\n")[:-1]:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # a torn record from an interrupted append
+                break
+            offset += len(line) + 1
+        return records, offset
+
+    def _fingerprint(self, key: str):
+        """Fingerprint a storage key, see Storage.stat
+        Args:
+            key (str): The key to fingerprint
+        Returns:
+            The fingerprint, _MISSING if the key does not exist, or None if
+            the storage cannot tell
+        """
+        try:
+            return self._storage.stat(key)
+        except NotFoundError:
+            return self._MISSING
+
+    def _read_generation(self) -> Union[str, None]:
+        """Read the generation token written on every flush
+        Returns:
+            Union[str, None]: The token, or None if it was never written
+        """
+        try:
+            return self._storage.load(self.GENERATION_KEY).decode()
+        except NotFoundError:
+            return None
+
+    @staticmethod
+    def _apply(data: dict, record: dict):
+        """Apply a journal record to data
+        Args:
+            data (dict): The entries of every collection
+            record (dict): The record to apply
+        """
+        collection = data.setdefault(record["collection"], {})
+        if record["op"] == "set":
+            collection[record["id"]] = record["entry"]
+        else:
+            collection.pop(record["id"], None)
 
     def _load(self):
         """Load the data from storage"""
-        self._data = {}
+        with self._lock:
+            self._data = {}
+            self._dirty.clear()
+            self._deleted.clear()
+            self._fingerprints = {}
+            if self._journaled:
+                self._load_journal()
+                return
+            self._generation = self._read_generation()
+            for key in self._storage.list(""):
+                if os.sep not in key:
+                    # root-level keys hold the journal and generation token,
+                    # not collection items
+                    continue
+                collection, id = key.split(os.sep)[-2:]
+                # fingerprint before reading, so a concurrent write is
+                # picked up by the next refresh rather than missed
+                fingerprint = self._fingerprint(key)
+                data = self._storage.load(f"{collection}{os.sep}{id}")
+                # Ensure the collection exists in the dictionary
+                if collection not in self._data:
+                    self._data[collection] = {}
+                self._data[collection][id] = json.loads(data.decode())
+                self._fingerprints[(collection, id)] = fingerprint
+            self._adopt_generation()
+
+    def _refresh_entries(self):
+        """Reload the entries whose fingerprint changed in storage"""
+        generation = self._read_generation()
+        if generation is not None and generation == self._generation:
+            return
+        seen = set()
         for key in self._storage.list(""):
+            if os.sep not in key:
+                continue
             collection, id = key.split(os.sep)[-2:]
-            data = self._storage.load(f"{collection}{os.sep}{id}")
-            # Ensure the collection exists in the dictionary
-            if collection not in self._data:
-                self._data[collection] = {}
-            self._data[collection][id] = json.loads(data.decode())
+            fingerprint = self._fingerprint(key)
+            if fingerprint == self._MISSING:
+                continue
+            seen.add((collection, id))
+            if fingerprint is not None and \
+                    fingerprint == self._fingerprints.get((collection, id)):
+                continue
+            try:
+                data = self._storage.load(key)
+            except NotFoundError:
+                # deleted since it was listed
+                seen.discard((collection, id))
+                continue
+            self._data.setdefault(collection, {})[id] = json.loads(
+                data.decode())
+            self._fingerprints[(collection, id)] = fingerprint
+        for collection, id in set(self._fingerprints) - seen:
+            del self._fingerprints[(collection, id)]
+            self._data.get(collection, {}).pop(id, None)
+        self._generation = generation
+        self._adopt_generation()
+
+    def _load_journal(self):
+        """Load the last snapshot and replay the journal on top of it"""
+        self._snapshot_fingerprint = self._fingerprint(self.SNAPSHOT_KEY)
+        snapshot = self._read_snapshot()
+        self._data = snapshot["data"]
+        self._epoch = snapshot.get("epoch", 0)
+        self._journal_records = 0
+        self._journal_offset = 0
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """Apply the journal records appended since the last read
+
+        Records are applied in the order of the journal, including those
+        of this instance, so every instance ends with the last record of
+        each entry. The journal is the one of the epoch of the loaded
+        snapshot. Entries changed in a batch that is not flushed yet are
+        kept.
+        """
+        records, self._journal_offset = self._read_journal(
+            self._journal_key(self._epoch), self._journal_offset)
+        pending = self._dirty | self._deleted
+        for record in records:
+            if (record["collection"], record["id"]) not in pending:
+                self._apply(self._data, record)
+        self._journal_records += len(records)
+
+    def _refresh_journal(self):
+        """Replay the journal tail, or reload after a compaction"""
+        fingerprint = self._fingerprint(self.SNAPSHOT_KEY)
+        if fingerprint is None or fingerprint != self._snapshot_fingerprint:
+            self._load()
+            return
+        self._replay_journal()
+
+
+class SQLiteDatabase(Database):
+    def __init__(self, path: str = "./assets/autoop.sqlite"):
+        """Initialize a database backed by an embedded SQLite file
+        Entries are stored as JSON, with their type, name, version and tags
+        copied into indexed columns, so query and latest are index lookups
+        instead of scans. The file can be shared with a SQLiteStorage.
+        Args:
+            path (str): Path of the database file.
+            Defaults to "./assets/autoop.sqlite".
+        """
+        self._db = SQLiteConnection(path)
+        with self._db.transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "collection TEXT NOT NULL, id TEXT NOT NULL, "
+                "entry TEXT NOT NULL, type TEXT, name TEXT, version TEXT, "
+                "version_key TEXT, PRIMARY KEY (collection, id))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_type "
+                "ON entries (collection, type)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_name_version "
+                "ON entries (collection, name, version_key)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tags ("
+                "collection TEXT NOT NULL, id TEXT NOT NULL, "
+                "tag TEXT NOT NULL, PRIMARY KEY (collection, id, tag))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS tags_tag ON tags (collection, tag)"
+            )
+
+    def set(self, collection: str, id: str, entry: dict) -> dict:
+        """Set a key in the database
+        Args:
+            collection (str): The collection to store the data in
+            id (str): The id of the data
+            entry (dict): The data to store
+        Returns:
+            dict: The data that was stored
+        """
+        assert isinstance(entry, dict), "Data must be a dictionary"
+        assert isinstance(collection, str), "Collection must be a string"
+        assert isinstance(id, str), "ID must be a string"
+        version = entry.get("version")
+        with self._db.transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (collection, id, entry, type, "
+                "name, version, version_key) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (collection, id, json.dumps(entry), entry.get("type"),
+                 entry.get("name"), version,
+                 None if version is None else version_key(version))
+            )
+            connection.execute(
+                "DELETE FROM tags WHERE collection = ? AND id = ?",
+                (collection, id)
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO tags (collection, id, tag) "
+                "VALUES (?, ?, ?)",
+                [(collection, id, tag) for tag in entry.get("tags", [])]
+            )
+        return entry
+
+    def get(self, collection: str, id: str) -> Union[dict, None]:
+        """Get a key from the database
+        Args:
+            collection (str): The collection to get the data from
+            id (str): The id of the data
+        Returns:
+            Union[dict, None]: The data that was stored, or None if it
+            doesn't exist
+        """
+        row = self._db.execute(
+            "SELECT entry FROM entries WHERE collection = ? AND id = ?",
+            (collection, id)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def delete(self, collection: str, id: str):
+        """Delete a key from the database
+        Args:
+            collection (str): The collection to delete the data from
+            id (str): The id of the data
+        Returns:
+            None
+        """
+        with self._db.transaction() as connection:
+            connection.execute(
+                "DELETE FROM entries WHERE collection = ? AND id = ?",
+                (collection, id)
+            )
+            connection.execute(
+                "DELETE FROM tags WHERE collection = ? AND id = ?",
+                (collection, id)
+            )
+
+    def list(self, collection: str) -> List[Tuple[str, dict]]:
+        """Lists all data in a collection
+        Args:
+            collection (str): The collection to list the data from
+        Returns:
+            List[Tuple[str, dict]]: A list of tuples containing the id
+            and data for each item in the collection
+        """
+        return self.query(collection)
+
+    def query(self, collection: str,
+              **filters: str) -> List[Tuple[str, dict]]:
+        """Lists the data in a collection that matches the given fields
+        The indexed fields type, name, version and tag are matched in SQL;
+        any other field is checked on the decoded entries.
+        Args:
+            collection (str): The collection to list the data from
+            **filters (str): Values the entries must have, for example
+            type="dataset". The special filter tag matches entries whose
+            tags contain the value.
+        Returns:
+            List[Tuple[str, dict]]: A list of tuples containing the id
+            and data for each matching item
+        """
+        sql = "SELECT e.id, e.entry FROM entries e"
+        clauses = ["e.collection = ?"]
+        parameters = [collection]
+        remaining = {}
+        for field, value in filters.items():
+            if field == "tag":
+                sql += (" JOIN tags t ON t.collection = e.collection"
+                        " AND t.id = e.id")
+                clauses.append("t.tag = ?")
+            elif field in ("type", "name", "version"):
+                clauses.append(f"e.{field} = ?")
+            else:
+                remaining[field] = value
+                continue
+            parameters.append(value)
+        rows = self._db.execute(
+            f"{sql} WHERE {' AND '.join(clauses)} ORDER BY e.rowid",
+            tuple(parameters)
+        )
+        entries = [(id, json.loads(entry)) for id, entry in rows]
+        return [(id, data) for id, data in entries
+                if _matches(data, remaining)]
+
+    def latest(self, collection: str, name: str,
+               **filters: str) -> Optional[Tuple[str, dict]]:
+        """Get the entry with the highest version for a name
+        Args:
+            collection (str): The collection to search
+            name (str): The name of the entry
+            **filters (str): Additional filters, as in query
+        Returns:
+            Optional[Tuple[str, dict]]: The id and data of the latest
+            version, or None if there is no entry with that name
+        """
+        if filters:
+            return super().latest(collection, name, **filters)
+        row = self._db.execute(
+            "SELECT id, entry FROM entries WHERE collection = ? AND name = ? "
+            "ORDER BY version_key DESC LIMIT 1", (collection, name)
+        ).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def refresh(self):
+        """Refresh the database
+        Reads always go to the database file, so there is nothing to reload.
+        """
+
+    @contextmanager
+    def batch(self) -> Iterator["SQLiteDatabase"]:
+        """Group several mutations into a single transaction
+        Returns:
+            Iterator[SQLiteDatabase]: This database
+        """
+        with self._db.transaction():
+            yield self
+
+    def compact(self):
+        """Fold the write-ahead log back into the database file"""
+        self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
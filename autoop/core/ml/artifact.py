@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List
 from pydantic import BaseModel, Field, model_validator
 import base64
 
@@ -65,3 +65,125 @@ class Artifact(BaseModel):
             "tags": self.tags,
             "id": self.id
         }
+
+
+class ArtifactHandle():
+    def __init__(self, id: str, entry: Dict[str, Any],
+                 loader: Callable[[], Any]):
+        """
+        A lightweight reference to a registered artifact.
+
+        The handle exposes the registry metadata right away and only calls
+        the loader to fetch the payload when `data` is first accessed.
+
+        Args:
+            id (str): The id of the artifact in the registry.
+            entry (Dict[str, Any]): The metadata stored in the registry,
+            with the keys name, version, asset_path, tags, metadata
+            and type.
+            loader (Callable[[], Any]): Returns the payload of the artifact.
+        """
+        self._id = id
+        self._entry = entry
+        self._loader = loader
+        self._data = None
+        self._loaded = False
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Pickles the handle without its payload, which may be a memory map
+        that cannot be pickled. The unpickled handle fetches the payload
+        again on first access.
+
+        Returns:
+            Dict[str, Any]: The state of the handle.
+        """
+        return {**self.__dict__, "_data": None, "_loaded": False}
+
+    @property
+    def id(self) -> str:
+        """The id of the artifact."""
+        return self._id
+
+    @property
+    def name(self) -> str:
+        """The name of the artifact."""
+        return self._entry["name"]
+
+    @property
+    def version(self) -> str:
+        """The version of the artifact."""
+        return self._entry["version"]
+
+    @property
+    def asset_path(self) -> str:
+        """The storage path of the artifact's payload."""
+        return self._entry["asset_path"]
+
+    @property
+    def tags(self) -> List[str]:
+        """The tags describing the artifact."""
+        return self._entry.get("tags", [])
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """The experiment and run metadata of the artifact."""
+        return self._entry.get("metadata", {})
+
+    @property
+    def type(self) -> str:
+        """The type of the artifact."""
+        return self._entry["type"]
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the payload has been fetched."""
+        return self._loaded
+
+    @property
+    def data(self) -> Any:
+        """
+        The payload of the artifact, fetched on first access.
+
+        Returns:
+            Any: The payload returned by the loader.
+        """
+        if not self._loaded:
+            self._data = self._loader()
+            self._loaded = True
+        return self._data
+
+    def get_metadata(self) -> Dict[str, Any]:
+        """
+        Returns the metadata of the artifact without fetching its payload.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the artifact's metadata
+        """
+        return {
+            "name": self.name,
+            "asset_path": self.asset_path,
+            "version": self.version,
+            **self.metadata,
+            "type": self.type,
+            "tags": self.tags,
+            "id": self.id
+        }
+
+    def load(self) -> Artifact:
+        """
+        Fetches the payload and returns the full artifact.
+
+        Returns:
+            Artifact: The artifact with its data.
+        """
+        return Artifact(
+            name=self.name,
+            version=self.version,
+            asset_path=self.asset_path,
+            tags=self.tags,
+            metadata=self.metadata,
+            data=self.data,
+            type=self.type,
+            id=self.id,
+        )
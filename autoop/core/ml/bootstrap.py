@@ -0,0 +1,168 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from autoop.core.ml.metric import (
+    ClassificationMetric,
+    Metric,
+    MetricSuite,
+    RegressionMetric,
+    confusion_matrix,
+)
+
+
+BATCH_SIZE = 1 << 22  # resampled rows per batch of replicates
+
+
+def bootstrap_indices(
+        num_rows: int,
+        replicates: int,
+        generator: np.random.Generator
+        ) -> np.ndarray:
+    """Draw the rows of bootstrap replicates, with replacement.
+
+    Args:
+        num_rows (int): Number of rows to resample.
+        replicates (int): Number of replicates.
+        generator (np.random.Generator): Source of the randomness.
+
+    Returns:
+        np.ndarray: The (replicates, num_rows) matrix whose row i holds
+        the indices of the rows of replicate i.
+    """
+    dtype = np.int32 if num_rows <= np.iinfo(np.int32).max else np.int64
+    return generator.integers(0, num_rows, size=(replicates, num_rows),
+                              dtype=dtype)
+
+
+def bootstrap(
+        metrics: List[Metric],
+        y_true: np.ndarray,
+        y_pred: np.ndarray,
+        replicates: int = 1000,
+        confidence: float = 0.95,
+        seed: Optional[int] = None
+        ) -> List[Tuple[Metric, float, float, float]]:
+    """Estimate percentile bootstrap confidence intervals of metrics.
+
+    The rows are resampled with replacement `replicates` times, and the
+    interval is given by the quantiles of the metric over the replicates.
+    The replicates are evaluated together, a batch at a time:
+
+    - The absolute residuals of the regression metrics are computed
+      once, and the rows of a (batch, rows) index matrix are gathered
+      from them in one pass and summed, and squared and summed, along
+      its rows.
+    - The confusion matrix of a replicate follows the multinomial
+      distribution of the rows over the cells of the confusion matrix of
+      all the rows, so the classification metrics draw a stack of
+      confusion matrices from it directly, without resampling the rows.
+    - Other metrics are evaluated one replicate of the index matrix at a
+      time.
+
+    Args:
+        metrics (List[Metric]): The metrics to estimate.
+        y_true (np.ndarray): Ground truth values.
+        y_pred (np.ndarray): Predicted values.
+        replicates (int): Number of bootstrap replicates.
+        confidence (float): Probability covered by the intervals.
+        seed (Optional[int]): Seed of the resampling.
+
+    Returns:
+        List[Tuple[Metric, float, float, float]]: Each metric with its
+        result on all the rows, and the lower and upper bounds of its
+        interval.
+
+    Raises:
+        ValueError: If there are no rows, no replicates, or the
+        confidence is not between 0 and 1.
+    """
+    y_true = np.ravel(y_true)
+    y_pred = np.ravel(y_pred)
+    if len(y_true) != len(y_pred):
+        raise ValueError("The lengths of y_true and y_pred must match.")
+    if len(y_true) == 0 or replicates < 1:
+        raise ValueError("Cannot bootstrap without rows or replicates")
+    if not 0 < confidence < 1:
+        raise ValueError(f"The confidence {confidence} is not in (0, 1)")
+    resampler = _Resampler(metrics, y_true, y_pred)
+    generator = np.random.default_rng(seed)
+    batch = max(1, min(replicates, BATCH_SIZE // len(y_true)))
+    values = np.empty((replicates, len(metrics)))
+    for start in range(0, replicates, batch):
+        stop = min(start + batch, replicates)
+        values[start:stop] = resampler.evaluate(stop - start, generator)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(values, [alpha, 1 - alpha], axis=0)
+    return [
+        (metric, float(result), float(low[i]), float(high[i]))
+        for i, (metric, result)
+        in enumerate(MetricSuite(metrics).evaluate(y_true, y_pred))
+    ]
+
+
+class _Resampler():
+    def __init__(self, metrics: List[Metric], y_true: np.ndarray,
+                 y_pred: np.ndarray):
+        """
+        Evaluate metrics on batches of bootstrap replicates.
+
+        Args:
+            metrics (List[Metric]): The metrics to evaluate.
+            y_true (np.ndarray): Ground truth values.
+            y_pred (np.ndarray): Predicted values.
+        """
+        self._metrics = metrics
+        self._y_true = y_true
+        self._y_pred = y_pred
+        self._residuals = self._cells = None
+        if any(isinstance(metric, RegressionMetric) for metric in metrics):
+            self._residuals = np.abs(np.subtract(y_true, y_pred,
+                                                 dtype=float))
+        if any(isinstance(metric, ClassificationMetric)
+               for metric in metrics):
+            matrix = confusion_matrix(y_true, y_pred)[0]
+            self._shape = matrix.shape
+            self._cells = matrix.ravel() / len(y_true)
+        self._indexed = self._residuals is not None or any(
+            not isinstance(metric, (RegressionMetric, ClassificationMetric))
+            for metric in metrics)
+
+    def evaluate(self, replicates: int,
+                 generator: np.random.Generator) -> np.ndarray:
+        """
+        Evaluate the metrics on a batch of replicates.
+
+        Args:
+            replicates (int): Number of replicates.
+            generator (np.random.Generator): Source of the randomness.
+
+        Returns:
+            np.ndarray: The (replicates, metrics) results.
+        """
+        values = np.empty((replicates, len(self._metrics)))
+        indices = None if not self._indexed else bootstrap_indices(
+            len(self._y_true), replicates, generator)
+        sums = None if self._residuals is None else self._sums(indices)
+        matrices = None if self._cells is None else generator.multinomial(
+            len(self._y_true), self._cells,
+            size=replicates).reshape(replicates, *self._shape)
+        for i, metric in enumerate(self._metrics):
+            if isinstance(metric, RegressionMetric):
+                values[:, i] = metric.from_residuals(sums)
+            elif isinstance(metric, ClassificationMetric):
+                values[:, i] = metric.from_confusion(matrices)
+            else:
+                values[:, i] = [
+                    metric.evaluate(self._y_true[rows], self._y_pred[rows])
+                    for rows in indices
+                ]
+        return values
+
+    def _sums(self, indices: np.ndarray) -> Dict[str, Any]:
+        """The residual sums of each replicate."""
+        # the gather is the costly part, the squares are cheap to redo
+        residuals = self._residuals[indices]
+        return {"count": indices.shape[1],
+                "abs_sum": residuals.sum(axis=1),
+                "squared_sum": np.einsum("ij,ij->i", residuals, residuals)}
@@ -1,9 +1,91 @@
-from autoop.core.ml.artifact import Artifact
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+import hashlib
+import threading
+
+from pydantic import PrivateAttr
+import numpy as np
 import pandas as pd
-import io
+
+from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.formats import DatasetFormat, get_format
+
+
+class FrameCache():
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        """
+        A thread-safe LRU cache of parsed DataFrames, bounded by the memory
+        the cached frames use.
+
+        Args:
+            max_bytes (int): Total size of the cached frames, as reported by
+            DataFrame.memory_usage, above which the least recently used
+            frames are evicted. Defaults to 512 MiB.
+        """
+        self._max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """The memory used by the cached frames, in bytes."""
+        return self._bytes
+
+    def __len__(self) -> int:
+        """The number of cached frames."""
+        return len(self._frames)
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """
+        Get a cached frame and mark it as recently used.
+
+        Args:
+            key (Hashable): The key of the frame.
+
+        Returns:
+            Optional[pd.DataFrame]: The cached frame, or None on a miss.
+            The frame is shared and must not be modified.
+        """
+        with self._lock:
+            if key not in self._frames:
+                return None
+            self._frames.move_to_end(key)
+            return self._frames[key][0]
+
+    def put(self, key: Hashable, frame: pd.DataFrame) -> None:
+        """
+        Cache a frame, evicting the least recently used frames if needed.
+        Frames larger than the whole budget are not cached.
+
+        Args:
+            key (Hashable): The key of the frame.
+            frame (pd.DataFrame): The frame to cache.
+        """
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._frames:
+                self._bytes -= self._frames.pop(key)[1]
+            self._frames[key] = (frame, size)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                _, (_, evicted) = self._frames.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self) -> None:
+        """Remove all cached frames."""
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+
+frame_cache = FrameCache()
 
 
 class Dataset(Artifact):
+    _digest: Optional[tuple] = PrivateAttr(default=None)
 
     def __init__(self, *args, **kwargs):
         super().__init__(type="dataset", *args, **kwargs)
@@ -13,7 +95,8 @@ class Dataset(Artifact):
         data: pd.DataFrame,
         name: str,
         asset_path: str,
-        version: str = "1.0.0"
+        version: str = "1.0.0",
+        format: str = "csv"
          ) -> 'Dataset':
         """
         Creates a new Dataset artifact from a pandas DataFrame.
@@ -24,31 +107,138 @@ class Dataset(Artifact):
             name (str): The name of the dataset artifact.
             asset_path (str): The path to the dataset artifact.
             version (str, optional): The version of the dataset artifact.
+            format (str, optional): The name of the format the data is
+            encoded in, one of DATASET_FORMATS. Defaults to "csv".
 
         Returns:
             Dataset: The created dataset artifact.
         """
+        encoding = _get_format(format)
         return Dataset(
             name=name,
             asset_path=asset_path,
-            data=data.to_csv(index=False).encode(),
+            data=encoding.encode(data),
             version=version,
+            metadata={"format": encoding.name, "num_rows": len(data)},
         )
 
-    def read(self) -> pd.DataFrame:
+    @property
+    def format(self) -> str:
+        """
+        The name of the format the data is encoded in. Datasets registered
+        before formats were recorded are CSV.
+        """
+        return self.metadata.get("format", "csv")
+
+    @property
+    def num_rows(self) -> int:
+        """
+        The number of rows of the data, as recorded in the metadata when
+        the dataset was created or ingested. Datasets registered before
+        it was recorded are read to count them.
+        """
+        if "num_rows" not in self.metadata:
+            return len(self.read())
+        return self.metadata["num_rows"]
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Reads the data from this dataset artifact and returns it as
         a pandas DataFrame.
 
+        For formats that are costly to decode, the parsed frame is cached
+        in `frame_cache` under the dataset id, a hash of its data and the
+        requested columns, so repeated reads of the same payload parse it
+        only once. A projection is served from the cached full frame when
+        there is one. The returned frame is a copy of the cached one, so
+        modifying it never changes the cache: shallow with pandas
+        copy-on-write, deep without it, see _detach.
+
+        Formats that decode to views on the payload, like the columnar
+        one, skip the cache: hashing the payload would read all of it,
+        while decoding only touches the requested columns.
+
+        Args:
+            columns (Optional[List[str]]): The columns to read, in this
+            order. Defaults to all columns.
+
         Returns:
             pd.DataFrame: The data from this dataset artifact.
         """
-        csv = self.data.decode()
-        return pd.read_csv(io.StringIO(csv))
+        encoding = _get_format(self.format)
+        if not encoding.cached:
+            return encoding.decode(self.data, columns)
+        digest = self._payload_digest()
+        frame = frame_cache.get((self.id, digest, None))
+        if frame is not None:
+            if columns is not None:
+                frame = frame[list(columns)]
+            return _detach(frame)
+        key = (self.id, digest, None if columns is None else tuple(columns))
+        frame = frame_cache.get(key)
+        if frame is None:
+            frame = encoding.decode(self.data, columns)
+            frame_cache.put(key, frame)
+        return _detach(frame)
+
+    def read_rows(self, rows: np.ndarray,
+                  columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Reads some rows of the data, decoding only those where the format
+        allows it, see DatasetFormat.decode_rows. The rows are served
+        from the cached full frame when there is one, and are never
+        cached themselves.
+
+        Args:
+            rows (np.ndarray): The sorted positions of the rows to read.
+            columns (Optional[List[str]]): The columns to read, in this
+            order. Defaults to all columns.
+
+        Returns:
+            pd.DataFrame: The rows, indexed from 0.
+        """
+        encoding = _get_format(self.format)
+        if encoding.cached:
+            frame = frame_cache.get((self.id, self._payload_digest(), None))
+            if frame is not None:
+                if columns is not None:
+                    frame = frame[list(columns)]
+                return frame.iloc[rows].reset_index(drop=True)
+        return encoding.decode_rows(self.data, rows, columns)
+
+    def read_arrays(self, columns: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Reads the given columns as numpy arrays. For numeric columns of a
+        columnar payload the arrays are read-only views on the payload,
+        so nothing is copied.
+
+        Args:
+            columns (List[str]): The columns to read.
+
+        Returns:
+            Dict[str, np.ndarray]: The values of each column.
+        """
+        frame = self.read(columns)
+        return {column: frame[column].to_numpy() for column in columns}
+
+    def _payload_digest(self) -> str:
+        """
+        Hashes the data of this dataset, reusing the hash for as long as
+        the data object is the same.
+
+        Returns:
+            str: The hex digest of the data.
+        """
+        if self._digest is None or self._digest[0] is not self.data:
+            digest = hashlib.blake2b(self.data, digest_size=16).hexdigest()
+            self._digest = (self.data, digest)
+        return self._digest[1]
 
     def save(self, data: pd.DataFrame) -> bytes:
         """
-        Saves the given DataFrame as bytes.
+        Saves the given DataFrame as the data of this dataset, encoded
+        in the dataset's format. The cached schema and the profile of
+        the old data are dropped, and its number of rows is updated.
 
         Args:
             data (pd.DataFrame): The DataFrame to be saved.
@@ -56,5 +246,54 @@ class Dataset(Artifact):
         Returns:
             bytes: The data encoded as bytes.
         """
-        bytes = data.to_csv(index=False).encode()
-        return super().save(bytes)
+        self.data = _get_format(self.format).encode(data)
+        for key in ["schema", "columns"]:
+            self.metadata.pop(key, None)
+        self.metadata["num_rows"] = len(data)
+        return self.data
+
+
+def _copy_on_write() -> bool:
+    """
+    Whether pandas copies on write, as it always does from pandas 3, and
+    earlier only when the "mode.copy_on_write" option is set.
+
+    Returns:
+        bool: True if modifying a shallow copy leaves the original as is.
+    """
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def _detach(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Copies a cached frame so that modifying the copy leaves the cache as
+    is. Under copy-on-write a shallow copy does, and costs no memory.
+
+    Args:
+        frame (pd.DataFrame): The cached frame.
+
+    Returns:
+        pd.DataFrame: The copy.
+    """
+    return frame.copy(deep=not _copy_on_write())
+
+
+def _get_format(name: str) -> DatasetFormat:
+    """
+    Looks up a dataset format, failing loudly on unknown names.
+
+    Args:
+        name (str): The name of the format.
+
+    Returns:
+        DatasetFormat: The format.
+
+    Raises:
+        ValueError: If no format has that name.
+    """
+    encoding = get_format(name)
+    if encoding is None:
+        raise ValueError(f"{name} is not a valid dataset format!")
+    return encoding
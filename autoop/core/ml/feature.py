@@ -1,16 +1,50 @@
 from pydantic import BaseModel, PrivateAttr
-from typing import Literal
+from typing import Any, Dict, Literal, Optional
+
+
+ENCODINGS = [
+    "onehot",
+    "hashing",
+    "topk",
+    "ordinal"
+]  # the encodings of categorical features
 
 
 class Feature(BaseModel):
     _name: str = PrivateAttr
     _type: str = PrivateAttr
+    _encoding: str = PrivateAttr
+    _encoding_params: Dict[str, Any] = PrivateAttr
 
     def __init__(self, name: str,
-                 type: Literal["numerical", "categorical"], **kwargs) -> None:
+                 type: Literal["numerical", "categorical"],
+                 encoding: Literal["onehot", "hashing", "topk",
+                                   "ordinal"] = "onehot",
+                 encoding_params: Optional[Dict[str, Any]] = None,
+                 **kwargs) -> None:
+        """
+        A feature of a dataset, and how it is encoded for the models.
+
+        Categorical features are encoded as one of ENCODINGS:
+        "onehot" has a column per level, "hashing" a fixed number of
+        buckets the levels are hashed into (encoding_params "buckets"),
+        "topk" a column for each of the k most frequent levels and one
+        for all the others (encoding_params "k"), and "ordinal" a
+        single column of level codes, for tree models. Numerical
+        features are standardized, whatever their encoding.
+
+        Args:
+            name (str): The name of the feature.
+            type (Literal["numerical", "categorical"]): The type.
+            encoding (str): The encoding of a categorical feature.
+            encoding_params (Optional[Dict[str, Any]]): The parameters
+            of the encoding.
+        """
         super().__init__(**kwargs)
         self.type = type
         self.name = name
+        self.encoding = encoding
+        self._encoding_params = dict(encoding_params or {})
 
     @property
     def type(self) -> str:
@@ -49,3 +83,27 @@ class Feature(BaseModel):
             self._name = value
         else:
             raise ValueError(f"{value} is not a valid name!")
+
+    @property
+    def encoding(self) -> str:
+        """
+        The encoding of the feature, one of ENCODINGS.
+        """
+        return self._encoding
+
+    @encoding.setter
+    def encoding(self, value: str) -> None:
+        """
+        Setter for the encoding of the feature.
+        Validates that the provided value is one of ENCODINGS.
+        """
+        if value not in ENCODINGS:
+            raise ValueError(f"{value} is not a valid encoding!")
+        self._encoding = value
+
+    @property
+    def encoding_params(self) -> Dict[str, Any]:
+        """
+        The parameters of the encoding of the feature.
+        """
+        return dict(self._encoding_params)
@@ -0,0 +1,794 @@
+from abc import ABC, abstractmethod
+from typing import Any, BinaryIO, Dict, List, Optional
+import io
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # the parquet format is optional
+    pyarrow = None
+
+
+DATASET_FORMATS = [
+    "csv",
+    "columnar",
+] + (["parquet"] if pyarrow is not None else [])
+# names of the formats a dataset can be stored in, parquet only when
+# pyarrow is installed
+
+
+def get_format(name: str) -> "DatasetFormat":
+    """
+    Factory function to get a dataset format by name.
+
+    Args:
+        name (str): str name of the format
+
+    Returns:
+        DatasetFormat: a format instance given its str name. If name is
+        not found, or is "parquet" without pyarrow, returns None.
+    """
+    formats = {
+        "csv": CSVFormat,
+        "columnar": ColumnarFormat,
+        "parquet": ParquetFormat
+    }
+    if name not in DATASET_FORMATS:
+        return None
+    return formats[name]()
+
+
+class DatasetFormat(ABC):
+    """Base class for the encodings of a dataset's payload.
+    """
+    def __init__(self, name: str, extension: str, cached: bool = True):
+        """
+        Initialize a dataset format.
+
+        Args:
+            name (str): str name of the format, recorded in the metadata
+            of the datasets stored in it.
+            extension (str): file extension of payloads in this format.
+            cached (bool): whether decoded frames are worth caching, i.e.
+            decoding costs more than hashing the payload.
+        """
+        self._name = name
+        self._extension = extension
+        self._cached = cached
+
+    @property
+    def name(self) -> str:
+        """Expose the name of the format."""
+        return self._name
+
+    @property
+    def extension(self) -> str:
+        """Expose the file extension of the format."""
+        return self._extension
+
+    @property
+    def cached(self) -> bool:
+        """Whether decoded frames are worth caching."""
+        return self._cached
+
+    @abstractmethod
+    def encode(self, data: pd.DataFrame) -> bytes:
+        """Encode a DataFrame, without its index.
+        Args:
+            data (pd.DataFrame): The DataFrame to encode
+        Returns:
+            bytes: The encoded payload
+        """
+        pass
+
+    @abstractmethod
+    def decode(self, data: Any,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Decode a payload into a DataFrame.
+        Args:
+            data (Any): The payload, as bytes or any object supporting
+            the buffer protocol
+            columns (Optional[List[str]]): The columns to decode, in this
+            order. Defaults to all columns.
+        Returns:
+            pd.DataFrame: The decoded DataFrame
+        """
+        pass
+
+    def decode_rows(self, data: Any, rows: np.ndarray,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Decode some rows of a payload into a DataFrame.
+        Formats that can skip the other rows should override this; the
+        default decodes every row and takes the requested ones.
+        Args:
+            data (Any): The payload
+            rows (np.ndarray): The sorted positions of the rows to decode
+            columns (Optional[List[str]]): The columns to decode, in this
+            order. Defaults to all columns.
+        Returns:
+            pd.DataFrame: The decoded rows, indexed from 0
+        """
+        return self.decode(data, columns).iloc[rows].reset_index(drop=True)
+
+    def writer(self, stream: BinaryIO) -> "DatasetWriter":
+        """Open a writer that encodes a DataFrame chunk by chunk.
+        Formats that can be written incrementally should override this;
+        the default collects the chunks and encodes them on close.
+        Args:
+            stream (BinaryIO): The writable stream of the payload
+        Returns:
+            DatasetWriter: The writer
+        """
+        return _ConcatWriter(self, stream)
+
+
+class CSVFormat(DatasetFormat):
+    def __init__(self):
+        """
+        Initialize the CSV format, the text encoding every dataset used
+        before formats were introduced.
+        """
+        super().__init__(name="csv", extension="csv")
+
+    def encode(self, data: pd.DataFrame) -> bytes:
+        """Encode a DataFrame as CSV text.
+        Args:
+            data (pd.DataFrame): The DataFrame to encode
+        Returns:
+            bytes: The UTF-8 encoded CSV
+        """
+        return data.to_csv(index=False).encode()
+
+    def writer(self, stream: BinaryIO) -> "DatasetWriter":
+        """Open a writer that appends the rows of each chunk as CSV.
+        Args:
+            stream (BinaryIO): The writable stream of the payload
+        Returns:
+            DatasetWriter: The writer
+        """
+        return _CSVWriter(stream)
+
+    def decode(self, data: Any,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Parse a CSV payload, inferring the dtypes.
+        Args:
+            data (Any): The payload
+            columns (Optional[List[str]]): The columns to parse. Defaults
+            to all columns.
+        Returns:
+            pd.DataFrame: The parsed DataFrame
+        """
+        frame = pd.read_csv(io.BytesIO(data), usecols=columns)
+        # usecols keeps the file's column order
+        return frame if columns is None else frame[list(columns)]
+
+    def decode_rows(self, data: Any, rows: np.ndarray,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Parse some rows of a CSV payload, inferring the dtypes from
+        them. Every line up to the last row is still tokenized, but the
+        other rows are skipped by the parser rather than converted, so
+        the memory used is that of the rows parsed.
+        Args:
+            data (Any): The payload
+            rows (np.ndarray): The sorted positions of the rows to parse
+            columns (Optional[List[str]]): The columns to parse. Defaults
+            to all columns.
+        Returns:
+            pd.DataFrame: The parsed rows
+        """
+        rows = np.asarray(rows)
+        skipped = np.ones(rows[-1] + 1 if len(rows) else 0, dtype=bool)
+        skipped[rows] = False
+        # line 0 is the header
+        frame = pd.read_csv(io.BytesIO(data), usecols=columns,
+                            skiprows=np.flatnonzero(skipped) + 1,
+                            nrows=len(rows))
+        return frame if columns is None else frame[list(columns)]
+
+
+class ParquetFormat(DatasetFormat):
+    def __init__(self):
+        """
+        Initialize the Parquet format. Encoding and decoding need pyarrow,
+        see DATASET_FORMATS.
+        """
+        super().__init__(name="parquet", extension="parquet")
+
+    def encode(self, data: pd.DataFrame) -> bytes:
+        """Encode a DataFrame as Parquet.
+        Args:
+            data (pd.DataFrame): The DataFrame to encode
+        Returns:
+            bytes: The Parquet file
+        """
+        buffer = io.BytesIO()
+        data.to_parquet(buffer, engine="pyarrow", index=False)
+        return buffer.getvalue()
+
+    def writer(self, stream: BinaryIO) -> "DatasetWriter":
+        """Open a writer that stores each chunk as a row group and writes
+        the footer on close.
+        Args:
+            stream (BinaryIO): The writable stream of the payload
+        Returns:
+            DatasetWriter: The writer
+        """
+        return _ParquetWriter(self, stream)
+
+    def decode(self, data: Any,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Decode a Parquet payload.
+        Args:
+            data (Any): The payload
+            columns (Optional[List[str]]): The columns to decode. Defaults
+            to all columns.
+        Returns:
+            pd.DataFrame: The decoded DataFrame
+        """
+        return pd.read_parquet(io.BytesIO(data), engine="pyarrow",
+                               columns=columns)
+
+
+class ColumnarFormat(DatasetFormat):
+    """Typed binary columnar format built on NumPy buffers.
+
+    Layout of a payload::
+
+        MAGIC | column buffers, 64-byte aligned | JSON footer |
+        footer length (uint64, little endian) | MAGIC
+
+    The footer holds the schema and, per row group, the offset, length
+    and NumPy dtype of every buffer. Numeric, boolean and datetime columns
+    are stored as their raw values, so decoding a single row group is a
+    zero-copy view on the payload. Strings are dictionary encoded,
+    categoricals keep their codes and categories, and pandas' nullable
+    dtypes keep their values and mask, so every dtype round-trips exactly.
+    """
+    MAGIC = b"AUTOOPC1"
+    ALIGNMENT = 64
+    _TRAILER = struct.Struct("<Q")
+
+    def __init__(self):
+        """
+        Initialize the columnar format. Decoding is cheaper than hashing
+        the payload, so decoded frames are not cached.
+        """
+        super().__init__(name="columnar", extension="columnar",
+                         cached=False)
+
+    def encode(self, data: pd.DataFrame) -> bytes:
+        """Encode a DataFrame as a single row group.
+        Args:
+            data (pd.DataFrame): The DataFrame to encode
+        Returns:
+            bytes: The encoded payload
+        """
+        stream = io.BytesIO()
+        with self.writer(stream) as writer:
+            writer.write(data)
+        return stream.getvalue()
+
+    def writer(self, stream: BinaryIO) -> "DatasetWriter":
+        """Open a writer that stores each chunk as a row group and writes
+        the footer on close.
+        Args:
+            stream (BinaryIO): The writable stream of the payload,
+            positioned at its start
+        Returns:
+            DatasetWriter: The writer
+        """
+        return _ColumnarWriter(self, stream)
+
+    def decode(self, data: Any,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Decode a payload into a DataFrame.
+
+        Only the buffers of the requested columns are touched, so with a
+        memory-mapped payload the other columns are never read from disk.
+
+        Args:
+            data (Any): The payload
+            columns (Optional[List[str]]): The columns to decode, in this
+            order. Defaults to all columns.
+        Returns:
+            pd.DataFrame: The decoded DataFrame. With a single row group,
+            numeric columns are read-only views on the payload.
+        Raises:
+            KeyError: If a requested column does not exist
+        """
+        footer = self.read_footer(data)
+        positions = {field["name"]: i
+                     for i, field in enumerate(footer["schema"])}
+        names = list(positions) if columns is None else list(columns)
+        missing = [name for name in names if name not in positions]
+        if missing:
+            raise KeyError(f"Columns not found: {missing}")
+        selected = [positions[name] for name in names]
+        frames = [self._decode_group(data, footer["schema"], group,
+                                     selected)
+                  for group in footer["row_groups"]]
+        if not frames:
+            return pd.DataFrame(columns=names)
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+    def decode_rows(self, data: Any, rows: np.ndarray,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Decode some rows of a payload into a DataFrame.
+
+        Only the requested rows of each row group are gathered from the
+        buffers, and only their strings are materialized.
+
+        Args:
+            data (Any): The payload
+            rows (np.ndarray): The sorted positions of the rows to decode
+            columns (Optional[List[str]]): The columns to decode, in this
+            order. Defaults to all columns.
+        Returns:
+            pd.DataFrame: The decoded rows, indexed from 0
+        Raises:
+            KeyError: If a requested column does not exist
+        """
+        footer = self.read_footer(data)
+        positions = {field["name"]: i
+                     for i, field in enumerate(footer["schema"])}
+        names = list(positions) if columns is None else list(columns)
+        missing = [name for name in names if name not in positions]
+        if missing:
+            raise KeyError(f"Columns not found: {missing}")
+        selected = [positions[name] for name in names]
+        rows = np.asarray(rows)
+        frames = []
+        start = 0
+        for group in footer["row_groups"]:
+            end = start + group["num_rows"]
+            first, last = np.searchsorted(rows, [start, end])
+            frames.append(self._decode_group(data, footer["schema"], group,
+                                             selected,
+                                             rows[first:last] - start))
+            start = end
+        if not frames:
+            return pd.DataFrame(columns=names)
+        return pd.concat(frames, ignore_index=True)
+
+    def read_footer(self, data: Any) -> Dict[str, Any]:
+        """Read the footer of a payload.
+        Args:
+            data (Any): The payload
+        Returns:
+            Dict[str, Any]: The schema and row groups of the payload
+        Raises:
+            ValueError: If the payload is not in the columnar format
+        """
+        view = memoryview(data).cast("B")
+        magic = len(self.MAGIC)
+        trailer = self._TRAILER.size + magic
+        if len(view) < magic + trailer or \
+                bytes(view[:magic]) != self.MAGIC or \
+                bytes(view[-magic:]) != self.MAGIC:
+            raise ValueError("Data is not in the columnar format")
+        (length,) = self._TRAILER.unpack(view[-trailer:-magic])
+        start = len(view) - trailer - length
+        return json.loads(bytes(view[start:start + length]))
+
+    @staticmethod
+    def _schema(data: pd.DataFrame) -> List[Dict[str, str]]:
+        """Describe the columns of a DataFrame.
+        Args:
+            data (pd.DataFrame): The DataFrame
+        Returns:
+            List[Dict[str, str]]: The name and pandas dtype of each column
+        """
+        return [{"name": str(name), "dtype": str(data[name].dtype)}
+                for name in data.columns]
+
+    def _finish(self, buffer: "_BufferWriter",
+                footer: Dict[str, Any]) -> None:
+        """Write the footer and trailer of a payload.
+        Args:
+            buffer (_BufferWriter): The writer of the payload
+            footer (Dict[str, Any]): The footer to write
+        """
+        encoded = json.dumps(footer).encode()
+        buffer.stream.write(encoded)
+        buffer.stream.write(self._TRAILER.pack(len(encoded)))
+        buffer.stream.write(self.MAGIC)
+
+    def _encode_group(self, data: pd.DataFrame,
+                      buffer: "_BufferWriter") -> Dict[str, Any]:
+        """Write the buffers of one row group.
+        Args:
+            data (pd.DataFrame): The rows of the group
+            buffer (_BufferWriter): The writer of the payload
+        Returns:
+            Dict[str, Any]: The footer entry of the row group
+        """
+        if not data.columns.is_unique:
+            raise ValueError("Column names must be unique")
+        return {
+            "num_rows": len(data),
+            "columns": [_encode_column(data[name], buffer)
+                        for name in data.columns],
+        }
+
+    def _decode_group(self, data: Any, schema: List[Dict[str, str]],
+                      group: Dict[str, Any],
+                      selected: List[int],
+                      rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Decode the selected columns of one row group.
+        Args:
+            data (Any): The payload
+            schema (List[Dict[str, str]]): The schema of the payload
+            group (Dict[str, Any]): The footer entry of the row group
+            selected (List[int]): The positions of the columns to decode
+            rows (Optional[np.ndarray]): The positions of the rows to
+            decode within the group. Defaults to all rows.
+        Returns:
+            pd.DataFrame: The rows of the group
+        """
+        # row groups written in chunks record their own dtypes, which
+        # pd.concat reconciles
+        columns = {
+            schema[i]["name"]: _decode_column(
+                data, group["columns"][i].get("dtype", schema[i]["dtype"]),
+                group["columns"][i], group["num_rows"], rows)
+            for i in selected
+        }
+        return pd.DataFrame(columns, copy=False)
+
+
+class DatasetWriter(ABC):
+    """Base class for writers encoding a DataFrame chunk by chunk.
+
+    Use as a context manager: the payload is only completed when the
+    block exits without an error.
+    """
+    @abstractmethod
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Encode the next rows.
+        Args:
+            chunk (pd.DataFrame): The rows, with the same columns as the
+            previous chunks
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Complete the payload."""
+        pass
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+
+class _ConcatWriter(DatasetWriter):
+    def __init__(self, encoding: DatasetFormat, stream: BinaryIO):
+        """
+        Collect chunks and encode them as one DataFrame on close.
+
+        Args:
+            encoding (DatasetFormat): The format of the payload
+            stream (BinaryIO): The writable stream of the payload
+        """
+        self._format = encoding
+        self._stream = stream
+        self._chunks = []
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Collect the next rows."""
+        self._chunks.append(chunk)
+
+    def close(self) -> None:
+        """Encode the collected rows."""
+        data = pd.concat(self._chunks, ignore_index=True) \
+            if self._chunks else pd.DataFrame()
+        self._stream.write(self._format.encode(data))
+
+
+class _CSVWriter(DatasetWriter):
+    def __init__(self, stream: BinaryIO):
+        """
+        Write chunks as CSV, with the header before the first chunk.
+
+        Args:
+            stream (BinaryIO): The writable stream of the payload
+        """
+        self._stream = stream
+        self._header = True
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Append the rows of a chunk."""
+        self._stream.write(
+            chunk.to_csv(index=False, header=self._header).encode())
+        self._header = False
+
+    def close(self) -> None:
+        """Nothing to complete: CSV has no footer."""
+        pass
+
+
+class _ColumnarWriter(DatasetWriter):
+    def __init__(self, encoding: ColumnarFormat, stream: BinaryIO):
+        """
+        Write chunks as row groups of the columnar format.
+
+        Args:
+            encoding (ColumnarFormat): The columnar format
+            stream (BinaryIO): The writable stream of the payload,
+            positioned at its start
+        """
+        self._format = encoding
+        self._buffer = _BufferWriter(stream, encoding.MAGIC,
+                                     encoding.ALIGNMENT)
+        self._schema = None
+        self._groups = []
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Write the rows of a chunk as a row group.
+        Raises:
+            ValueError: If the columns differ from the previous chunks'
+        """
+        schema = self._format._schema(chunk)
+        if self._schema is None:
+            self._schema = schema
+        elif [field["name"] for field in schema] != \
+                [field["name"] for field in self._schema]:
+            raise ValueError("All chunks must have the same columns")
+        else:
+            self._schema = [
+                {"name": field["name"],
+                 "dtype": _common_dtype(field["dtype"], chunk_field["dtype"])}
+                for field, chunk_field in zip(self._schema, schema)
+            ]
+        group = self._format._encode_group(chunk, self._buffer)
+        for field, column in zip(schema, group["columns"]):
+            column["dtype"] = field["dtype"]
+        self._groups.append(group)
+
+    def close(self) -> None:
+        """Write the footer."""
+        footer = {"version": 1, "schema": self._schema or [],
+                  "row_groups": self._groups}
+        self._format._finish(self._buffer, footer)
+
+
+class _ParquetWriter(DatasetWriter):
+    def __init__(self, encoding: ParquetFormat, stream: BinaryIO):
+        """
+        Write chunks as row groups of a Parquet file, with pyarrow.
+
+        Args:
+            encoding (ParquetFormat): The Parquet format
+            stream (BinaryIO): The writable stream of the payload
+        """
+        self._format = encoding
+        self._stream = stream
+        self._writer = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Write the rows of a chunk as a row group.
+
+        A Parquet file has one schema, that of the first chunk. Later
+        chunks are cast to it where no value changes, e.g. integers
+        with missing values read as floats.
+
+        Raises:
+            ValueError: If the chunk cannot be cast to the schema of the
+            first chunk, e.g. other columns or non-integral floats in an
+            integer column
+        """
+        table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._writer = pyarrow.parquet.ParquetWriter(self._stream,
+                                                         table.schema)
+        else:
+            try:
+                table = table.cast(self._writer.schema, safe=True)
+            except (ValueError, pyarrow.ArrowException) as e:
+                raise ValueError("A chunk does not fit the Parquet schema "
+                                 f"of the first chunk: {e}") from e
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        """Write the footer, or an empty file if there were no chunks."""
+        if self._writer is None:
+            self._stream.write(self._format.encode(pd.DataFrame()))
+        else:
+            self._writer.close()
+
+
+def _common_dtype(left: str, right: str) -> str:
+    """Find the dtype that pd.concat gives columns of two dtypes.
+    Args:
+        left (str): The first dtype
+        right (str): The second dtype
+    Returns:
+        str: The common dtype
+    """
+    if left == right:
+        return left
+    return str(pd.concat([pd.Series([], dtype=left),
+                          pd.Series([], dtype=right)]).dtype)
+
+
+class _BufferWriter():
+    def __init__(self, stream: Any, magic: bytes, alignment: int):
+        """
+        Write aligned buffers to a binary stream, tracking their offsets.
+
+        Args:
+            stream (Any): A writable binary stream, positioned at its start
+            magic (bytes): The leading magic bytes to write
+            alignment (int): The alignment of every buffer, in bytes
+        """
+        self.stream = stream
+        self._alignment = alignment
+        self._offset = 0
+        self._write(magic)
+
+    def _write(self, data: Any) -> None:
+        """Write raw bytes and advance the offset."""
+        self.stream.write(data)
+        self._offset += memoryview(data).nbytes
+
+    def add(self, array: np.ndarray) -> Dict[str, Any]:
+        """Write an array as an aligned buffer.
+        Args:
+            array (np.ndarray): A one-dimensional array
+        Returns:
+            Dict[str, Any]: The footer entry describing the buffer
+        """
+        array = np.ascontiguousarray(array)
+        padding = -self._offset % self._alignment
+        if padding:
+            self._write(b"\0" * padding)
+        entry = {"offset": self._offset, "dtype": array.dtype.str,
+                 "count": int(array.size)}
+        self._write(array.view(np.uint8).data)
+        return entry
+
+
+def _read_buffer(data: Any, entry: Dict[str, Any]) -> np.ndarray:
+    """View a buffer of a columnar payload without copying.
+    Args:
+        data (Any): The payload
+        entry (Dict[str, Any]): The footer entry of the buffer
+    Returns:
+        np.ndarray: A read-only view on the payload
+    """
+    return np.frombuffer(data, dtype=np.dtype(entry["dtype"]),
+                         count=entry["count"], offset=entry["offset"])
+
+
+def _encode_strings(values: pd.Series,
+                    buffer: _BufferWriter) -> Dict[str, Any]:
+    """Dictionary encode a column of strings.
+    Args:
+        values (pd.Series): The strings, with missing values as NA
+        buffer (_BufferWriter): The writer of the payload
+    Returns:
+        Dict[str, Any]: The buffers of the codes and of the dictionary
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    if not all(isinstance(value, str) for value in uniques):
+        raise ValueError(f"Column '{values.name}' mixes strings with "
+                         "other objects and cannot be stored in the "
+                         "columnar format")
+    encoded = [value.encode() for value in uniques]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {
+        "codes": buffer.add(codes.astype(np.int32)),
+        "offsets": buffer.add(offsets),
+        "bytes": buffer.add(np.frombuffer(b"".join(encoded),
+                                          dtype=np.uint8)),
+    }
+
+
+def _decode_strings(data: Any, column: Dict[str, Any],
+                    rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Decode a dictionary encoded column of strings.
+    Args:
+        data (Any): The payload
+        column (Dict[str, Any]): The footer entry of the column
+        rows (Optional[np.ndarray]): The positions of the rows to decode.
+        Defaults to all rows.
+    Returns:
+        np.ndarray: An object array of the strings, with NaN for
+        missing values
+    """
+    offsets = _read_buffer(data, column["offsets"])
+    raw = _read_buffer(data, column["bytes"]).tobytes()
+    dictionary = np.empty(len(offsets), dtype=object)
+    dictionary[:-1] = [raw[start:end].decode() for start, end
+                       in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+    # code -1 marks missing values and picks the trailing NaN
+    dictionary[-1] = np.nan
+    return dictionary[_take(_read_buffer(data, column["codes"]), rows)]
+
+
+def _encode_column(values: pd.Series,
+                   buffer: _BufferWriter) -> Dict[str, Any]:
+    """Write the buffers of a column.
+    Args:
+        values (pd.Series): The column
+        buffer (_BufferWriter): The writer of the payload
+    Returns:
+        Dict[str, Any]: The footer entry of the column
+    Raises:
+        ValueError: If the dtype of the column is not supported
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = pd.Series(dtype.categories, name=values.name)
+        return {"kind": "category", "ordered": bool(dtype.ordered),
+                "categories_dtype": str(categories.dtype),
+                "num_categories": len(categories),
+                "codes": buffer.add(values.cat.codes.to_numpy()),
+                "categories": _encode_column(categories, buffer)}
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        return {"kind": "numpy", "values": buffer.add(values.to_numpy())}
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and \
+            hasattr(values.array, "_mask"):
+        # pandas' nullable dtypes: Int64, Float64, boolean, ...
+        mask = values.isna().to_numpy()
+        numpy_dtype = dtype.numpy_dtype
+        filled = values.to_numpy(dtype=numpy_dtype,
+                                 na_value=numpy_dtype.type(0))
+        return {"kind": "masked", "values": buffer.add(filled),
+                "mask": buffer.add(mask)}
+    if dtype == object or pd.api.types.is_string_dtype(dtype):
+        return {"kind": "string", **_encode_strings(values, buffer)}
+    raise ValueError(f"Column '{values.name}' of dtype {dtype} cannot be "
+                     "stored in the columnar format")
+
+
+def _take(array: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+    """Gather rows of an array, or keep it whole if rows is None."""
+    return array if rows is None else array[rows]
+
+
+def _decode_column(data: Any, dtype: str, column: Dict[str, Any],
+                   num_rows: int, rows: Optional[np.ndarray] = None) -> Any:
+    """Decode a column from its buffers.
+    Args:
+        data (Any): The payload
+        dtype (str): The pandas dtype of the column
+        column (Dict[str, Any]): The footer entry of the column
+        num_rows (int): The number of rows of the row group
+        rows (Optional[np.ndarray]): The positions of the rows to decode.
+        Defaults to all rows, as views on the payload where possible.
+    Returns:
+        Any: An array suitable as a DataFrame column
+    """
+    kind = column["kind"]
+    if kind == "numpy":
+        return _take(_read_buffer(data, column["values"]), rows)
+    if kind == "masked":
+        array_type = pd.api.types.pandas_dtype(dtype).construct_array_type()
+        return array_type(_take(_read_buffer(data, column["values"]), rows),
+                          _take(_read_buffer(data, column["mask"]),
+                                rows).copy())
+    if kind == "category":
+        categories = _decode_column(data, column["categories_dtype"],
+                                    column["categories"],
+                                    column["num_categories"])
+        categories = pd.Index(categories, dtype=column["categories_dtype"])
+        return pd.Categorical.from_codes(
+            _take(_read_buffer(data, column["codes"]), rows),
+            categories=categories,
+            ordered=column["ordered"])
+    # a Series, because DataFrame would infer the str dtype for "object"
+    return pd.Series(_decode_strings(data, column, rows), dtype=dtype,
+                     copy=False)
+
@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from autoop.core.ml.model import Model
+from autoop.functional.preprocessing import PreprocessingExecutor, unscale
+
+
+class InferencePlan():
+    def __init__(self,
+                 steps: List[Dict[str, Any]],
+                 model: Model,
+                 target: Optional[Dict[str, Any]] = None,
+                 sparse_input: bool = False):
+        """
+        A trained pipeline compiled for prediction: the fitted transform
+        of each input feature, in the order of the columns of the design
+        matrix, followed by the fitted model.
+
+        The steps are those fitted by fit_step in training.
+
+        Args:
+            steps (List[Dict[str, Any]]): The fitted steps of the input
+            features.
+            model (Model): The fitted model.
+            target (Optional[Dict[str, Any]]): The "mean" and "scale" the
+            target was standardized with, to report the predictions of
+            a regression in the units of the target. None for a
+            classification, which predicts the raw labels.
+            sparse_input (bool): Whether the model was trained on a sparse
+            design matrix, and should be given one.
+        """
+        self._steps = steps
+        self._model = model
+        self._target = target
+        self._sparse = sparse_input
+
+    @property
+    def model(self) -> Model:
+        """The fitted model."""
+        return self._model
+
+    @property
+    def input_features(self) -> List[str]:
+        """The names of the columns the plan reads."""
+        return [step["feature"] for step in self._steps]
+
+    @property
+    def sparse_input(self) -> bool:
+        """Whether the plan gives the model a sparse design matrix."""
+        return self._sparse
+
+    def transform(self, data: pd.DataFrame
+                  ) -> Union[np.ndarray, sparse.csr_matrix]:
+        """
+        Apply the training-time transforms to raw input data, with the
+        PreprocessingExecutor that built the training design matrix.
+
+        Args:
+            data (pd.DataFrame): The raw input features.
+
+        Returns:
+            Union[np.ndarray, sparse.csr_matrix]: The (rows, columns)
+            design matrix, identical to the one the model was trained on
+            for the same rows, and sparse if that one was.
+
+        Raises:
+            ValueError: If a one-hot encoded feature has a category that
+            was not seen in training. The other encodings put unseen
+            categories in the "other" column of top-k, or code them -1.
+        """
+        return PreprocessingExecutor().transform(
+            self._steps, data, sparse_output=self._sparse)
+
+    def predict(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Transform raw input data and predict with the model.
+
+        Args:
+            data (pd.DataFrame): The raw input features.
+
+        Returns:
+            np.ndarray: The predictions, in the units of the target for
+            a regression.
+        """
+        return unscale(self._target,
+                       self._model.predict(self.transform(data)))
@@ -0,0 +1,105 @@
+from typing import Any, Dict, List, Optional
+import time
+
+from autoop.core.ml.metric import Metric, MetricSuite
+from autoop.core.ml.model import (
+    CLASSIFICATION_MODELS,
+    REGRESSION_MODELS,
+    get_model
+)
+from autoop.core.ml.parallel import map_shared, shared
+from autoop.core.ml.pipeline import Pipeline
+from autoop.functional.preprocessing import unscale
+
+
+def leaderboard(
+        pipeline: Pipeline,
+        metric: Optional[Metric] = None,
+        models: Optional[List[str]] = None,
+        time_budget: Optional[float] = None,
+        n_jobs: Optional[int] = None
+        ) -> List[Dict[str, Any]]:
+    """
+    Train every model applicable to a pipeline's task on its encoded
+    training set and rank them on its test set.
+
+    The features are encoded and split once. The candidates are fitted in
+    parallel on a process pool sharing the design matrix, and the ones
+    still running when the time budget runs out are cancelled. The
+    pipeline's own model is not fitted.
+
+    Args:
+        pipeline (Pipeline): The pipeline giving the dataset, features,
+        split and metrics.
+        metric (Optional[Metric]): The metric to rank by. Defaults to the
+        first metric of the pipeline.
+        models (Optional[List[str]]): Names of the candidate models.
+        Defaults to all models of the pipeline's task type.
+        time_budget (Optional[float]): Seconds after which unfinished
+        candidates are cancelled. Defaults to no limit.
+        n_jobs (Optional[int]): Number of worker processes. None uses
+        every core.
+
+    Returns:
+        List[Dict[str, Any]]: A row per candidate, best first, with its
+        "model" name, "status" ("ok", "error" or "cancelled"), ranking
+        "score", "metrics" as (metric, result) tuples, "fit_time" in
+        seconds, and "error" message for failed candidates.
+    """
+    metrics = pipeline.metrics
+    metric = metric or metrics[0]
+    if metric.name not in [candidate.name for candidate in metrics]:
+        metrics = metrics + [metric]
+    if models is None:
+        models = CLASSIFICATION_MODELS \
+            if pipeline.model.type == "classification" else REGRESSION_MODELS
+    X, y, num_train = pipeline.encoded_split()
+    tasks = [(name, num_train, metrics, pipeline.target_scaler)
+             for name in models]
+    results = map_shared(_fit_candidate, tasks, X, y, n_jobs,
+                         timeout=time_budget)
+    rows = []
+    for name, result in zip(models, results):
+        row = {"model": name, "status": "cancelled", "score": None,
+               "metrics": [], "fit_time": None}
+        if result is not None:
+            row.update(result)
+            row["metrics"] = list(zip(metrics, result["metrics"]))
+            if result["status"] == "ok":
+                row["score"] = dict(zip([m.name for m in metrics],
+                                        result["metrics"]))[metric.name]
+        rows.append(row)
+    sign = -1 if metric.greater_is_better else 1
+    return sorted(rows, key=lambda row: (
+        row["score"] is None,
+        0 if row["score"] is None else sign * row["score"]))
+
+
+def _fit_candidate(task: tuple) -> Dict[str, Any]:
+    """
+    Fit a candidate model on the shared training rows and evaluate it on
+    the test rows. Runs in the worker processes of `leaderboard`.
+
+    Args:
+        task (tuple): The name of the model, the number of training rows,
+        the metrics, and the scaler of a regression target, see
+        Pipeline.target_scaler, to evaluate in the units of the target.
+
+    Returns:
+        Dict[str, Any]: The "status", "metrics" results and "fit_time"
+        of the candidate, and the "error" message if it failed.
+    """
+    name, num_train, metrics, target = task
+    X, y = shared()
+    start = time.perf_counter()
+    try:
+        model = get_model(name)
+        model.fit(X[:num_train], y[:num_train])
+        predictions = unscale(target, model.predict(X[num_train:]))
+        results = [float(result) for _, result in MetricSuite(
+            metrics).evaluate(unscale(target, y[num_train:]), predictions)]
+    except Exception as e:
+        return {"status": "error", "metrics": [], "error": str(e),
+                "fit_time": time.perf_counter() - start}
+    return {"status": "ok", "metrics": results,
+            "fit_time": time.perf_counter() - start}
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from copy import deepcopy
+from typing import Any, Dict, List, Tuple
 import numpy as np
 
 
@@ -36,25 +37,37 @@ def get_metric(name: str) -> Any:
     return metrics.get(name, None)
 
 
+BLOCK_SIZE = 65536  # rows per block of the chunked residual sums
+
+
 class Metric(ABC):
     """Base class for all metrics.
     """
-    def __init__(self, name: str, description: str = None):
+    def __init__(self, name: str, description: str = None,
+                 greater_is_better: bool = False):
         """
         Initialize a metric.
 
         Args:
             name (str): str name of the metric.
             description (str, optional): str description of the metric.
+            greater_is_better (bool, optional): whether higher results are
+            better, as for scores, rather than worse, as for errors.
         """
         self._name = name
         self._description = description
+        self._greater_is_better = greater_is_better
 
     @property
     def name(self) -> str:
         """Expose the name of the metric."""
         return self._name
 
+    @property
+    def greater_is_better(self) -> bool:
+        """Whether higher results of the metric are better."""
+        return self._greater_is_better
+
     def __str__(self) -> str:
         """Return a string representation of the object.
 
@@ -75,8 +88,163 @@ class Metric(ABC):
         """
         pass
 
+    def accumulator(self) -> "MetricAccumulator":
+        """Start computing the metric incrementally, chunk by chunk.
+        Returns:
+            MetricAccumulator: An accumulator whose result is identical
+            to evaluating the metric on all the chunks at once
+        """
+        return MetricAccumulator(self)
+
+
+class _CompensatedSum():
+    def __init__(self):
+        """
+        A running sum with Neumaier compensation, so adding many partial
+        sums of different magnitudes loses no precision.
+        """
+        self._total = 0.0
+        self._compensation = 0.0
+
+    def add(self, value: float) -> None:
+        """Add a value to the sum."""
+        value = float(value)
+        total = self._total + value
+        if abs(self._total) >= abs(value):
+            self._compensation += (self._total - total) + value
+        else:
+            self._compensation += (value - total) + self._total
+        self._total = total
+
+    @property
+    def value(self) -> float:
+        """The compensated sum."""
+        return self._total + self._compensation
+
+
+class ResidualAccumulator():
+    def __init__(self):
+        """
+        Accumulate the sums the regression metrics derive from: the count
+        of rows, and the sums of the absolute and of the squared residuals.
+
+        The residuals are computed into a reused buffer of BLOCK_SIZE
+        rows, so no temporary array larger than a block is allocated.
+        Each full block is summed, and the block sums are accumulated
+        with Neumaier compensation. Rows are grouped into blocks by their
+        position in the whole stream, however it is chunked, so the sums
+        are identical to those of a single update with all the rows.
+        """
+        self._residuals = np.empty(BLOCK_SIZE, dtype=float)
+        self._scratch = np.empty(BLOCK_SIZE, dtype=float)
+        self._pending = 0
+        self._count = 0
+        self._abs_sum = _CompensatedSum()
+        self._squared_sum = _CompensatedSum()
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray) -> None:
+        """Add the residuals of a chunk of rows.
+        Args:
+            y_true (np.ndarray): Ground truth values of the chunk
+            y_pred (np.ndarray): Predicted values of the chunk
+        Raises:
+            ValueError: If y_true and y_pred have different lengths
+        """
+        y_true = np.ravel(y_true)
+        y_pred = np.ravel(y_pred)
+        if len(y_true) != len(y_pred):
+            raise ValueError("The lengths of y_true and y_pred must match.")
+        self._count += len(y_true)
+        start = 0
+        while start < len(y_true):
+            # fill the current block, which may hold rows of past chunks
+            stop = min(start + BLOCK_SIZE - self._pending, len(y_true))
+            np.subtract(y_true[start:stop], y_pred[start:stop],
+                        out=self._residuals[self._pending:
+                                            self._pending + stop - start])
+            self._pending += stop - start
+            start = stop
+            if self._pending == BLOCK_SIZE:
+                self._add_block(self._abs_sum, self._squared_sum)
+                self._pending = 0
+
+    def _add_block(self, abs_sum: _CompensatedSum,
+                   squared_sum: _CompensatedSum) -> None:
+        """Add the sums of the current block to the given sums."""
+        block = self._residuals[:self._pending]
+        scratch = self._scratch[:self._pending]
+        abs_sum.add(np.abs(block, out=scratch).sum())
+        squared_sum.add(np.multiply(block, block, out=scratch).sum())
+
+    def result(self) -> Dict[str, Any]:
+        """Get the sums of all the rows so far. More rows can be added
+        afterwards.
+        Returns:
+            Dict[str, Any]: The "count", "abs_sum" and "squared_sum"
+        """
+        abs_sum = deepcopy(self._abs_sum)
+        squared_sum = deepcopy(self._squared_sum)
+        if self._pending:
+            self._add_block(abs_sum, squared_sum)
+        return {"count": self._count, "abs_sum": abs_sum.value,
+                "squared_sum": squared_sum.value}
+
+
+def residual_sums(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, Any]:
+    """
+    Compute the sums the regression metrics derive from: the count of
+    rows, and the sums of the absolute and of the squared residuals.
+    See ResidualAccumulator.
+
+    Args:
+        y_true (np.ndarray): Ground truth values
+        y_pred (np.ndarray): Predicted values
+
+    Returns:
+        Dict[str, Any]: The "count", "abs_sum" and "squared_sum"
+
+    Raises:
+        ValueError: If y_true and y_pred have different lengths
+    """
+    sums = ResidualAccumulator()
+    sums.update(y_true, y_pred)
+    return sums.result()
+
+
+def _mean(sums: Dict[str, Any], key: str) -> float:
+    """Divide one of the residual sums by the count, NaN without rows."""
+    return sums[key] / sums["count"] if sums["count"] else float("nan")
+
+
+class RegressionMetric(Metric):
+    """Base class for metrics derived from the sums of the residuals, so
+    that several of them can share one pass over the data. The sums may
+    also be arrays, to evaluate many resamples at once.
+    """
+    def evaluate(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
+        """Compute the metric from the residual sums of the ground truth
+        and the predictions.
+        Args:
+            y_true (np.ndarray): Ground truth values
+            y_pred (np.ndarray): Predicted values
+        Returns:
+            float: Calculated metric as real number
+        """
+        return self.from_residuals(residual_sums(y_true, y_pred))
+
+    @abstractmethod
+    def from_residuals(self, sums: Dict[str, Any]) -> float:
+        """Compute the metric from residual sums.
+        Args:
+            sums (Dict[str, Any]): The "count", "abs_sum" and
+            "squared_sum" of the residuals, as given by residual_sums
+        Returns:
+            float: Calculated metric as real number
+        """
+        pass
+
 
-class MeanAbsoluteError(Metric):
+class MeanAbsoluteError(RegressionMetric):
     def __init__(self):
         """
         Initialize the MeanAbsoluteError metric.
@@ -93,22 +261,21 @@ class MeanAbsoluteError(Metric):
             average absolute difference"
             )
 
-    def evaluate(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    def from_residuals(self, sums: Dict[str, Any]) -> float:
         """Compute the mean absolute difference between the ground truth
         and the predictions.
 
         Args:
-            y_true (np.ndarray): Ground truth values
-            y_pred (np.ndarray): Predicted values
+            sums (Dict[str, Any]): The residual sums
 
         Returns:
             float: The mean absolute difference between the ground truth
             and the predictions
         """
-        return np.mean(np.abs(y_true - y_pred))
+        return _mean(sums, "abs_sum")
 
 
-class MeanSquaredError(Metric):
+class MeanSquaredError(RegressionMetric):
     def __init__(self):
         """
         Initialize the MeanSquaredError metric.
@@ -124,22 +291,21 @@ class MeanSquaredError(Metric):
             description="Measures the average squared difference"
             )
 
-    def evaluate(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    def from_residuals(self, sums: Dict[str, Any]) -> float:
         """Compute the mean squared difference between the ground truth
         and the predictions.
 
         Args:
-            y_true (np.ndarray): Ground truth values
-            y_pred (np.ndarray): Predicted values
+            sums (Dict[str, Any]): The residual sums
 
         Returns:
             float: The mean squared difference between the ground truth
             and the predictions
         """
-        return np.mean((y_true - y_pred) ** 2)
+        return _mean(sums, "squared_sum")
 
 
-class RootMeanSquaredError(Metric):
+class RootMeanSquaredError(RegressionMetric):
     def __init__(self):
         """
         Initialize the RootMeanSquaredError metric.
@@ -156,24 +322,139 @@ class RootMeanSquaredError(Metric):
             of the average squared difference"
             )
 
-    def evaluate(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    def from_residuals(self, sums: Dict[str, Any]) -> float:
         """Compute the root mean squared difference between the ground truth
         and the predictions.
 
         Args:
-            y_true (np.ndarray): Ground truth values
-            y_pred (np.ndarray): Predicted values
+            sums (Dict[str, Any]): The residual sums
 
         Returns:
             float: The root mean squared difference between the ground truth
             and the predictions
         """
-        mse = np.mean((y_true - y_pred) ** 2)
-        rmse = np.sqrt(mse)
-        return rmse
+        return np.sqrt(_mean(sums, "squared_sum"))
+
+
+def confusion_matrix(
+        y_true: np.ndarray,
+        y_pred: np.ndarray
+        ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count the predictions of every label for every true label.
 
+    The labels are encoded once, and all the counts are made in a single
+    pass with np.bincount over the pair codes.
+
+    Parameters
+    ----------
+    y_true : np.ndarray
+        Ground truth labels
+    y_pred : np.ndarray
+        Predicted labels
 
-class Accuracy(Metric):
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The (k, k) matrix whose entry [i, j] counts the rows of true label
+        i predicted as label j, and the k sorted labels
+
+    Raises
+    ------
+    ValueError
+        If y_true and y_pred have different lengths
+    """
+    y_true = np.ravel(y_true)
+    y_pred = np.ravel(y_pred)
+    if len(y_true) != len(y_pred):
+        raise ValueError("The lengths of y_true and y_pred must match.")
+    labels, codes = np.unique(np.concatenate([y_true, y_pred]),
+                              return_inverse=True)
+    codes = codes.ravel()
+    k = len(labels)
+    pairs = codes[:len(y_true)] * k + codes[len(y_true):]
+    matrix = np.bincount(pairs, minlength=k * k).reshape(k, k)
+    return matrix, labels
+
+
+class ConfusionAccumulator():
+    def __init__(self):
+        """
+        Accumulate the confusion matrix of chunks of labels. Each label
+        gets a code when first seen, and the counts are reordered to the
+        sorted labels when the result is asked for, so it is identical to
+        confusion_matrix of all the rows.
+        """
+        self._codes = {}
+        self._counts = np.zeros((0, 0), dtype=np.int64)
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray) -> None:
+        """Count the labels of a chunk of rows.
+        Args:
+            y_true (np.ndarray): Ground truth labels of the chunk
+            y_pred (np.ndarray): Predicted labels of the chunk
+        Raises:
+            ValueError: If y_true and y_pred have different lengths
+        """
+        matrix, labels = confusion_matrix(y_true, y_pred)
+        codes = np.array([self._codes.setdefault(label, len(self._codes))
+                          for label in labels.tolist()], dtype=np.intp)
+        k = len(self._codes)
+        if k > len(self._counts):
+            counts = np.zeros((k, k), dtype=np.int64)
+            counts[:len(self._counts), :len(self._counts)] = self._counts
+            self._counts = counts
+        self._counts[np.ix_(codes, codes)] += matrix
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the confusion matrix of all the rows so far.
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The matrix, true labels on the
+            rows, and the sorted labels
+        """
+        labels = np.array(list(self._codes))
+        order = np.argsort(labels, kind="stable")
+        return self._counts[np.ix_(order, order)], labels[order]
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Divide element-wise, with 0 where the denominator is 0."""
+    return np.divide(numerator, denominator,
+                     out=np.zeros(np.shape(numerator), dtype=float),
+                     where=denominator != 0)
+
+
+class ClassificationMetric(Metric):
+    """Base class for metrics derived from the confusion matrix, so that
+    several of them can share one. They also accept a stack of confusion
+    matrices, to evaluate many resamples at once.
+    """
+    def evaluate(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
+        """Compute the metric from the confusion matrix of the ground
+        truth and the predictions.
+        Args:
+            y_true (np.ndarray): Ground truth labels
+            y_pred (np.ndarray): Predicted labels
+        Returns:
+            float: Calculated metric as real number
+        """
+        return self.from_confusion(confusion_matrix(y_true, y_pred)[0])
+
+    @abstractmethod
+    def from_confusion(self, matrix: np.ndarray) -> float:
+        """Compute the metric from a confusion matrix.
+        Args:
+            matrix (np.ndarray): The confusion matrix, true labels on the
+            rows and predicted labels on the columns, or a (..., k, k)
+            stack of confusion matrices
+        Returns:
+            float: Calculated metric as real number, or an array of the
+            metric of each matrix of a stack
+        """
+        pass
+
+
+class Accuracy(ClassificationMetric):
     def __init__(self):
         """
         Initialize the Accuracy metric.
@@ -188,25 +469,22 @@ class Accuracy(Metric):
         super().__init__(
             name="accuracy",
             description="measures the proportion of\
-            correctly determined features"
+            correctly determined features",
+            greater_is_better=True
             )
 
-    def evaluate(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
-        """Compute the accuracy between the ground truth and the predictions.
+    def from_confusion(self, matrix: np.ndarray) -> float:
+        """Compute the accuracy: the share of the counts on the diagonal.
 
         Args:
-            y_true (np.ndarray): Ground truth values
-            y_pred (np.ndarray): Predicted values
+            matrix (np.ndarray): The confusion matrix, or a stack of them
 
         Returns:
-            float: The accuracy between the ground truth and the predictions
+            float: The accuracy, 0 if there are no predictions
         """
-        if len(y_true) != len(y_pred):
-            raise ValueError("The lengths of y_true and y_pred must match.")
-        assert y_true.shape == y_pred.shape, f"Shape mismatch: {y_true.shape}\
-            vs {y_pred.shape}"
-
-        return np.sum(y_true == y_pred) / len(y_true)
+        accuracy = _ratio(np.trace(matrix, axis1=-2, axis2=-1),
+                          matrix.sum(axis=(-2, -1)))
+        return accuracy if accuracy.ndim else float(accuracy)
 
 
 def precision_recall(
@@ -233,29 +511,44 @@ def precision_recall(
         The weighted precision or recall between the ground truth
         and the predictions
     """
+    return weighted_precision_recall(type,
+                                     confusion_matrix(y_true, y_pred)[0])
 
-    classes = np.unique(y_true)
-    total_weight = y_true.size
-    result = 0
-    weighted_result = 0
 
-    for cls in classes:
-        true_positives = np.sum((y_pred == cls) & (y_true == cls))
-        if type == "recall":
-            false_pos_neg = np.sum((y_pred != cls) & (y_true == cls))
-        elif type == "precision":
-            false_pos_neg = np.sum((y_pred == cls) & (y_true != cls))
-        try:
-            result = true_positives/(true_positives+false_pos_neg)
-        except ZeroDivisionError:
-            result = 0
-        weight = np.sum(y_true == cls)
+def weighted_precision_recall(type: str, matrix: np.ndarray) -> float:
+    """
+    Compute the weighted precision or recall from a confusion matrix.
 
-        weighted_result += (result * weight) / total_weight
-    return weighted_result
+    The precision (or recall) of each label is weighted by the share of
+    the rows that truly have the label. Labels that are never predicted
+    have a precision of 0, as do labels that never occur a recall of 0.
 
+    Parameters
+    ----------
+    type : str
+        The type of metric to compute. It can be either 'precision' or 'recall'
+    matrix : np.ndarray
+        The confusion matrix, true labels on the rows, or a (..., k, k)
+        stack of confusion matrices
 
-class WeightedPrecision(Metric):
+    Returns
+    -------
+    float
+        The weighted precision or recall, or an array of them for a stack
+    """
+    true_positives = np.diagonal(matrix, axis1=-2, axis2=-1)
+    support = matrix.sum(axis=-1)
+    if type == "recall":
+        per_label = _ratio(true_positives, support)
+    elif type == "precision":
+        per_label = _ratio(true_positives, matrix.sum(axis=-2))
+    else:
+        raise ValueError(f"{type} is neither precision nor recall")
+    result = _ratio((per_label * support).sum(axis=-1), support.sum(axis=-1))
+    return result if result.ndim else float(result)
+
+
+class WeightedPrecision(ClassificationMetric):
     def __init__(self):
         """
         Initializes a WeightedPrecision metric.
@@ -272,30 +565,29 @@ class WeightedPrecision(Metric):
         super().__init__(
             name="weighted_precision",
             description="calculates the weighted\
-            true positive proportion"
+            true positive proportion",
+            greater_is_better=True
             )
 
-    def evaluate(self, y_true, y_pred) -> float:
+    def from_confusion(self, matrix: np.ndarray) -> float:
         """
-        Evaluate the weighted precision metric using the
-        precision_recall function.
+        Evaluate the weighted precision metric from a confusion matrix
+        using the weighted_precision_recall function.
 
         Parameters
         ----------
-        y_true : np.ndarray
-        The true labels of the data
-        y_pred : np.ndarray
-        The predicted labels of the data
+        matrix : np.ndarray
+        The confusion matrix of the data
 
         Returns
         -------
         float
             The weighted precision score
         """
-        return precision_recall("precision", y_true, y_pred)
+        return weighted_precision_recall("precision", matrix)
 
 
-class WeightedRecall(Metric):
+class WeightedRecall(ClassificationMetric):
     def __init__(self):
         """
         Initializes a WeightedRecall metric.
@@ -312,24 +604,169 @@ class WeightedRecall(Metric):
         super().__init__(
             name="weighted_recall",
             description="calculates the weighted\
-            true positive rate"
+            true positive rate",
+            greater_is_better=True
             )
 
-    def evaluate(self, y_true, y_pred) -> float:
+    def from_confusion(self, matrix: np.ndarray) -> float:
         """
-        Evaluates the weighted recall metric using the
-        precision_recall function.
+        Evaluates the weighted recall metric from a confusion matrix
+        using the weighted_precision_recall function.
 
         Parameters
         ----------
-        y_true : np.ndarray
-        The true labels of the data
-        y_pred : np.ndarray
-        The predicted labels of the data
+        matrix : np.ndarray
+        The confusion matrix of the data
 
         Returns
         -------
         float
             The weighted recall metric
         """
-        return precision_recall("recall", y_true, y_pred)
+        return weighted_precision_recall("recall", matrix)
+
+
+class MetricSuite():
+    def __init__(self, metrics: List[Metric]):
+        """
+        Evaluate several metrics together, computing what they share once:
+        the residual sums of the regression metrics and the confusion
+        matrix of the classification metrics.
+
+        Args:
+            metrics (List[Metric]): The metrics to evaluate.
+        """
+        self._metrics = list(metrics)
+
+    @property
+    def metrics(self) -> List[Metric]:
+        """The metrics of the suite."""
+        return self._metrics
+
+    def evaluate(self, y_true: np.ndarray,
+                 y_pred: np.ndarray) -> List[Tuple[Metric, float]]:
+        """Compute all the metrics given ground truth and predictions.
+        Args:
+            y_true (np.ndarray): Ground truth values
+            y_pred (np.ndarray): Predicted values
+        Returns:
+            List[Tuple[Metric, float]]: Each metric with its result, in
+            the order of the suite
+        """
+        sums = matrix = None
+        results = []
+        for metric in self._metrics:
+            if isinstance(metric, RegressionMetric):
+                if sums is None:
+                    sums = residual_sums(y_true, y_pred)
+                result = metric.from_residuals(sums)
+            elif isinstance(metric, ClassificationMetric):
+                if matrix is None:
+                    matrix = confusion_matrix(y_true, y_pred)[0]
+                result = metric.from_confusion(matrix)
+            else:
+                result = metric.evaluate(y_true, y_pred)
+            results.append((metric, result))
+        return results
+
+    def accumulator(self) -> "SuiteAccumulator":
+        """Start computing the metrics incrementally, chunk by chunk.
+        Returns:
+            SuiteAccumulator: An accumulator whose results are identical
+            to evaluating the suite on all the chunks at once
+        """
+        return SuiteAccumulator(self._metrics)
+
+
+def evaluate_many(metrics: List[Metric], y_true: np.ndarray,
+                  y_pred: np.ndarray) -> List[Tuple[Metric, float]]:
+    """
+    Compute several metrics given ground truth and predictions, sharing
+    their intermediate results. See MetricSuite.
+
+    Args:
+        metrics (List[Metric]): The metrics to evaluate
+        y_true (np.ndarray): Ground truth values
+        y_pred (np.ndarray): Predicted values
+
+    Returns:
+        List[Tuple[Metric, float]]: Each metric with its result
+    """
+    return MetricSuite(metrics).evaluate(y_true, y_pred)
+
+
+class SuiteAccumulator():
+    def __init__(self, metrics: List[Metric]):
+        """
+        Compute several metrics incrementally, chunk by chunk, sharing
+        one residual accumulator between the regression metrics and one
+        confusion accumulator between the classification metrics. Other
+        metrics keep the chunks and are evaluated on all of them.
+
+        Args:
+            metrics (List[Metric]): The metrics to compute.
+        """
+        self._metrics = list(metrics)
+        self._residuals = ResidualAccumulator() if any(
+            isinstance(metric, RegressionMetric)
+            for metric in self._metrics) else None
+        self._confusion = ConfusionAccumulator() if any(
+            isinstance(metric, ClassificationMetric)
+            for metric in self._metrics) else None
+        self._chunks = [] if any(
+            not isinstance(metric, (RegressionMetric, ClassificationMetric))
+            for metric in self._metrics) else None
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray) -> None:
+        """Add a chunk of rows.
+        Args:
+            y_true (np.ndarray): Ground truth values of the chunk
+            y_pred (np.ndarray): Predicted values of the chunk
+        """
+        if self._residuals is not None:
+            self._residuals.update(y_true, y_pred)
+        if self._confusion is not None:
+            self._confusion.update(y_true, y_pred)
+        if self._chunks is not None:
+            self._chunks.append((np.ravel(y_true), np.ravel(y_pred)))
+
+    def result(self) -> List[Tuple[Metric, float]]:
+        """Compute the metrics on all the rows so far.
+        Returns:
+            List[Tuple[Metric, float]]: Each metric with its result
+        """
+        sums = None if self._residuals is None else self._residuals.result()
+        matrix = None if self._confusion is None \
+            else self._confusion.result()[0]
+        results = []
+        for metric in self._metrics:
+            if isinstance(metric, RegressionMetric):
+                result = metric.from_residuals(sums)
+            elif isinstance(metric, ClassificationMetric):
+                result = metric.from_confusion(matrix)
+            else:
+                y_true, y_pred = zip(*self._chunks) if self._chunks \
+                    else ([np.empty(0)], [np.empty(0)])
+                result = metric.evaluate(np.concatenate(y_true),
+                                         np.concatenate(y_pred))
+            results.append((metric, result))
+        return results
+
+
+class MetricAccumulator(SuiteAccumulator):
+    def __init__(self, metric: Metric):
+        """
+        Compute a metric incrementally, with update(y_true, y_pred) for
+        each chunk of rows and result() at the end.
+
+        Args:
+            metric (Metric): The metric to compute.
+        """
+        super().__init__([metric])
+
+    def result(self) -> float:
+        """Compute the metric on all the rows so far.
+        Returns:
+            float: Calculated metric as real number
+        """
+        return super().result()[0][1]
@@ -22,14 +22,24 @@ CLASSIFICATION_MODELS = [
 ]  # add your models as str here
 
 
-def get_model(model_name: str) -> Model:
-    """Factory function to get a model by name."""
+def get_model(model_name: str, **params) -> Model:
+    """Factory function to get a model by name.
+
+    Args:
+        model_name (str): str name of the model
+        **params: hyperparameters passed to the model
+
+    Returns:
+        Model: a new model instance given its str name. If name is not
+        found, returns None.
+    """
     models = {
-        "multiple_linear_regression": MultipleLinearRegression(),
-        "lasso_regression": LassoRegression(),
-        "ridge_regression": RidgeRegression(),
-        "k_neighbours_classification": KNearestClassifier(),
-        "support_vector_classification": SupportVectorClassifier(),
-        "decision_tree_classification": DTreeClassifier()
+        "multiple_linear_regression": MultipleLinearRegression,
+        "lasso_regression": LassoRegression,
+        "ridge_regression": RidgeRegression,
+        "k_neighbours_classification": KNearestClassifier,
+        "support_vector_classification": SupportVectorClassifier,
+        "decision_tree_classification": DTreeClassifier
     }
-    return models.get(model_name, None)
+    model = models.get(model_name, None)
+    return None if model is None else model(**params)
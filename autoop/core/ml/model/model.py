@@ -1,6 +1,7 @@
 from abc import abstractmethod
 import numpy as np
-from typing import Literal
+from scipy import sparse
+from typing import Literal, Union
 
 
 from autoop.core.ml.artifact import Artifact
@@ -9,7 +10,8 @@ from autoop.core.ml.artifact import Artifact
 class Model:
     def __init__(
             self,
-            type: Literal["classification", "regression"]
+            type: Literal["classification", "regression"],
+            accepts_sparse: bool = False
                  ):
         """
         Initializes a Model instance.
@@ -19,6 +21,9 @@ class Model:
         type : Literal["classification", "regression"]
             The type of model, specifying whether it is a classification
             or regression model.
+        accepts_sparse : bool
+            Whether the model can fit and predict on scipy sparse
+            matrices. Sparse input is densified for models that cannot.
         model : Model
             The model class to be instantiated.
         *args :
@@ -28,6 +33,7 @@ class Model:
         """
         self._parameters: dict = {}
         self._type = type
+        self._accepts_sparse = accepts_sparse
 
     @property
     def type(self) -> str:
@@ -41,6 +47,39 @@ class Model:
         """
         return self._type
 
+    @property
+    def accepts_sparse(self) -> bool:
+        """
+        Returns whether the model accepts sparse input.
+
+        Returns
+        -------
+        bool
+            True if the model can fit and predict on scipy sparse
+            matrices without densifying them.
+        """
+        return self._accepts_sparse
+
+    def _input(self, X: Union[np.ndarray, sparse.spmatrix]
+               ) -> Union[np.ndarray, sparse.spmatrix]:
+        """
+        Converts input to a representation the model accepts: sparse
+        matrices are densified only if the model does not accept them.
+
+        Parameters
+        ----------
+        X : Union[np.ndarray, sparse.spmatrix]
+            The observations.
+
+        Returns
+        -------
+        Union[np.ndarray, sparse.spmatrix]
+            The observations, dense unless the model accepts sparse input.
+        """
+        if sparse.issparse(X) and not self._accepts_sparse:
+            return X.toarray()
+        return X
+
     @abstractmethod
     def parameters(self):
         """
@@ -118,9 +157,11 @@ class SklearnWrapperModel(Model):
     def __init__(
             self, 
             model,
-            type: Literal["classification", "regression"]
+            type: Literal["classification", "regression"],
+            accepts_sparse: bool = True
             ):
-        super().__init__(type)
+        # the wrapped scikit-learn estimators all take sparse input
+        super().__init__(type, accepts_sparse)
         self._model = model
     
     @property
@@ -134,11 +175,11 @@ class SklearnWrapperModel(Model):
         Parameters
         ----------
         X : np.ndarray
-            2D array of input features.
+            2D array, or sparse matrix, of input features.
         y : np.ndarray
             1D array of target variable.
         """
-        self._model.fit(X, y)
+        self._model.fit(self._input(X), y)
 
     def predict(self, X: np.ndarray) -> np.ndarray:
         """
@@ -147,14 +188,14 @@ class SklearnWrapperModel(Model):
         Parameters
         ----------
         X : np.ndarray
-            2D array of input features.
+            2D array, or sparse matrix, of input features.
 
         Returns
         -------
         np.ndarray
             Predicted values.
         """
-        return self._model.predict(X)
+        return self._model.predict(self._input(X))
 
     def __str__(self) -> str:
         return f"SklearnWrapperModel(model={self._model})"
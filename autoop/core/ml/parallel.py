@@ -0,0 +1,95 @@
+from multiprocessing import Pool, TimeoutError
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+import os
+import time
+
+import numpy as np
+
+
+_shared = {}  # the arrays shared with the tasks of the current process
+
+
+def _share(X: np.ndarray, y: np.ndarray) -> None:
+    """
+    Store the arrays the tasks of this process work on. Used as the
+    initializer of the worker processes.
+
+    Args:
+        X (np.ndarray): The design matrix.
+        y (np.ndarray): The target vector.
+    """
+    _shared["X"] = X
+    _shared["y"] = y
+
+
+def shared() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the arrays shared with the tasks of this process.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The design matrix and the target
+        vector.
+    """
+    return _shared["X"], _shared["y"]
+
+
+def map_shared(
+        function: Callable[[Any], Any],
+        tasks: Iterable[Any],
+        X: np.ndarray,
+        y: np.ndarray,
+        n_jobs: Optional[int] = None,
+        timeout: Optional[float] = None
+        ) -> List[Any]:
+    """
+    Run a function over tasks on a process pool, sharing a design matrix
+    and target vector with all of them.
+
+    The arrays are handed to each worker once, when it starts, rather
+    than with every task: with the fork start method the workers inherit
+    them without any copy. Tasks therefore only carry what differs
+    between them, such as row indices, and the function reads the arrays
+    with `shared()`. It must be defined at module level so it can be
+    sent to the workers.
+
+    Args:
+        function (Callable[[Any], Any]): The function run on each task.
+        tasks (Iterable[Any]): The tasks.
+        X (np.ndarray): The design matrix.
+        y (np.ndarray): The target vector.
+        n_jobs (Optional[int]): Number of worker processes. None uses
+        every core, 1 runs the tasks in this process.
+        timeout (Optional[float]): Seconds after which unfinished tasks
+        are cancelled, by terminating the workers. In this process a
+        running task cannot be interrupted, so only the tasks that have
+        not started are cancelled. Defaults to no limit.
+
+    Returns:
+        List[Any]: The result of each task, in order, or None for the
+        tasks that were cancelled.
+    """
+    tasks = list(tasks)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    if n_jobs <= 1:
+        _share(X, y)
+        try:
+            return [
+                None if deadline is not None and time.monotonic() > deadline
+                else function(task)
+                for task in tasks
+            ]
+        finally:
+            _shared.clear()
+    # leaving the block terminates the pool, killing unfinished tasks
+    with Pool(n_jobs, initializer=_share, initargs=(X, y)) as pool:
+        pending = [pool.apply_async(function, (task,)) for task in tasks]
+        results = []
+        for result in pending:
+            remaining = None if deadline is None \
+                else max(deadline - time.monotonic(), 0)
+            try:
+                results.append(result.get(remaining))
+            except TimeoutError:
+                results.append(None)
+        return results
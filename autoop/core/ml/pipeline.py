@@ -1,13 +1,27 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 import pickle
 
 from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.bootstrap import bootstrap
+from autoop.core.ml.inference import InferencePlan
 from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.model import Model
 from autoop.core.ml.feature import Feature
-from autoop.core.ml.metric import Metric
-from autoop.functional.preprocessing import preprocess_features
+from autoop.core.ml.metric import Metric, MetricSuite
+from autoop.core.ml.parallel import map_shared, shared
+from autoop.functional.preprocessing import (
+    PreprocessingExecutor,
+    step_width,
+    unscale
+)
+from autoop.functional.split import (
+    holdout_split,
+    kfold_split,
+    stratified_kfold_split,
+    stratified_split
+)
 import numpy as np
+from scipy import sparse
 from copy import deepcopy
 
 
@@ -19,6 +33,9 @@ class Pipeline():
                  input_features: List[Feature],
                  target_feature: Feature,
                  split: float = 0.8,
+                 seed: Optional[int] = None,
+                 bootstrap: int = 0,
+                 sparse_threshold: float = 0.3,
                  ):
         self._dataset = dataset
         self._model = model
@@ -27,6 +44,9 @@ class Pipeline():
         self._metrics = metrics
         self._artifacts = {}
         self._split = split
+        self._seed = seed
+        self._bootstrap = bootstrap
+        self._sparse_threshold = sparse_threshold
         if target_feature.type == "categorical"\
                 and model.type != "classification":
             raise ValueError("Model type must be classification for \
@@ -50,6 +70,9 @@ class Pipeline():
                 input_features={list(map(str, self._input_features))},
                 target_feature={str(self._target_feature)},
                 split={self._split},
+                seed={self._seed},
+                bootstrap={self._bootstrap},
+                sparse_threshold={self._sparse_threshold},
                 metrics={list(map(str, self._metrics))},
             )
             """
@@ -66,6 +89,35 @@ class Pipeline():
         """
         return self._model
 
+    @property
+    def metrics(self) -> List[Metric]:
+        """
+        Returns the metrics the pipeline evaluates.
+
+        Returns
+        -------
+        List[Metric]
+            The metrics, the first of which ranks and tunes the model.
+        """
+        return self._metrics
+
+    @property
+    def target_scaler(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the fitted step the target of a regression is standardized
+        with, see unscale. The model is trained on, and predicts, the
+        standardized target, while metrics are reported in its units.
+
+        Returns
+        -------
+        Optional[Dict[str, Any]]
+            The StandardScaler step, or None for a classification or
+            before the features are preprocessed.
+        """
+        if self.model.type != "regression":
+            return None
+        return self._artifacts.get(self._target_feature.name)
+
     @property
     def artifacts(self) -> List[Artifact]:
         """
@@ -75,18 +127,16 @@ class Pipeline():
         artifacts = []
         for name, artifact in self._artifacts.items():
             artifact_type = artifact.get("type")
-            if artifact_type in ["OneHotEncoder"]:
-                data = artifact["encoder"]
-                data = pickle.dumps(data)
-                artifacts.append(Artifact(name=name, data=data))
-            if artifact_type in ["StandardScaler"]:
-                data = artifact["scaler"]
-                data = pickle.dumps(data)
+            if artifact_type in ["OneHotEncoder", "FeatureHasher",
+                                 "TopKEncoder", "OrdinalEncoder",
+                                 "StandardScaler"]:
+                data = pickle.dumps(artifact)
                 artifacts.append(Artifact(name=name, data=data))
         pipeline_data = {
             "input_features": self._input_features,
             "target_feature": self._target_feature,
             "split": self._split,
+            "seed": self._seed,
         }
         artifacts.append(Artifact(
             name="pipeline_config",
@@ -110,123 +160,37 @@ class Pipeline():
 
     def _preprocess_features(self) -> None:
         """
-        Preprocesses the features and registers the artifacts
-        generated during the preprocessing process.
-        The preprocessed data is stored in instance variables
-        _input_vectors and _output_vector.
-        """
-        (target_feature_name, target_data, artifact) = preprocess_features(
-            [self._target_feature],
-            self._dataset
-            )[0]
-        self._register_artifact(target_feature_name, artifact)
-        input_results = preprocess_features(self._input_features,
-                                            self._dataset)
-        for (feature_name, data, artifact) in input_results:
-            self._register_artifact(feature_name, artifact)
-        # Get the input vectors and output vector,
-        # sort by feature name for consistency
-        self._output_vector = target_data
-        self._input_vectors = [
-            data for (feature_name, data, artifact) in input_results
-            ]
-
-    def _ordered_set(self) -> list[str]:
-        raw = self._dataset.read()
-        self._output_vector = raw[self._target_feature.name].values
-        labels = []
-        val_temp = deepcopy(self._output_vector).tolist()
-        while len(val_temp) > len(labels):
-            label = val_temp[0]
-            if label not in labels:
-                labels.append(label)
-
-            c = val_temp.count(label)
-            for _ in range(c):
-                val_temp.remove(label)
-        return labels
-
-    def _split_classification(self) -> None:
-        """
-        Splits the preprocessed data into training and test sets according to
-        the split fraction.
-        The split is done in a stratified manner for classification tasks.
-
-        The input data is split into training and
-        test sets based on the split fraction.
-        The output vector is split in the same manner.
-
-        The split is done by first finding the labels in the output vector,
-        and then splitting each label's data points into training and
-        test sets. The split is done in a stratified manner by
-        splitting the data points for each label in proportion
-        to the split fraction.
-
-        The training and test sets are then created by
-        concatenating the split data points for each label.
-        """
-        self._train_X = [[] for _ in range(len(self._input_vectors))]
-        self._test_X = [[] for _ in range(len(self._input_vectors))]
-        self._train_y = []
-        self._test_y = []
-
-        labels = self._ordered_set()
-        values = []
-        for label in labels:
-            values.append([val for val in
-                           self._output_vector.tolist() if val == label])
-
-        start = 0
-        split = int(self._split * len(values[0]))
-        end = len(values[0])
-
-        for label in range(len(labels)):
-            for vector in range(len(self._input_vectors)):
-                self._train_X[vector].extend(
-                    self._input_vectors[vector][start:start + split])
-                self._test_X[vector].extend(
-                    self._input_vectors[vector][start + split:end])
-
-            self._train_y.extend(self._output_vector[start:start + split])
-            self._test_y.extend(self._output_vector[start + split:end])
-
-            if label != len(labels) - 1:
-                start = end
-                split = int(self._split * len(values[label + 1]))
-                end += len(values[label + 1])
-
-        self._train_X = [np.array(x) for x in self._train_X]
-        self._test_X = [np.array(x) for x in self._test_X]
-        self._train_y = np.array(self._train_y)
-        self._test_y = np.array(self._test_y)
-
-    def _split_regression(self) -> None:
-        """
-        Splits the preprocessed data into training and test sets according
-        to the split fraction.
-
-        The split is done in a stratified manner if the task is classification.
-        """
-        split = self._split
-        raw = self._dataset.read()
-
-        self._train_X = [vector[:int(split * len(vector))]
-                         for vector in self._input_vectors]
-        self._test_X = [vector[int(split * len(vector)):]
-                        for vector in self._input_vectors]
-        if self._model.type == "classification":
-            self._output_vector = raw[self._target_feature.name].values
-            self._train_y = self._output_vector[:int(
-                split*len(self._output_vector))]
-            self._test_y = self._output_vector[int(
-                split*len(self._output_vector)):]
+        Fits the transforms of the features concurrently and registers
+        their fitted steps as artifacts.
+
+        The raw input columns are kept in _raw, to be transformed into
+        the design matrix once the order of the rows is known, and the
+        target is stored in _output_vector: scaled for regression, raw
+        labels for classification. Input steps are sorted by feature
+        name, which is the order of their columns.
+        """
+        target = self._target_feature
+        inputs = sorted(self._input_features,
+                        key=lambda feature: feature.name)
+        names = [feature.name for feature in inputs]
+        # only decode the columns that are preprocessed
+        raw = self._dataset.read(
+            columns=names + [name for name in [target.name]
+                             if name not in names])
+        executor = PreprocessingExecutor()
+        # scalers are fitted from the profile of ingested datasets
+        *steps, target_step = executor.fit(
+            inputs + [target], raw, self._dataset.metadata.get("columns"))
+        self._register_artifact(target.name, target_step)
+        for step in steps:
+            self._register_artifact(step["feature"], step)
+        self._input_steps = steps
+        self._raw = raw
+        if self.model.type == "regression":
+            self._output_vector = executor.transform([target_step],
+                                                     raw).ravel()
         else:
-            self._train_y = self._output_vector[
-                :int(split * len(self._output_vector))
-                ]
-            self._test_y = self._output_vector[
-                int(split * len(self._output_vector)):
-                ]
+            self._output_vector = raw[target.name].to_numpy()
 
     def _split_data(self) -> None:
         """
@@ -236,9 +200,12 @@ class Pipeline():
         testing set. The training set is used to train the model, while the
         testing set is used to evaluate the model.
 
-        The method calls either _split_classification or _split_regression
-        depending on the type of model. If the model type is neither
-        "classification" nor "regression", a TypeError is raised.
+        Classification data is split in a stratified manner on the raw
+        target labels, which the model is trained on. Regression data is
+        split as a whole. With a seed the rows are shuffled first,
+        otherwise the first rows (of each label) form the training set.
+        If the model type is neither "classification" nor "regression",
+        a TypeError is raised.
         """
         # We encountered problems with the dataset splitting,
         # instead of splitting the dataset in a stratified manner
@@ -247,17 +214,60 @@ class Pipeline():
         # an entirely new class was present, and overrepresented
         # in the testing data.
         #
-        # we thus modified the data splitting routine into two subroutines
-        # for classification and regression tasks.
-        # See the two class methods above.
-
+        # we thus split classification data per label.
+        self._check_model_type()
         if self.model.type == "classification":
-            self._split_classification()
-        elif self.model.type == "regression":
-            self._split_regression()
+            train, test = stratified_split(self._output_vector,
+                                           self._split, self._seed)
         else:
+            train, test = holdout_split(len(self._output_vector),
+                                        self._split, self._seed)
+        # the training rows come first, so both sets are views
+        self._build_design_matrix(np.concatenate([train, test]))
+        self._train_X = self._X[:len(train)]
+        self._test_X = self._X[len(train):]
+        self._train_y = self._y[:len(train)]
+        self._test_y = self._y[len(train):]
+
+    def _check_model_type(self) -> None:
+        """
+        Check that the model type is one the pipeline can split and
+        train on.
+
+        Raises:
+            TypeError: If the model type is neither "classification" nor
+            "regression".
+        """
+        if self.model.type not in ["classification", "regression"]:
             raise TypeError("This is not a valid model type.")
 
+    def _build_design_matrix(self, order: np.ndarray) -> None:
+        """
+        Transform the raw input columns into one 2D design matrix, with
+        the rows in the given order, and the output vector likewise.
+
+        The PreprocessingExecutor writes every feature straight into its
+        columns of the matrix, concurrently. If the density of the matrix
+        is below the pipeline's sparse_threshold (one-hot like encodings
+        of many levels), it is a sparse CSR matrix and stays sparse
+        through the split and into the model, which densifies it only if
+        it does not accept sparse input. The matrix and output are
+        stored in _X and _y, and the raw columns are released.
+
+        Parameters
+        ----------
+        order : np.ndarray
+            Indices of the rows, in their order in the matrix
+        """
+        steps = self._input_steps
+        width = sum(step_width(step) for step in steps)
+        # every step sets one cell per row
+        self._X = PreprocessingExecutor().transform(
+            steps, self._raw, rows=order,
+            sparse_output=len(steps) < self._sparse_threshold * width)
+        self._y = self._output_vector[order]
+        self._raw = None
+
     # the old data splitting method:
     # def _split_data(self) -> None:
     #     # Split the data into training and testing sets
@@ -284,68 +294,54 @@ class Pipeline():
     #         int(split * len(self._output_vector)):
     #         ]
 
-    def _compact_vectors(self, vectors: List[np.array]) -> np.array:
-        """
-        Compact the input vectors into a single 2D numpy array.
-
-        This method takes the list of input vectors and concatenates them
-        along the columns (axis=1) into a single 2D numpy array.
-
-        Parameters
-        ----------
-        vectors : List[np.array]
-            List of input vectors to be compacted
-
-        Returns
-        -------
-        np.array
-            Compact 2D numpy array
-        """
-        return np.concatenate(vectors, axis=1)
-
     def _train(self) -> None:
         """
         Train the model on the training set.
 
-        This method compacts the training input vectors and fits the
-        model.
+        The training set is a view on the design matrix.
         """
-        X = self._compact_vectors(self._train_X)
-        Y = self._train_y
-        self._model.fit(X, Y)
+        self._model.fit(self._train_X, self._train_y)
 
     def _evaluate(self) -> None:
         """
         Evaluate the model on the test set and store the predictions
         and metrics results.
 
-        This method compacts the test input vectors, makes predictions
-        using the model,
+        This method makes predictions on the test rows of the design
+        matrix using the model,
         and evaluates the predictions against the true test outputs using
         the specified
-        metrics. The results are stored in the _metrics_results and
-        _predictions attributes.
-        """
-        X = self._compact_vectors(self._test_X)
-        Y = self._test_y
-        self._metrics_results = []
-        predictions = self._model.predict(X)
-        for metric in self._metrics:
-            result = metric.evaluate(predictions, Y)
-            self._metrics_results.append((metric, result))
+        metrics, sharing their intermediate results. The results are
+        stored in the _metrics_results and _predictions attributes.
+        With bootstrap replicates, the 95% confidence interval of each
+        metric is stored in _metrics_intervals as (metric, low, high).
+        A regression is evaluated in the units of the target, as the
+        inference plan predicts, not on the standardized target.
+        """
+        truth = unscale(self.target_scaler, self._test_y)
+        predictions = unscale(self.target_scaler,
+                              self._model.predict(self._test_X))
+        self._metrics_results = MetricSuite(self._metrics).evaluate(
+            truth, predictions)
         self._predictions = predictions
+        self._metrics_intervals = []
+        if self._bootstrap:
+            self._metrics_intervals = [
+                (metric, low, high) for metric, _, low, high in bootstrap(
+                    self._metrics, truth, predictions,
+                    replicates=self._bootstrap, seed=self._seed)
+            ]
 
     def _evaluate_training(self) -> None:
         """
-        Evaluate the model on the training set.
+        Evaluate the model on the training set, in the units of the
+        target for a regression.
         """
-        X = self._compact_vectors(self._train_X)
-        Y = self._train_y
-        self._training_metrics_results = []
-        predictions = self._model.predict(X)
-        for metric in self._metrics:
-            result = metric.evaluate(predictions, Y)
-            self._training_metrics_results.append((metric, result))
+        predictions = unscale(self.target_scaler,
+                              self._model.predict(self._train_X))
+        self._training_metrics_results = MetricSuite(
+            self._metrics).evaluate(
+                unscale(self.target_scaler, self._train_y), predictions)
         self._train_predictions = predictions
 
     def execute(self) -> dict:
@@ -361,7 +357,149 @@ class Pipeline():
         self._evaluate_training()
         return {
             "test metrics": self._metrics_results,
+            "test intervals": self._metrics_intervals,
             "training metrics": self._training_metrics_results,
             "predictions": self._predictions,
             "training predictions": self._train_predictions
         }
+
+    def inference_plan(self) -> InferencePlan:
+        """
+        Compile the trained pipeline into a plan that applies the fitted
+        transforms of the input features and predicts with the model.
+
+        Returns
+        -------
+        InferencePlan
+            The plan, whose transform gives the same design matrix as
+            training for the same rows
+
+        Raises
+        ------
+        RuntimeError
+            If the pipeline has not been executed yet
+        """
+        if not self._artifacts:
+            raise RuntimeError("Execute the pipeline before compiling it")
+        # the columns of the design matrix are sorted by feature name
+        steps = [self._artifacts[feature.name] for feature in
+                 sorted(self._input_features,
+                        key=lambda feature: feature.name)]
+        return InferencePlan(steps, self._model, self.target_scaler,
+                             sparse_input=sparse.issparse(self._X))
+
+    def encoded_split(self) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Preprocess the features and split the data, without training, so
+        other models can be fitted on the same encoded data.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, int]
+            The design matrix and target vector, with the training rows
+            first, and the number of training rows
+        """
+        self._preprocess_features()
+        self._split_data()
+        return self._X, self._y, self._train_X.shape[0]
+
+    def cross_validate(self,
+                       k: int = 5,
+                       stratified: Optional[bool] = None,
+                       repeats: int = 1,
+                       n_jobs: Optional[int] = None,
+                       seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Estimate the metrics of the model with (repeated) k-fold
+        cross-validation, instead of a single train/test split.
+
+        The features are encoded once into a design matrix shared by all
+        the folds, which are fitted and evaluated on a process pool. The
+        pipeline's own model is not fitted. A regression is evaluated in
+        the units of the target.
+
+        Parameters
+        ----------
+        k : int
+            Number of folds
+        stratified : Optional[bool]
+            Whether to keep the proportion of every label in each fold.
+            Defaults to True for classification and False for regression
+        repeats : int
+            Number of times the cross-validation is repeated, each time
+            with different folds
+        n_jobs : Optional[int]
+            Number of worker processes. None uses every core, 1 runs the
+            folds in this process
+        seed : Optional[int]
+            Seed of the shuffles. Without a seed, a single repeat uses
+            consecutive folds and repeats are not reproducible
+
+        Returns
+        -------
+        dict
+            "folds": for every fold, its "repeat", "fold" and "metrics",
+            a list of (metric, result) tuples.
+            "metrics": a list of (metric, mean, standard deviation)
+            tuples over all the folds.
+        """
+        if stratified is None:
+            stratified = self.model.type == "classification"
+        self._preprocess_features()
+        self._check_model_type()
+        self._build_design_matrix(np.arange(len(self._output_vector)))
+        if repeats == 1:
+            seeds = [seed]
+        else:
+            generator = np.random.default_rng(seed)
+            seeds = generator.integers(2 ** 32, size=repeats).tolist()
+        tasks = []
+        for repeat, repeat_seed in enumerate(seeds):
+            if stratified:
+                folds = stratified_kfold_split(self._y, k, repeat_seed)
+            else:
+                folds = kfold_split(len(self._y), k, repeat_seed)
+            tasks.extend((repeat, fold, self._model, self._metrics,
+                          self.target_scaler, train, test)
+                         for fold, (train, test) in enumerate(folds))
+        results = map_shared(_evaluate_fold, tasks, self._X, self._y,
+                             n_jobs)
+        folds = [
+            {"repeat": repeat, "fold": fold,
+             "metrics": list(zip(self._metrics, values))}
+            for (repeat, fold, *_), values in zip(tasks, results)
+        ]
+        values = np.array(results, dtype=float).reshape(
+            len(tasks), len(self._metrics))
+        return {
+            "folds": folds,
+            "metrics": [(metric, values[:, i].mean(), values[:, i].std())
+                        for i, metric in enumerate(self._metrics)],
+        }
+
+
+def _evaluate_fold(task: tuple) -> List[float]:
+    """
+    Fit a copy of a model on the training rows of a fold and evaluate it
+    on the test rows. Runs in the worker processes of cross_validate, on
+    the shared design matrix.
+
+    Parameters
+    ----------
+    task : tuple
+        The repeat and fold numbers, the model, the metrics, the scaler
+        of a regression target, see Pipeline.target_scaler, and the
+        training and test row indices
+
+    Returns
+    -------
+    List[float]
+        The result of each metric
+    """
+    _, _, model, metrics, target, train, test = task
+    X, y = shared()
+    model = deepcopy(model)
+    model.fit(X[train], y[train])
+    predictions = unscale(target, model.predict(X[test]))
+    return [float(result) for _, result in MetricSuite(metrics).evaluate(
+        unscale(target, y[test]), predictions)]
@@ -0,0 +1,170 @@
+from collections import deque
+from multiprocessing import Pool
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Union
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from autoop.core.ml.formats import get_format
+from autoop.core.ml.inference import InferencePlan
+from autoop.core.ml.metric import Metric, MetricSuite
+
+
+_plan = {}  # the plan the chunks of the current process are scored with
+
+
+def _load_plan(plan: InferencePlan) -> None:
+    """
+    Store the plan the chunks of this process are scored with. Used as
+    the initializer of the worker processes, so the plan is sent to each
+    worker once rather than with every chunk.
+
+    Args:
+        plan (InferencePlan): The plan.
+    """
+    _plan["plan"] = plan
+
+
+def _predict_chunk(chunk: pd.DataFrame) -> np.ndarray:
+    """
+    Predict a chunk of rows with the plan of this process.
+
+    Args:
+        chunk (pd.DataFrame): The input features of the rows.
+
+    Returns:
+        np.ndarray: The predictions.
+    """
+    return _plan["plan"].predict(chunk)
+
+
+class BatchScorer():
+    def __init__(self,
+                 plan: InferencePlan,
+                 chunksize: int = 65536,
+                 n_jobs: Optional[int] = None,
+                 window: Optional[int] = None,
+                 format: str = "csv"):
+        """
+        Score datasets too large to predict at once with an inference
+        plan, chunk by chunk on a process pool.
+
+        The input is parsed `chunksize` rows at a time, and at most
+        `window` chunks are being predicted at any time: once the window
+        is full, the oldest chunk's predictions are written out before
+        the next chunk is parsed. The memory used is thus bounded by the
+        chunk size and window rather than by the number of rows, and the
+        predictions are written in the order of the input rows.
+
+        Args:
+            plan (InferencePlan): The plan to predict with.
+            chunksize (int): Number of rows per chunk.
+            n_jobs (Optional[int]): Number of worker processes. None uses
+            every core, 1 scores the chunks in this process.
+            window (Optional[int]): Number of chunks in flight. Defaults
+            to twice the number of workers, which keeps them busy while
+            the next chunks are parsed.
+            format (str): Name of the format of the output, one of
+            DATASET_FORMATS. Defaults to "csv".
+
+        Raises:
+            ValueError: If the format is unknown.
+        """
+        self._plan = plan
+        self._chunksize = chunksize
+        self._n_jobs = n_jobs or os.cpu_count() or 1
+        self._window = window or 2 * self._n_jobs
+        self._format = get_format(format)
+        if self._format is None:
+            raise ValueError(f"{format} is not a valid dataset format!")
+
+    def score(self,
+              source: Union[str, os.PathLike, Any],
+              stream: BinaryIO,
+              metrics: Optional[List[Metric]] = None,
+              target: Optional[str] = None,
+              progress: Optional[Callable[[int, float], None]] = None
+              ) -> Dict[str, Any]:
+        """
+        Predict every row of a CSV and write the predictions to a stream.
+
+        Only the columns the plan reads, and the target, are parsed. With
+        a target, the metrics are accumulated chunk by chunk, so they are
+        those of all the rows without holding them.
+
+        Args:
+            source (Union[str, os.PathLike, Any]): Path or readable file
+            object of the CSV.
+            stream (BinaryIO): Writable stream the predictions are
+            written to, as a "prediction" column.
+            metrics (Optional[List[Metric]]): Metrics to evaluate the
+            predictions with. Requires the target.
+            target (Optional[str]): Name of the column of the ground
+            truth, if the CSV has it.
+            progress (Optional[Callable[[int, float], None]]): Called
+            after each chunk is written with the number of rows scored
+            so far and the rows per second.
+
+        Returns:
+            Dict[str, Any]: The "num_rows" scored, the "seconds" taken,
+            the "rows_per_second" and the "metrics", a list of
+            (metric, result) tuples.
+        """
+        columns = self._plan.input_features
+        usecols = columns + ([target] if target is not None
+                             and target not in columns else [])
+        accumulator = MetricSuite(metrics or []).accumulator() \
+            if target is not None else None
+        chunks = pd.read_csv(source, usecols=usecols,
+                             chunksize=self._chunksize)
+        start = time.monotonic()
+        rows = 0
+
+        def truth(chunk: pd.DataFrame) -> Any:
+            """The ground truth of a chunk, if there is a target."""
+            return None if target is None else chunk[target].to_numpy()
+
+        def write(predictions: np.ndarray, y_true: Any) -> None:
+            """Write and evaluate the predictions of a chunk."""
+            nonlocal rows
+            writer.write(pd.DataFrame({"prediction": predictions}))
+            if accumulator is not None:
+                accumulator.update(y_true, predictions)
+            rows += len(predictions)
+            if progress is not None:
+                progress(rows, rows / max(time.monotonic() - start, 1e-9))
+
+        with self._format.writer(stream) as writer:
+            if self._n_jobs <= 1:
+                for chunk in chunks:
+                    write(self._plan.predict(chunk[columns]), truth(chunk))
+            else:
+                # leaving the block terminates the pool, also on errors
+                with Pool(self._n_jobs, initializer=_load_plan,
+                          initargs=(self._plan,)) as pool:
+                    pending = deque()
+                    for chunk in chunks:
+                        if len(pending) == self._window:
+                            write(*self._collect(pending))
+                        pending.append((
+                            pool.apply_async(_predict_chunk,
+                                             (chunk[columns],)),
+                            truth(chunk)))
+                    while pending:
+                        write(*self._collect(pending))
+        seconds = time.monotonic() - start
+        return {
+            "num_rows": rows,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds else 0.0,
+            "metrics": [] if accumulator is None else accumulator.result(),
+        }
+
+    @staticmethod
+    def _collect(pending: deque) -> tuple:
+        """Wait for the oldest chunk in flight and get its predictions
+        and ground truth."""
+        result, y_true = pending.popleft()
+        return result.get(), y_true
@@ -0,0 +1,396 @@
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+import math
+
+import numpy as np
+
+from autoop.core.ml.metric import Metric, MetricSuite
+from autoop.core.ml.model import get_model
+from autoop.core.ml.parallel import map_shared, shared
+from autoop.core.ml.pipeline import Pipeline
+from autoop.functional.preprocessing import unscale
+from autoop.functional.split import holdout_split, stratified_split
+
+
+SEARCH_STRATEGIES = [
+    "grid",
+    "random",
+    "halving",
+    "hyperband"
+]  # names of the search strategies
+
+
+class Uniform():
+    def __init__(self, low: float, high: float, log: bool = False):
+        """
+        A continuous range of hyperparameter values.
+
+        Args:
+            low (float): The lowest value.
+            high (float): The highest value.
+            log (bool): Whether to sample uniformly on a log scale, for
+            parameters spanning orders of magnitude.
+        """
+        self.low = low
+        self.high = high
+        self.log = log
+
+    def sample(self, generator: np.random.Generator) -> float:
+        """Draw a value."""
+        if self.log:
+            return float(np.exp(generator.uniform(np.log(self.low),
+                                                  np.log(self.high))))
+        return float(generator.uniform(self.low, self.high))
+
+    def grid(self, num: int) -> List[float]:
+        """Spread `num` values over the range, for grid search."""
+        space = np.geomspace if self.log else np.linspace
+        return space(self.low, self.high, num).tolist()
+
+
+class IntUniform(Uniform):
+    """A range of integer hyperparameter values, bounds included."""
+
+    def sample(self, generator: np.random.Generator) -> int:
+        """Draw a value."""
+        return int(round(super().sample(generator)))
+
+    def grid(self, num: int) -> List[int]:
+        """Spread up to `num` distinct values over the range."""
+        return sorted({int(round(value)) for value in super().grid(num)})
+
+
+SEARCH_SPACES = {
+    "multiple_linear_regression": {
+        "fit_intercept": [True, False],
+    },
+    "lasso_regression": {
+        "alpha": Uniform(1e-4, 10, log=True),
+    },
+    "ridge_regression": {
+        "alpha": Uniform(1e-3, 1e3, log=True),
+    },
+    "k_neighbours_classification": {
+        "n_neighbors": IntUniform(1, 50),
+        "weights": ["uniform", "distance"],
+    },
+    "support_vector_classification": {
+        "C": Uniform(1e-2, 1e3, log=True),
+        "gamma": ["scale", "auto"],
+        "kernel": ["rbf", "linear"],
+    },
+    "decision_tree_classification": {
+        "max_depth": [None, 2, 4, 8, 16],
+        "min_samples_leaf": IntUniform(1, 20),
+        "criterion": ["gini", "entropy"],
+    },
+}  # default search space of each model
+
+
+def search(
+        pipeline: Pipeline,
+        model: str,
+        space: Optional[Dict[str, Any]] = None,
+        strategy: str = "halving",
+        metric: Optional[Metric] = None,
+        num_candidates: int = 27,
+        grid_points: int = 5,
+        eta: int = 3,
+        min_resources: Optional[int] = None,
+        validation: float = 0.2,
+        n_jobs: Optional[int] = None,
+        seed: Optional[int] = None
+        ) -> Dict[str, Any]:
+    """
+    Search the hyperparameters of a model on a pipeline's data.
+
+    The features are encoded and split once by the pipeline. Candidates
+    are fitted on part of the training rows and scored on the rest (the
+    inner validation split), in parallel on a process pool sharing the
+    design matrix. The best candidate is then refitted on all the
+    training rows and evaluated on the test rows with the pipeline's
+    metrics.
+
+    Strategies:
+        "grid": every combination of the values of the space, with
+        `grid_points` values spread over each range.
+        "random": `num_candidates` random combinations.
+        "halving": successive halving of `num_candidates` random
+        combinations. All are fitted on `min_resources` rows, then only
+        the best 1/eta are fitted again on eta times more rows, until all
+        the rows are used, so most compute goes to promising candidates.
+        "hyperband": successive halving repeated with fewer candidates
+        and more starting rows, hedging against candidates that only do
+        well with much data.
+
+    Args:
+        pipeline (Pipeline): The pipeline giving the dataset, features,
+        split and metrics.
+        model (str): The name of the model to tune.
+        space (Optional[Dict[str, Any]]): The values of each
+        hyperparameter, as a list or a Uniform range. Defaults to
+        SEARCH_SPACES of the model.
+        strategy (str): One of SEARCH_STRATEGIES. Defaults to "halving".
+        metric (Optional[Metric]): The metric candidates are scored by.
+        Defaults to the first metric of the pipeline.
+        num_candidates (int): Number of candidates of the random and
+        halving searches, and the largest bracket of hyperband.
+        grid_points (int): Number of values of each range in a grid.
+        eta (int): The factor by which halving cuts the candidates and
+        grows the rows.
+        min_resources (Optional[int]): Number of rows the first round of
+        halving fits on. Defaults to a size that lets halving go down to
+        a single candidate.
+        validation (float): Fraction of the training rows held out to
+        score the candidates.
+        n_jobs (Optional[int]): Number of worker processes. None uses
+        every core.
+        seed (Optional[int]): Seed of the sampling and of the inner split.
+
+    Returns:
+        Dict[str, Any]: The best "params", their validation "score", the
+        "model" refitted on all training rows, its test "metrics" as
+        (metric, result) tuples, and all "trials", each with its
+        "params", number of "resources" (rows) and "score" (None if
+        fitting failed).
+
+    Raises:
+        ValueError: If the model or strategy is unknown, or a grid is
+        searched over an empty space.
+    """
+    if get_model(model) is None:
+        raise ValueError(f"{model} is not a valid model!")
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"{strategy} is not a valid search strategy!")
+    space = SEARCH_SPACES.get(model, {}) if space is None else space
+    metric = metric or pipeline.metrics[0]
+    generator = np.random.default_rng(seed)
+    X, y, num_train = pipeline.encoded_split()
+    fit_rows, validation_rows = _inner_split(
+        pipeline.model.type, y[:num_train], 1 - validation, seed)
+    # subsets of the fitting rows are prefixes of a random order
+    fit_rows = generator.permutation(fit_rows)
+    target = pipeline.target_scaler
+    searcher = _Search(model, metric, fit_rows, validation_rows, X, y,
+                       target, n_jobs)
+
+    if strategy == "grid":
+        best = searcher.evaluate(_grid(space, grid_points), len(fit_rows))
+    elif strategy == "random":
+        candidates = [_sample(space, generator)
+                      for _ in range(num_candidates)]
+        best = searcher.evaluate(candidates, len(fit_rows))
+    elif strategy == "halving":
+        candidates = [_sample(space, generator)
+                      for _ in range(num_candidates)]
+        rounds = _rounds(num_candidates, eta)
+        resources = min_resources or len(fit_rows) // eta ** (rounds - 1)
+        best = searcher.halve(candidates, resources, eta)
+    else:
+        best = searcher.hyperband(space, generator, num_candidates,
+                                min_resources, eta)
+
+    params, score = best
+    fitted = get_model(model, **params)
+    fitted.fit(X[:num_train], y[:num_train])
+    predictions = unscale(target, fitted.predict(X[num_train:]))
+    return {
+        "params": params,
+        "score": score,
+        "model": fitted,
+        "metrics": MetricSuite(pipeline.metrics).evaluate(
+            unscale(target, y[num_train:]), predictions),
+        "trials": searcher.trials,
+    }
+
+
+class _Search():
+    def __init__(self, model: str, metric: Metric, fit_rows: np.ndarray,
+                 validation_rows: np.ndarray, X: np.ndarray, y: np.ndarray,
+                 target: Optional[Dict[str, Any]], n_jobs: Optional[int]):
+        """
+        Evaluate candidates of a search and keep track of the trials.
+
+        Args:
+            model (str): The name of the model.
+            metric (Metric): The metric candidates are scored by.
+            fit_rows (np.ndarray): The rows candidates are fitted on,
+            subsets being prefixes.
+            validation_rows (np.ndarray): The rows candidates are scored on.
+            X (np.ndarray): The design matrix.
+            y (np.ndarray): The target vector.
+            target (Optional[Dict[str, Any]]): The scaler of a regression
+            target, see Pipeline.target_scaler, so that scores are in the
+            units of the target.
+            n_jobs (Optional[int]): Number of worker processes.
+        """
+        self._model = model
+        self._metric = metric
+        self._fit_rows = fit_rows
+        self._validation_rows = validation_rows
+        self._X = X
+        self._y = y
+        self._target = target
+        self._n_jobs = n_jobs
+        self.trials = []
+
+    def _rank(self, candidates: List[Dict[str, Any]],
+              scores: List[Optional[float]]) -> List[int]:
+        """Order candidates best first, failed ones last."""
+        sign = -1 if self._metric.greater_is_better else 1
+        return sorted(range(len(candidates)), key=lambda i: (
+            scores[i] is None, 0 if scores[i] is None else sign * scores[i]))
+
+    def _scores(self, candidates: List[Dict[str, Any]],
+                resources: int) -> List[Optional[float]]:
+        """Fit and score candidates on the first `resources` rows."""
+        rows = self._fit_rows[:resources]
+        tasks = [(self._model, params, rows, self._validation_rows,
+                  self._metric, self._target) for params in candidates]
+        scores = map_shared(_score_candidate, tasks, self._X, self._y,
+                            self._n_jobs)
+        self.trials.extend(
+            {"params": params, "resources": len(rows), "score": score}
+            for params, score in zip(candidates, scores))
+        return scores
+
+    def evaluate(self, candidates: List[Dict[str, Any]],
+                 resources: int) -> Tuple[Dict[str, Any], Optional[float]]:
+        """
+        Score all candidates on the same rows.
+
+        Returns:
+            Tuple[Dict[str, Any], Optional[float]]: The best parameters
+            and their score.
+        """
+        scores = self._scores(candidates, resources)
+        best = self._rank(candidates, scores)[0]
+        return candidates[best], scores[best]
+
+    def halve(self, candidates: List[Dict[str, Any]], resources: int,
+              eta: int) -> Tuple[Dict[str, Any], Optional[float]]:
+        """
+        Successive halving: score the candidates, keep the best 1/eta and
+        multiply their rows by eta, until one candidate or all the rows
+        are left.
+
+        Returns:
+            Tuple[Dict[str, Any], Optional[float]]: The best parameters
+            and their score on the most rows they were fitted on.
+        """
+        total = len(self._fit_rows)
+        resources = min(max(resources, 1), total)
+        while True:
+            scores = self._scores(candidates, resources)
+            order = self._rank(candidates, scores)
+            if len(candidates) == 1 or resources == total:
+                return candidates[order[0]], scores[order[0]]
+            keep = max(len(candidates) // eta, 1)
+            candidates = [candidates[i] for i in order[:keep]]
+            resources = min(resources * eta, total)
+
+    def hyperband(self, space: Dict[str, Any],
+                  generator: np.random.Generator, num_candidates: int,
+                  min_resources: Optional[int],
+                  eta: int) -> Tuple[Dict[str, Any], Optional[float]]:
+        """
+        Hyperband: brackets of successive halving, from many candidates
+        on few rows to few candidates on all the rows.
+
+        Returns:
+            Tuple[Dict[str, Any], Optional[float]]: The best parameters
+            of all brackets and their score.
+        """
+        total = len(self._fit_rows)
+        brackets = _rounds(num_candidates, eta)
+        if min_resources is None:
+            min_resources = total // eta ** (brackets - 1)
+        min_resources = max(min_resources, 1)
+        brackets = min(brackets, _rounds(total // min_resources, eta))
+        winners = []
+        for bracket in reversed(range(brackets)):
+            count = max(num_candidates // eta ** (brackets - 1 - bracket),
+                        1)
+            candidates = [_sample(space, generator) for _ in range(count)]
+            winners.append(self.halve(candidates,
+                                      total // eta ** bracket, eta))
+        order = self._rank([params for params, _ in winners],
+                           [score for _, score in winners])
+        return winners[order[0]]
+
+
+def _score_candidate(task: tuple) -> Optional[float]:
+    """
+    Fit a candidate on the shared design matrix and score it. Runs in the
+    worker processes of `search`.
+
+    Args:
+        task (tuple): The name of the model, its parameters, the fitting
+        and validation rows, the metric, and the scaler of a regression
+        target.
+
+    Returns:
+        Optional[float]: The score, or None if fitting failed.
+    """
+    name, params, fit_rows, validation_rows, metric, target = task
+    X, y = shared()
+    try:
+        model = get_model(name, **params)
+        model.fit(X[fit_rows], y[fit_rows])
+        score = float(metric.evaluate(
+            unscale(target, y[validation_rows]),
+            unscale(target, model.predict(X[validation_rows]))))
+    except Exception:
+        return None
+    return None if math.isnan(score) else score
+
+
+def _rounds(num: int, eta: int) -> int:
+    """
+    Count the rounds of halving that take `num` candidates down to one:
+    1 + floor(log_eta(num)), in exact integer arithmetic.
+    """
+    rounds = 1
+    while eta ** rounds <= num:
+        rounds += 1
+    return rounds
+
+
+def _inner_split(task_type: str, y: np.ndarray, fraction: float,
+                 seed: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split the training rows into fitting and validation rows, in a
+    stratified manner for classification.
+    """
+    if task_type == "classification":
+        return stratified_split(y, fraction, seed)
+    return holdout_split(len(y), fraction, seed)
+
+
+def _grid(space: Dict[str, Any],
+          grid_points: int) -> List[Dict[str, Any]]:
+    """
+    List every combination of the values of a space.
+
+    Raises:
+        ValueError: If the space is empty.
+    """
+    if not space:
+        raise ValueError("The search space is empty!")
+    names = list(space)
+    values = [space[name].grid(grid_points)
+              if isinstance(space[name], Uniform) else list(space[name])
+              for name in names]
+    return [dict(zip(names, combination)) for combination in product(*values)]
+
+
+def _sample(space: Dict[str, Any],
+            generator: np.random.Generator) -> Dict[str, Any]:
+    """
+    Draw a random combination of the values of a space.
+    """
+    return {
+        name: values.sample(generator) if isinstance(values, Uniform)
+        else values[generator.integers(len(values))]
+        for name, values in space.items()
+    }
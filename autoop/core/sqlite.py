@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from typing import Iterator
+import os
+import sqlite3
+import threading
+
+
+class SQLiteConnection():
+    def __init__(self, path: str):
+        """
+        Hand out one connection per thread to a SQLite database file.
+
+        The database runs in WAL mode, so readers in other threads or
+        processes are not blocked by a writer.
+
+        Args:
+            path (str): Path of the database file. It is created, together
+            with its parent directories, if it does not exist.
+        """
+        self._path = os.path.normpath(path)
+        directory = os.path.dirname(os.path.abspath(self._path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+    @property
+    def path(self) -> str:
+        """The path of the database file."""
+        return self._path
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        The connection of the calling thread, opened on first use.
+
+        Returns:
+            sqlite3.Connection: A connection in autocommit mode; use
+            transaction() to group statements.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=30,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def execute(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """
+        Execute a single statement on the calling thread's connection.
+
+        Args:
+            sql (str): The statement to execute
+            parameters (tuple): The parameters bound to the statement
+
+        Returns:
+            sqlite3.Cursor: The cursor holding the results
+        """
+        return self.connection.execute(sql, parameters)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run the statements of the block in one write transaction.
+
+        Nested blocks join the outer transaction.
+
+        Returns:
+            Iterator[sqlite3.Connection]: The connection to use
+        """
+        connection = self.connection
+        if connection.in_transaction:
+            yield connection
+            return
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
@@ -1,8 +1,20 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import io
+import mmap
 import os
-from typing import List
+import tempfile
+from typing import Any, BinaryIO, Iterator, List, Optional
 from glob import glob
 
+from autoop.core.sqlite import SQLiteConnection
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 
 class NotFoundError(Exception):
     def __init__(self, path):
@@ -56,6 +68,87 @@ class Storage(ABC):
         """
         pass
 
+    def append(self, data: bytes, path: str):
+        """
+        Append data to the end of a given path, creating it if needed.
+        Storages that can append in place should override this; the
+        default rewrites the whole object.
+        Args:
+            data (bytes): Data to append
+            path (str): Path to append data to
+        """
+        try:
+            existing = self.load(path)
+        except NotFoundError:
+            existing = b""
+        self.save(existing + data, path)
+
+    def load_from(self, path: str, offset: int) -> bytes:
+        """
+        Load the data at a given path, starting at a byte offset.
+        Storages that can seek should override this; the default loads
+        the whole object.
+        Args:
+            path (str): Path to load data
+            offset (int): Number of leading bytes to skip
+        Returns:
+            bytes: Loaded data
+        """
+        return self.load(path)[offset:]
+
+    def map(self, path: str) -> Any:
+        """
+        Get the data at a given path as a read-only object supporting the
+        buffer protocol. Storages backed by files should override this to
+        memory-map them, so only the pages actually read are loaded; the
+        default loads the whole object.
+        Args:
+            path (str): Path to map
+        Returns:
+            Any: The data, as bytes or a read-only buffer
+        """
+        return self.load(path)
+
+    @contextmanager
+    def lock(self, path: str) -> Iterator[None]:
+        """
+        Hold an exclusive lock on a given path for the duration of the
+        block, against other processes sharing the storage. Storages that
+        can be shared between processes should override this; the default
+        does not lock, so callers must still lock between their threads.
+        Args:
+            path (str): Path to lock
+        """
+        yield
+
+    @contextmanager
+    def open_write(self, path: str) -> Iterator[BinaryIO]:
+        """
+        Open a binary stream that writes to a given path. The data is only
+        stored once the block exits without an error. Storages that can
+        write incrementally should override this; the default buffers the
+        whole object in memory and saves it at the end.
+        Args:
+            path (str): Path to write data to
+        Yields:
+            BinaryIO: A writable binary stream
+        """
+        buffer = io.BytesIO()
+        yield buffer
+        self.save(buffer.getvalue(), path)
+
+    def stat(self, path: str) -> Optional[Any]:
+        """
+        Get a cheap fingerprint that changes whenever the data at a given
+        path changes. The default returns None, meaning "unknown", so
+        callers must assume the data changed.
+        Args:
+            path (str): Path to fingerprint
+        Returns:
+            Optional[Any]: A comparable fingerprint, or None
+        """
+        return None
+
 
 class LocalStorage(Storage):
 
@@ -79,11 +172,87 @@ class LocalStorage(Storage):
             data (bytes): Data to save
             key (str): Key to save data
         """
+        with self.open_write(key) as f:
+            f.write(data)
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Open a stream that writes to a hidden temporary file, which is
+        fsynced and renamed over the target once the block exits without
+        an error, so readers never observe a partially written file.
+
+        Args:
+            key (str): Key to write data to
+
+        Yields:
+            BinaryIO: The writable temporary file
+        """
         path = self._join_path(key)
         # Ensure parent directories are created
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'wb') as f:
+        fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp",
+                                        dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def append(self, data: bytes, key: str):
+        """
+        Append data to the file at a given key and fsync it.
+
+        Args:
+            data (bytes): Data to append
+            key (str): Key to append data to
+        """
+        path = self._join_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
             f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Hold an exclusive lock on a given key, with flock (or the msvcrt
+        byte-range lock on Windows) on a hidden lock file next to it. The
+        lock file is never replaced, unlike the files saved at the key,
+        so every process locks the same file. Each block opens the file
+        anew, so threads of one process exclude each other too.
+
+        Args:
+            key (str): Key to lock
+        """
+        path = self._join_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_path = os.path.join(os.path.dirname(path),
+                                 f".{os.path.basename(path)}.lock")
+        with open(lock_path, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                yield
+                return
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK itself gives up after ten seconds
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
 
     def load(self, key: str) -> bytes:
         """
@@ -100,6 +269,65 @@ class LocalStorage(Storage):
         with open(path, 'rb') as f:
             return f.read()
 
+    def load_from(self, key: str, offset: int) -> bytes:
+        """
+        Load data from a given key, starting at a byte offset
+
+        Args:
+            key (str): Key to load data
+            offset (int): Number of leading bytes to skip
+
+        Returns:
+            bytes: Loaded data
+        """
+        path = self._join_path(key)
+        self._assert_path_exists(path)
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return f.read()
+
+    def map(self, key: str) -> Any:
+        """
+        Memory-map the file at a given key, read-only. Saves replace the
+        file rather than writing into it, so the mapping keeps showing
+        the data it was created from.
+
+        Args:
+            key (str): Key to map
+
+        Returns:
+            Any: A read-only mmap of the file, or empty bytes for an empty
+            file, which cannot be mapped
+        """
+        path = self._join_path(key)
+        self._assert_path_exists(path)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def stat(self, key: str) -> tuple:
+        """
+        Fingerprint the file at a given key from its metadata, without
+        reading it. Saves replace the file, so its inode changes too.
+
+        Args:
+            key (str): Key to fingerprint
+
+        Returns:
+            tuple: The inode, size and modification times of the file
+
+        Raises:
+            NotFoundError: If the path does not exist.
+        """
+        path = self._join_path(key)
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            raise NotFoundError(path)
+        return (info.st_ino, info.st_size, info.st_mtime_ns,
+                info.st_ctime_ns)
+
     def delete(self, key: str = "/"):
         """
         Delete the file at the specified key.
@@ -156,3 +384,160 @@ class LocalStorage(Storage):
             str: Normalized path.
         """
         return os.path.normpath(os.path.join(self._base_path, path))
+
+
+class SQLiteStorage(Storage):
+
+    def __init__(self, path: str = "./assets/autoop.sqlite"):
+        """
+        Initialize a SQLiteStorage object.
+
+        Blobs are stored in a single table of an embedded SQLite database,
+        keyed by their normalized path.
+
+        Args:
+            path (str): Path of the database file.
+            Defaults to "./assets/autoop.sqlite".
+        """
+        self._db = SQLiteConnection(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs "
+            "(key TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+
+    def save(self, data: bytes, key: str):
+        """
+        Save data to a given key
+
+        Args:
+            data (bytes): Data to save
+            key (str): Key to save data
+        """
+        self._db.execute(
+            "INSERT OR REPLACE INTO blobs (key, data) VALUES (?, ?)",
+            (self._normalize(key), data)
+        )
+
+    def load(self, key: str) -> bytes:
+        """
+        Load data from a given key
+
+        Args:
+            key (str): Key to load data
+
+        Returns:
+            bytes: Loaded data
+
+        Raises:
+            NotFoundError: If the key does not exist.
+        """
+        row = self._db.execute("SELECT data FROM blobs WHERE key = ?",
+                               (self._normalize(key),)).fetchone()
+        if row is None:
+            raise NotFoundError(key)
+        return bytes(row[0])
+
+    def load_from(self, key: str, offset: int) -> bytes:
+        """
+        Load data from a given key, starting at a byte offset
+
+        Args:
+            key (str): Key to load data
+            offset (int): Number of leading bytes to skip
+
+        Returns:
+            bytes: Loaded data
+
+        Raises:
+            NotFoundError: If the key does not exist.
+        """
+        row = self._db.execute("SELECT substr(data, ?) FROM blobs "
+                               "WHERE key = ?",
+                               (offset + 1, self._normalize(key))).fetchone()
+        if row is None:
+            raise NotFoundError(key)
+        return bytes(row[0])
+
+    def delete(self, key: str = "/"):
+        """
+        Delete the blob at the specified key.
+
+        Args:
+            key (str): Key to delete. Defaults to root ("/").
+        Raises:
+            NotFoundError: If the key does not exist.
+        """
+        cursor = self._db.execute("DELETE FROM blobs WHERE key = ?",
+                                  (self._normalize(key),))
+        if cursor.rowcount == 0:
+            raise NotFoundError(key)
+
+    def list(self, prefix: str = "/") -> List[str]:
+        """
+        List all keys under a given prefix.
+
+        Args:
+            prefix (str): Key to list under. Defaults to root ("/").
+
+        Returns:
+            List[str]: List of keys under the specified prefix.
+        """
+        prefix = self._normalize(prefix)
+        if not prefix:
+            rows = self._db.execute("SELECT key FROM blobs ORDER BY key")
+            return [row[0] for row in rows]
+        # a range scan over the primary key index instead of LIKE
+        lower = prefix + os.sep
+        upper = prefix + chr(ord(os.sep) + 1)
+        rows = self._db.execute(
+            "SELECT key FROM blobs WHERE key = ? OR (key >= ? AND key < ?) "
+            "ORDER BY key", (prefix, lower, upper)
+        )
+        return [row[0] for row in rows]
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Hold the database's write lock for the duration of the block: the
+        storage operations of the block, on this thread, run in one
+        transaction, which other processes see committed as a whole.
+
+        Args:
+            key (str): Key to lock. The whole database is locked.
+        """
+        with self._db.transaction():
+            yield
+
+    def append(self, data: bytes, key: str):
+        """
+        Append data to the blob at a given key, creating it if needed.
+
+        Args:
+            data (bytes): Data to append
+            key (str): Key to append data to
+        """
+        key = self._normalize(key)
+        with self._db.transaction() as connection:
+            # || yields text, the cast keeps the bytes as they are
+            cursor = connection.execute(
+                "UPDATE blobs SET data = CAST(data || ? AS BLOB) "
+                "WHERE key = ?", (data, key)
+            )
+            if cursor.rowcount == 0:
+                connection.execute(
+                    "INSERT INTO blobs (key, data) VALUES (?, ?)", (key, data)
+                )
+
+    def _normalize(self, key: str) -> str:
+        """
+        Normalize a key the way LocalStorage normalizes paths.
+
+        Args:
+            key (str): Key to normalize
+
+        Returns:
+            str: Normalized key without leading separators, or an empty
+            string for the root.
+        """
+        key = os.path.normpath(key).lstrip(os.sep)
+        return "" if key == "." else key
@@ -1,28 +1,159 @@
 
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
+import math
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_string_dtype
 from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.feature import Feature
 
 
-def detect_feature_types(dataset: Dataset) -> List[Feature]:
-    """Assumption: only categorical and numerical features and no NaN values.
+ONEHOT_MAX_LEVELS = 100  # more levels are hashed rather than one-hot encoded
+CATEGORICAL_MAX_LEVELS = 10  # numerical columns with fewer are categorical
+SAMPLE_CONFIDENCE = 0.99  # probability that the sample sees every level...
+SAMPLE_TOLERANCE = 0.001  # ...making up at least this fraction of the rows
+
+
+def sample_size(confidence: float = SAMPLE_CONFIDENCE,
+                tolerance: float = SAMPLE_TOLERANCE) -> int:
+    """The number of rows to sample so that, with probability at least
+    `confidence`, every value making up at least `tolerance` of a column
+    is in the sample.
+
+    A value with that frequency is missed by n uniform draws with
+    probability at most (1 - tolerance)^n <= exp(-tolerance * n), and a
+    column has at most 1 / tolerance such values, so by the union bound
+    n = ln(1 / (tolerance * (1 - confidence))) / tolerance draws miss
+    any of them with probability at most 1 - confidence. Sampling
+    without replacement only misses them less often.
+
+    Args:
+        confidence (float): The probability of the guarantee.
+        tolerance (float): The frequency of the values guaranteed.
+    Returns:
+        int: The number of rows.
+    """
+    return math.ceil(math.log(1 / (tolerance * (1 - confidence)))
+                     / tolerance)
+
+
+def sample_rows(num_rows: int, size: int, seed: int = 0) -> np.ndarray:
+    """Draw rows uniformly without replacement.
+
+    Args:
+        num_rows (int): The number of rows to draw from.
+        size (int): The number of rows to draw, at most num_rows.
+        seed (int): Seed of the draw.
+    Returns:
+        np.ndarray: The sorted positions of the rows drawn.
+    """
+    return np.sort(np.random.default_rng(seed).choice(num_rows, size,
+                                                      replace=False))
+
+
+def infer_schema(data: pd.DataFrame,
+                 sample: bool = False,
+                 confidence: float = SAMPLE_CONFIDENCE,
+                 tolerance: float = SAMPLE_TOLERANCE,
+                 seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Infer the type and encoding of every column of a table.
+
+    Columns of string, categorical and boolean dtypes, and numerical
+    columns with fewer than CATEGORICAL_MAX_LEVELS levels, are
+    categorical; other numerical columns are numerical. Categorical
+    features with more than ONEHOT_MAX_LEVELS levels are hashed, so
+    their width is bounded. The levels of all the columns are counted
+    at once by DataFrame.nunique, missing values excluded.
+
+    With `sample`, the levels are counted on sample_size rows drawn
+    uniformly, so the cost is bounded whatever the size of the table.
+    The levels seen are a lower bound, so a column hashed on the sample
+    has too many levels to one-hot encode, and with probability at
+    least `confidence` every level making up at least `tolerance` of
+    the rows was seen.
+
+    Args:
+        data (pd.DataFrame): The table, or a uniform sample of it.
+        sample (bool): Whether to count levels on a sample of the rows.
+        confidence (float): The probability of the guarantee.
+        tolerance (float): The frequency of the levels guaranteed.
+        seed (int): Seed of the sample.
+    Returns:
+        Dict[str, Dict[str, Any]]: For each column in order, its "type",
+        "encoding", number of "levels" and whether they were "sampled".
+    Raises:
+        ValueError: If a column has a dtype that is neither categorical
+        nor numerical.
+    """
+    size = sample_size(confidence, tolerance)
+    sampled = sample and len(data) > size
+    if sampled:
+        data = data.iloc[sample_rows(len(data), size, seed)]
+    levels = data.nunique()
+    return {column: {**column_schema(dtype, int(levels[column])),
+                     "sampled": sampled}
+            for column, dtype in data.dtypes.items()}
+
+
+def column_schema(dtype: Any, levels: int) -> Dict[str, Any]:
+    """Infer the type and encoding of a column.
+
+    Args:
+        dtype (Any): The dtype of the column.
+        levels (int): Its number of distinct non-null values.
+    Returns:
+        Dict[str, Any]: Its "type", "encoding" and number of "levels".
+    Raises:
+        ValueError: If the dtype is neither categorical nor numerical.
+    """
+    # typed formats keep string and categorical dtypes as they are
+    if is_string_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype) \
+            or is_bool_dtype(dtype) or levels < CATEGORICAL_MAX_LEVELS:
+        type = "categorical"
+    elif is_numeric_dtype(dtype):
+        type = "numerical"
+    else:
+        raise ValueError("This is not a valid type for a feature")
+    encoding = "hashing" if type == "categorical" \
+        and levels > ONEHOT_MAX_LEVELS else "onehot"
+    return {"type": type, "encoding": encoding, "levels": levels}
+
+
+def detect_feature_types(
+        dataset: Dataset,
+        sample: bool = False,
+        persist: Optional[Callable[[Dataset], None]] = None
+        ) -> List[Feature]:
+    """Assumption: only categorical and numerical features.
+    The schema is inferred by infer_schema and cached in the dataset's
+    metadata, where datasets ingested from CSV already have it from
+    their column profile, so the data is only read the first time.
+    A schema inferred from a sample is only reused when sampling is
+    allowed; otherwise it is inferred again from all the rows.
+    With `sample`, only the sampled rows are read from the dataset.
     Args:
         dataset: Dataset
+        sample: Whether to infer the schema from a sample of the rows.
+        persist: Called with the dataset when its schema was inferred,
+        to save its metadata, e.g. ArtifactRegistry.save_metadata.
     Returns:
         List[Feature]: List of features with their types.
     """
-    df = dataset.read()
-    feature_list = []
-
-    for column in list(df.columns):
-        unique_values = set(df[column])
-        if df[column].dtype == str or len(unique_values) < 10:
-            type = "categorical"
-        elif df[column].dtype in [int, 'int64', float, 'float64']:
-            type = "numerical"
-        elif df[column].dtype == bool or df[column].dtype == 'bool':
-            type = "categorical"
+    schema = dataset.metadata.get("schema")
+    if schema is None or not sample and any(
+            entry["sampled"] for entry in schema.values()):
+        size = sample_size()
+        num_rows = dataset.num_rows
+        if sample and num_rows > size:
+            schema = infer_schema(
+                dataset.read_rows(sample_rows(num_rows, size)))
+            for entry in schema.values():
+                entry["sampled"] = True
         else:
-            raise ValueError("This is not a valid type for a feature")
-        feature_list.append(Feature(name=column, type=type))
-    return feature_list
+            schema = infer_schema(dataset.read())
+        dataset.metadata["schema"] = schema
+        if persist is not None:
+            persist(dataset)
+    return [Feature(name=column, type=entry["type"],
+                    encoding=entry["encoding"])
+            for column, entry in schema.items()]
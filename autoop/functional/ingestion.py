@@ -0,0 +1,240 @@
+from typing import Any, Dict, List, Optional, Union
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from autoop.core.ml.formats import get_format
+from autoop.functional.feature import column_schema
+from autoop.functional.preprocessing import category_values
+from autoop.core.storage import Storage
+
+
+DISTINCT_SKETCH_SIZE = 1024  # hashes kept to estimate distinct counts
+TOP_LEVELS = 10  # most frequent levels kept in the profile
+LEVEL_COUNTERS = 100  # levels counted to find the most frequent ones
+
+
+def ingest_csv(
+        source: Union[str, os.PathLike, Any],
+        storage: Storage,
+        asset_path: str,
+        format: str = "columnar",
+        chunksize: int = 65536
+        ) -> Dict[str, Any]:
+    """Stream a CSV file into storage, re-encoded in a dataset format.
+
+    The CSV is parsed `chunksize` rows at a time, and each chunk is
+    encoded and written to storage before the next one is parsed, so the
+    memory used is bounded by the chunk size rather than the file size.
+    The schema and basic statistics of the columns are computed on the
+    way, in a profile of each column that the types of the features are
+    inferred from.
+
+    Args:
+        source (Union[str, os.PathLike, Any]): Path or readable file
+        object of the CSV.
+        storage (Storage): Storage to write the dataset to.
+        asset_path (str): Path of the dataset in the storage.
+        format (str): Name of the format to encode the dataset in, one of
+        DATASET_FORMATS. Defaults to "columnar".
+        chunksize (int): Number of rows parsed at a time.
+
+    Returns:
+        Dict[str, Any]: The metadata of the dataset: its format, number
+        of rows, the profile of its "columns", see _ColumnStats.result,
+        and the "schema" of the features, see infer_schema.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    encoding = get_format(format)
+    if encoding is None:
+        raise ValueError(f"{format} is not a valid dataset format!")
+    stats = _ColumnStats()
+    with storage.open_write(asset_path) as stream:
+        with encoding.writer(stream) as writer:
+            for chunk in pd.read_csv(source, chunksize=chunksize):
+                writer.write(chunk)
+                stats.update(chunk)
+    return {"format": encoding.name, **stats.result()}
+
+
+class _ColumnStats():
+    def __init__(self):
+        """
+        Accumulate the schema and profile of a table chunk by chunk.
+
+        Every statistic can be merged chunk by chunk in bounded memory:
+        the mean and variance with Chan et al.'s parallel update, the
+        number of distinct values with a k-minimum-values sketch of
+        their hashes, and the most frequent levels with a Misra-Gries
+        summary of LEVEL_COUNTERS counters.
+        """
+        self._prototype = None
+        self._rows = 0
+        self._columns = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Add the rows of a chunk to the statistics.
+
+        Args:
+            chunk (pd.DataFrame): The rows.
+        """
+        # an empty frame of the chunks' common dtypes, as pd.concat of
+        # all the chunks would give them
+        empty = chunk.iloc[:0]
+        self._prototype = empty if self._prototype is None \
+            else pd.concat([self._prototype, empty])
+        self._rows += len(chunk)
+        nulls = chunk.isna().sum()
+        for name in chunk.columns:
+            column = self._columns.setdefault(name, {
+                "nulls": 0, "min": None, "max": None, "count": 0,
+                "mean": 0.0, "m2": 0.0,
+                "hashes": np.empty(0, dtype=np.uint64),
+                "levels": pd.Series(dtype=np.int64)})
+            column["nulls"] += int(nulls[name])
+            values = chunk[name].dropna()
+            if values.empty:
+                continue
+            numerical = is_numeric_dtype(values.dtype) and \
+                not is_bool_dtype(values.dtype)
+            # numbers as floats, so chunks parsed as ints and as floats
+            # agree on the levels; everything else as strings
+            levels = values.to_numpy(dtype=np.float64) if numerical \
+                else category_values(values.to_numpy())
+            self._update_distinct(column, levels)
+            self._update_levels(column, levels)
+            if not numerical:
+                continue
+            low, high = values.min().item(), values.max().item()
+            if column["min"] is None or low < column["min"]:
+                column["min"] = low
+            if column["max"] is None or high > column["max"]:
+                column["max"] = high
+            self._update_moments(column, levels)
+
+    @staticmethod
+    def _update_moments(column: Dict[str, Any], values: np.ndarray) -> None:
+        """Merge the count, mean and sum of squared deviations of the
+        values of a chunk into those of a column."""
+        count = column["count"] + len(values)
+        mean = values.mean()
+        delta = mean - column["mean"]
+        column["m2"] += ((values - mean) ** 2).sum() \
+            + delta ** 2 * column["count"] * len(values) / count
+        column["mean"] += delta * len(values) / count
+        column["count"] = count
+
+    @staticmethod
+    def _update_distinct(column: Dict[str, Any], values: np.ndarray) -> None:
+        """Merge the hashes of the values of a chunk into the smallest
+        DISTINCT_SKETCH_SIZE distinct hashes of a column."""
+        hashes = pd.util.hash_array(values.astype(object)
+                                    if values.dtype.kind == "U" else values)
+        if len(column["hashes"]) == DISTINCT_SKETCH_SIZE:
+            hashes = hashes[hashes < column["hashes"][-1]]
+        column["hashes"] = np.union1d(column["hashes"],
+                                      hashes)[:DISTINCT_SKETCH_SIZE]
+
+    @staticmethod
+    def _update_levels(column: Dict[str, Any], values: np.ndarray) -> None:
+        """Merge the counts of the levels of a chunk into the Misra-Gries
+        summary of a column: when more than LEVEL_COUNTERS levels are
+        counted, the count of the next most frequent one is taken off
+        all of them, and the levels left without counts are dropped. A
+        count is then short of the true one by at most the number of
+        values over LEVEL_COUNTERS + 1. The chunk is summarized the same
+        way before merging, which keeps that bound, so that levels seen
+        once are not aligned with the column's."""
+        levels = column["levels"].add(
+            _ColumnStats._summarize(pd.Series(values).value_counts()),
+            fill_value=0)
+        column["levels"] = _ColumnStats._summarize(levels)
+
+    @staticmethod
+    def _summarize(levels: pd.Series) -> pd.Series:
+        """Keep at most LEVEL_COUNTERS counts of levels, Misra-Gries."""
+        if len(levels) <= LEVEL_COUNTERS:
+            return levels
+        levels = levels - levels.nlargest(LEVEL_COUNTERS + 1).iloc[-1]
+        return levels[levels > 0]
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Get the accumulated statistics.
+
+        Returns:
+            Dict[str, Any]: The "num_rows", the "schema" of the features
+            and the profile of the "columns": per column its "dtype",
+            "count" of non-null values, count of "nulls", estimated
+            number of "distinct" values, exact below
+            DISTINCT_SKETCH_SIZE, and "top" levels with their counts,
+            lower bounds exact below LEVEL_COUNTERS levels; and for
+            numerical columns their "min", "max", "mean" and population
+            variance "var".
+        """
+        columns = {}
+        schema = {}
+        for name, column in self._columns.items():
+            dtype = self._prototype[name].dtype
+            entry = {"dtype": str(dtype),
+                     "count": self._rows - column["nulls"],
+                     "nulls": column["nulls"],
+                     "distinct": self._distinct(column["hashes"]),
+                     "top": self._top(column["levels"], dtype)}
+            if is_numeric_dtype(dtype) and not is_bool_dtype(dtype):
+                entry.update(
+                    min=column["min"], max=column["max"],
+                    mean=float(column["mean"]) if column["count"] else None,
+                    var=float(column["m2"] / column["count"])
+                    if column["count"] else None)
+            columns[name] = entry
+            schema[name] = {**column_schema(dtype, entry["distinct"]),
+                            "sampled": False}
+        return {"num_rows": self._rows, "columns": columns,
+                "schema": schema}
+
+    @staticmethod
+    def _distinct(hashes: np.ndarray) -> int:
+        """The number of distinct values of a column: the number of
+        hashes kept if the sketch is not full, else estimated from the
+        fraction of the hash space below the largest hash kept."""
+        if len(hashes) < DISTINCT_SKETCH_SIZE:
+            return len(hashes)
+        return int((DISTINCT_SKETCH_SIZE - 1) * 2.0 ** 64
+                   / (float(hashes[-1]) + 1))
+
+    @staticmethod
+    def _top(levels: pd.Series, dtype: Any) -> List[List[Any]]:
+        """The TOP_LEVELS most frequent levels of a column, as [level,
+        count] pairs, with integer levels of integer columns as ints."""
+        top = []
+        for level, count in levels.nlargest(TOP_LEVELS).items():
+            level = level.item() if isinstance(level, np.generic) else level
+            if isinstance(level, float) and dtype.kind in "iu":
+                level = int(level)
+            top.append([level, int(count)])
+        return top
+
+
+def profile_table(metadata: Dict[str, Any]) -> Optional[pd.DataFrame]:
+    """The column profile of an ingested dataset, as a table.
+
+    Args:
+        metadata (Dict[str, Any]): The metadata of the dataset.
+
+    Returns:
+        Optional[pd.DataFrame]: A row per column, with its statistics
+        and its most frequent levels, or None if the dataset was not
+        profiled.
+    """
+    if "columns" not in metadata:
+        return None
+    table = pd.DataFrame.from_dict(metadata["columns"], orient="index")
+    table["top"] = table["top"].map(
+        lambda top: ", ".join(f"{level} ({count})" for level, count in top))
+    return table
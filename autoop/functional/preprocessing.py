@@ -1,8 +1,16 @@
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from autoop.core.ml.feature import Feature
 from autoop.core.ml.dataset import Dataset
+import os
 import numpy as np
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import StandardScaler
+
+
+HASH_BUCKETS = 1024  # default number of buckets of hashed features
+TOP_K = 32  # default number of levels kept by the top-k encoding
 
 
 def preprocess_features(
@@ -10,32 +18,343 @@ def preprocess_features(
         dataset: Dataset
         ) -> List[Tuple[str, np.ndarray, dict]]:
     """Preprocess features.
+
+    Categorical features are encoded as their Feature.encoding says:
+    one-hot, hashed or top-k encoded into sparse CSR matrices, so a
+    feature with many levels takes memory per row rather than per level,
+    or ordinal encoded into a dense column. Numerical features are
+    standardized into dense columns. The artifact of each feature is its
+    fitted step, see fit_step, so it can be applied again at inference.
+
+    Each feature is encoded into its own matrix. To encode features into
+    one design matrix, use a PreprocessingExecutor.
+
     Args:
         features (List[Feature]): List of features.
         dataset (Dataset): Dataset object.
     Returns:
         List[str, Tuple[np.ndarray, dict]]: List of preprocessed features.
-        Each ndarray of shape (N, ...)
+        Each ndarray, or sparse matrix, of shape (N, ...)
     """
+    # only decode the columns that are preprocessed
+    raw = dataset.read(columns=[feature.name for feature in features])
+    executor = PreprocessingExecutor()
     results = []
-    raw = dataset.read()
-    for feature in features:
-        if feature.type == "categorical":
-            encoder = OneHotEncoder()
-            data = encoder.fit_transform(
-                raw[feature.name].values.reshape(-1, 1)
-                ).toarray()
-            aritfact = {"type": "OneHotEncoder",
-                        "encoder": encoder.get_params()}
-            results.append((feature.name, data, aritfact))
-        if feature.type == "numerical":
-            scaler = StandardScaler()
-            data = scaler.fit_transform(
-                raw[feature.name].values.reshape(-1, 1)
-                )
-            artifact = {"type": "StandardScaler",
-                        "scaler": scaler.get_params()}
-            results.append((feature.name, data, artifact))
+    for step in executor.fit(features, raw):
+        data = executor.transform(
+            [step], raw, sparse_output=step_width(step) > 1)
+        results.append((step["feature"], data, step))
 
     results = list(sorted(results, key=lambda x: x[0]))
     return results
+
+
+class PreprocessingExecutor():
+    def __init__(self, n_jobs: Optional[int] = None):
+        """
+        Fit and apply the transforms of features concurrently, on a
+        thread pool.
+
+        The transforms are numpy operations, most of which release the
+        GIL, and threads can all write into one output matrix: each
+        feature's block is written straight into its columns of the
+        design matrix, which is allocated once, so there are no blocks
+        per feature to concatenate afterwards.
+
+        Args:
+            n_jobs (Optional[int]): Number of threads. None uses every
+            core, 1 runs in the calling thread.
+        """
+        self._n_jobs = n_jobs or os.cpu_count() or 1
+
+    def fit(self, features: List[Feature],
+            data: pd.DataFrame,
+            profile: Optional[Dict[str, Dict[str, Any]]] = None
+            ) -> List[Dict[str, Any]]:
+        """
+        Fit the transform of each feature.
+
+        Args:
+            features (List[Feature]): The features.
+            data (pd.DataFrame): Their raw values.
+            profile (Optional[Dict[str, Dict[str, Any]]]): The profile
+            of the columns of the dataset the data was read from, as
+            computed at ingestion, to fit the scalers from.
+
+        Returns:
+            List[Dict[str, Any]]: The fitted step of each feature, in
+            the order of the features.
+        """
+        profile = profile or {}
+        return self._map(
+            lambda feature: fit_step(feature, data[feature.name].to_numpy(),
+                                     profile.get(feature.name)),
+            features)
+
+    def transform(self,
+                  steps: List[Dict[str, Any]],
+                  data: pd.DataFrame,
+                  rows: Optional[np.ndarray] = None,
+                  sparse_output: bool = False
+                  ) -> Union[np.ndarray, sparse.csr_matrix]:
+        """
+        Apply fitted steps to raw values, into one design matrix whose
+        columns are the outputs of the steps in turn.
+
+        Every step sets one cell per row. Dense output is allocated
+        zeroed, and each step writes its cells into its columns. Sparse
+        output is a CSR matrix with one entry per row and step, so its
+        arrays are allocated up front: the entry of step f in row i is
+        at i * len(steps) + f, and each step fills its strided slice.
+
+        Args:
+            steps (List[Dict[str, Any]]): The fitted steps.
+            data (pd.DataFrame): The raw values of their features.
+            rows (Optional[np.ndarray]): Indices of the rows of data, in
+            their order in the matrix. Defaults to all rows in order.
+            sparse_output (bool): Whether to build a CSR matrix.
+
+        Returns:
+            Union[np.ndarray, sparse.csr_matrix]: The (rows, columns)
+            design matrix.
+
+        Raises:
+            ValueError: If a one-hot encoded feature has a category that
+            was not fitted.
+        """
+        num_rows = len(data) if rows is None else len(rows)
+        widths = [step_width(step) for step in steps]
+        starts = np.cumsum([0] + widths[:-1])
+        shape = (num_rows, sum(widths))
+        count = len(steps)
+        if sparse_output:
+            indices = np.empty(num_rows * count, dtype=np.intp)
+            values = np.empty(num_rows * count)
+        else:
+            X = np.zeros(shape)
+
+        def write(f: int) -> None:
+            """Write the cells of step f."""
+            step = steps[f]
+            raw = data[step["feature"]].to_numpy()
+            if rows is not None:
+                raw = raw[rows]
+            if sparse_output:
+                column, value = apply_step(step, raw)
+                indices[f::count] = column + starts[f]
+                values[f::count] = value
+            elif step["type"] == "StandardScaler":
+                # straight into the column, without temporaries
+                np.subtract(raw, step["mean"], out=X[:, starts[f]])
+                X[:, starts[f]] /= step["scale"]
+            else:
+                column, value = apply_step(step, raw)
+                X[np.arange(num_rows), column + starts[f]] = value
+
+        self._map(write, range(count))
+        if not sparse_output:
+            return X
+        return sparse.csr_matrix(
+            (values, indices, np.arange(0, num_rows * count + 1, count)),
+            shape=shape)
+
+    def _map(self, function: Callable[[Any], Any],
+             items: Any) -> List[Any]:
+        """Call a function on items on the thread pool, in order."""
+        items = list(items)
+        if self._n_jobs <= 1 or len(items) <= 1:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(min(self._n_jobs, len(items))) as pool:
+            return list(pool.map(function, items))
+
+
+def fit_step(feature: Feature, values: np.ndarray,
+             stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Fit the transform of a feature.
+
+    A step is a dict with the "feature" it reads and its "type":
+    "OneHotEncoder", "TopKEncoder" and "OrdinalEncoder" steps hold the
+    sorted "categories" of the feature, "FeatureHasher" steps its number
+    of "buckets" and "StandardScaler" steps its "mean" and "scale".
+
+    Args:
+        feature (Feature): The feature.
+        values (np.ndarray): Its raw values.
+        stats (Optional[Dict[str, Any]]): The profile of its column. If
+        it has the "mean" and "var" of exactly these values, the scaler
+        is fitted from them without another pass over the values.
+    Returns:
+        Dict[str, Any]: The fitted step.
+    """
+    step = {"feature": feature.name}
+    params = feature.encoding_params
+    if feature.type == "numerical" and stats is not None \
+            and stats.get("var") is not None \
+            and stats["count"] + stats["nulls"] == len(values):
+        scale = float(np.sqrt(stats["var"]))
+        # constant columns are left unscaled, as StandardScaler does
+        return {**step, "type": "StandardScaler",
+                "mean": float(stats["mean"]),
+                "scale": scale if scale > 0 else 1.0}
+    if feature.type == "numerical":
+        scaler = StandardScaler().fit(values.reshape(-1, 1))
+        return {**step, "type": "StandardScaler",
+                "mean": float(scaler.mean_[0]),
+                "scale": float(scaler.scale_[0])}
+    if feature.encoding == "hashing":
+        return {**step, "type": "FeatureHasher",
+                "buckets": params.get("buckets", HASH_BUCKETS)}
+    levels, counts = np.unique(category_values(values), return_counts=True)
+    if feature.encoding == "onehot":
+        return {**step, "type": "OneHotEncoder", "categories": levels}
+    if feature.encoding == "ordinal":
+        return {**step, "type": "OrdinalEncoder", "categories": levels}
+    # the most frequent levels, ties going to the smallest, and all the
+    # other levels in a last column
+    top = levels[np.argsort(-counts, kind="stable")[:params.get("k", TOP_K)]]
+    return {**step, "type": "TopKEncoder", "categories": np.sort(top)}
+
+
+def step_width(step: Dict[str, Any]) -> int:
+    """The number of columns of the output of a step.
+
+    Args:
+        step (Dict[str, Any]): The fitted step.
+    Returns:
+        int: The number of columns.
+    """
+    if step["type"] == "OneHotEncoder":
+        return len(step["categories"])
+    if step["type"] == "TopKEncoder":
+        return len(step["categories"]) + 1
+    if step["type"] == "FeatureHasher":
+        return step["buckets"]
+    return 1
+
+
+def apply_step(step: Dict[str, Any],
+               values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Apply a fitted step to raw values.
+
+    Args:
+        step (Dict[str, Any]): The fitted step.
+        values (np.ndarray): The raw values of its feature.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The column of each row's output
+        within the step's columns, and its value.
+    Raises:
+        ValueError: If a one-hot encoded feature has a category that was
+        not fitted. The other encodings put unseen categories in the
+        "other" column of top-k, or code them -1.
+    """
+    zeros = np.zeros(len(values), dtype=np.intp)
+    ones = np.ones(len(values))
+    if step["type"] == "StandardScaler":
+        return zeros, (values - step["mean"]) / step["scale"]
+    if step["type"] == "FeatureHasher":
+        return hash_buckets(values, step["buckets"]), ones
+    categories = step["categories"]
+    values = category_values(values)
+    codes = category_codes(values, categories)
+    if step["type"] == "OrdinalEncoder":
+        return zeros, codes.astype(float)
+    if step["type"] == "TopKEncoder":
+        codes[codes < 0] = len(categories)
+    elif (codes < 0).any():
+        unknown = np.unique(values[codes < 0]).tolist()
+        raise ValueError(f"Found unknown categories {unknown} in "
+                         f"column {step['feature']}")
+    return codes, ones
+
+
+def unscale(step: Optional[Dict[str, Any]],
+            values: np.ndarray) -> np.ndarray:
+    """Invert a fitted StandardScaler step.
+
+    Args:
+        step (Optional[Dict[str, Any]]): The fitted step, or None to keep
+        the values as they are, e.g. the labels of a classification.
+        values (np.ndarray): The scaled values.
+    Returns:
+        np.ndarray: The values in the units of the step's feature.
+    """
+    if step is None:
+        return values
+    return values * step["scale"] + step["mean"]
+
+
+def hash_buckets(values: np.ndarray, buckets: int) -> np.ndarray:
+    """Hash values into buckets.
+
+    The level of each value, see category_values, is hashed with the
+    fixed key of pandas' hash_array, so a level lands in the same bucket
+    in every process and at inference, whether its column is read as
+    integers or, with missing values, as floats.
+
+    Args:
+        values (np.ndarray): The values.
+        buckets (int): Number of buckets.
+    Returns:
+        np.ndarray: The bucket of each value.
+    """
+    hashes = pd.util.hash_array(category_values(values).astype(object))
+    return (hashes % np.uint64(buckets)).astype(np.intp)
+
+
+def category_values(values: np.ndarray) -> np.ndarray:
+    """The levels of categorical values, as strings.
+
+    Missing values are a level of their own, "nan", and levels compare
+    as strings, so that values of mixed types can be sorted and looked
+    up. Integral floats take the form of integers, so that a level is
+    the same whether its column is read as integers or, with missing
+    values, as floats, e.g. in another chunk of a CSV at inference.
+
+    Args:
+        values (np.ndarray): The values.
+    Returns:
+        np.ndarray: The levels of the values.
+    """
+    values = np.asarray(values)
+    levels = values.astype(object)
+    if values.dtype.kind == "f":
+        integral = _integral(values)
+        levels[integral] = values[integral].astype(np.int64)
+    elif values.dtype.kind == "O":
+        floats = np.fromiter((isinstance(value, (float, np.floating))
+                              for value in levels), bool, len(levels))
+        if floats.any():
+            numbers = levels[floats].astype(float)
+            integral = _integral(numbers)
+            levels[np.flatnonzero(floats)[integral]] = \
+                numbers[integral].astype(np.int64)
+    return np.where(pd.isna(levels), "nan", levels).astype(str)
+
+
+def _integral(values: np.ndarray) -> np.ndarray:
+    """Which floats are integers that an int64 holds.
+
+    Args:
+        values (np.ndarray): The floats.
+    Returns:
+        np.ndarray: Whether each float is integral.
+    """
+    with np.errstate(invalid="ignore"):
+        return (np.abs(values) < 2.0 ** 63) & (values == np.trunc(values))
+
+
+def category_codes(values: np.ndarray, categories: np.ndarray) -> np.ndarray:
+    """Look values up in sorted categories.
+
+    Args:
+        values (np.ndarray): The values.
+        categories (np.ndarray): The sorted categories.
+    Returns:
+        np.ndarray: The position of each value in the categories, or -1
+        if it is not one of them.
+    """
+    codes = np.searchsorted(categories, values)
+    known = codes < len(categories)
+    known[known] = categories[codes[known]] == values[known]
+    codes[~known] = -1
+    return codes
@@ -0,0 +1,171 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def holdout_split(
+        num_rows: int,
+        fraction: float,
+        seed: Optional[int] = None
+        ) -> Tuple[np.ndarray, np.ndarray]:
+    """Split rows into a training and a test set.
+
+    Args:
+        num_rows (int): Number of rows to split.
+        fraction (float): Fraction of the rows in the training set.
+        seed (Optional[int]): Seed of the shuffle. Without a seed the
+        first rows are the training set.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The ascending indices of the
+        training rows and of the test rows.
+    """
+    cut = int(fraction * num_rows)
+    if seed is None:
+        return np.arange(cut), np.arange(cut, num_rows)
+    rank = np.empty(num_rows, dtype=np.intp)
+    rank[np.random.default_rng(seed).permutation(num_rows)] = \
+        np.arange(num_rows)
+    is_train = rank < cut
+    return np.flatnonzero(is_train), np.flatnonzero(~is_train)
+
+
+def stratified_split(
+        labels: np.ndarray,
+        fraction: float,
+        seed: Optional[int] = None
+        ) -> Tuple[np.ndarray, np.ndarray]:
+    """Split rows into a training and a test set, keeping the proportion
+    of every label.
+
+    Each label contributes `int(fraction * count)` of its rows to the
+    training set. After `np.unique` the split takes linear time.
+
+    Args:
+        labels (np.ndarray): The label of each row.
+        fraction (float): Fraction of each label's rows in the training
+        set.
+        seed (Optional[int]): Seed of the shuffle within each label.
+        Without a seed the first rows of each label are the training set.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The ascending indices of the
+        training rows and of the test rows.
+    """
+    codes, rank = _rank_within_labels(labels, seed)
+    counts = np.bincount(codes)
+    is_train = rank < (fraction * counts).astype(int)[codes]
+    return np.flatnonzero(is_train), np.flatnonzero(~is_train)
+
+
+def kfold_split(
+        num_rows: int,
+        k: int,
+        seed: Optional[int] = None
+        ) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Split rows into k folds of (nearly) equal size.
+
+    Args:
+        num_rows (int): Number of rows to split.
+        k (int): Number of folds.
+        seed (Optional[int]): Seed of the shuffle. Without a seed the
+        folds are consecutive blocks of rows.
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray]]: For each fold, the ascending
+        indices of the training rows (the other folds) and of the test
+        rows (the fold).
+
+    Raises:
+        ValueError: If there are fewer rows than folds.
+    """
+    if not 2 <= k <= num_rows:
+        raise ValueError(f"Cannot split {num_rows} rows into {k} folds")
+    position = np.arange(num_rows)
+    if seed is not None:
+        position[np.random.default_rng(seed).permutation(num_rows)] = \
+            np.arange(num_rows)
+    return _folds(position * k // num_rows, k)
+
+
+def stratified_kfold_split(
+        labels: np.ndarray,
+        k: int,
+        seed: Optional[int] = None
+        ) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Split rows into k folds, keeping the proportion of every label.
+
+    The rows of each label are dealt to the folds in turn, so the count
+    of a label differs by at most one between folds.
+
+    Args:
+        labels (np.ndarray): The label of each row.
+        k (int): Number of folds.
+        seed (Optional[int]): Seed of the shuffle within each label.
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray]]: For each fold, the ascending
+        indices of the training rows and of the test rows.
+
+    Raises:
+        ValueError: If there are fewer rows than folds.
+    """
+    codes, rank = _rank_within_labels(labels, seed)
+    if not 2 <= k <= len(codes):
+        raise ValueError(f"Cannot split {len(codes)} rows into {k} folds")
+    # offset each label so the folds that get an extra row rotate
+    counts = np.bincount(codes)
+    offsets = (np.cumsum(counts) - counts) % k
+    return _folds((rank + offsets[codes]) % k, k)
+
+
+def _folds(fold: np.ndarray,
+           k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Turn the fold number of each row into train and test indices.
+
+    Args:
+        fold (np.ndarray): The fold of each row.
+        k (int): Number of folds.
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray]]: The training and test
+        indices of each fold.
+    """
+    return [(np.flatnonzero(fold != i), np.flatnonzero(fold == i))
+            for i in range(k)]
+
+
+def _rank_within_labels(
+        labels: np.ndarray,
+        seed: Optional[int] = None
+        ) -> Tuple[np.ndarray, np.ndarray]:
+    """Number the rows of every label.
+
+    The rows are grouped by label with a stable counting sort of the
+    label codes, so after `np.unique` this takes linear time.
+
+    Args:
+        labels (np.ndarray): The label of each row.
+        seed (Optional[int]): Seed of the shuffle within each label.
+        Without a seed the rows of a label are numbered in order.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The code of each row's label, and
+        the position of each row among the rows of its label.
+    """
+    _, codes = np.unique(np.asarray(labels), return_inverse=True)
+    codes = codes.ravel()
+    num_rows = len(codes)
+    counts = np.bincount(codes)
+    # numpy sorts 16 bit integers with a radix sort when stable
+    keys = codes.astype(np.uint16) \
+        if len(counts) <= np.iinfo(np.uint16).max else codes
+    if seed is None:
+        order = np.argsort(keys, kind="stable")
+    else:
+        permutation = np.random.default_rng(seed).permutation(num_rows)
+        order = permutation[np.argsort(keys[permutation], kind="stable")]
+    starts = np.cumsum(counts) - counts
+    rank = np.empty(num_rows, dtype=np.intp)
+    rank[order] = np.arange(num_rows) - np.repeat(starts, counts)
+    return codes, rank
@@ -0,0 +1,90 @@
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.feature import Feature
+from autoop.core.ml.metric import Metric
+from autoop.core.ml.model import Model, get_model
+from autoop.core.ml.pipeline import Pipeline
+
+
+def synthetic_frame(rows: int = 300, seed: int = 0, scale: float = 1.0,
+                    noise: float = 1.0) -> pd.DataFrame:
+    """
+    A synthetic table with numerical and categorical inputs, and both a
+    regression and a classification target.
+
+    Args:
+        rows (int): Number of rows.
+        seed (int): Seed of the generator.
+        scale (float): Standard deviation of "x".
+        noise (float): Standard deviation of the noise added to "y".
+
+    Returns:
+        pd.DataFrame: The columns "x" and "noise", normally distributed,
+        "color", one of red, green and blue, "y" = 3 * x + 5 if the color
+        is red, plus noise, and "label", "high" where x > 0 else "low".
+    """
+    generator = np.random.default_rng(seed)
+    x = generator.normal(0, scale, size=rows)
+    color = generator.choice(["red", "green", "blue"], size=rows)
+    return pd.DataFrame({
+        "x": x,
+        "noise": generator.normal(size=rows),
+        "color": color,
+        "y": 3 * x + 5 * (color == "red")
+        + noise * generator.normal(size=rows),
+        "label": np.where(x > 0, "high", "low"),
+    })
+
+
+def synthetic_pipeline(data: pd.DataFrame,
+                       model: Union[str, Model],
+                       inputs: List[Union[str, Feature]],
+                       target: str,
+                       metrics: List[Metric],
+                       name: str = "synthetic",
+                       seed: Optional[int] = 0,
+                       **kwargs) -> Pipeline:
+    """
+    A pipeline on a table, stored as a CSV dataset.
+
+    Args:
+        data (pd.DataFrame): The table.
+        model (Union[str, Model]): The model, or its name, see get_model.
+        inputs (List[Union[str, Feature]]): The input features, or the
+        names of the columns, numerical if they have a numeric dtype and
+        categorical otherwise.
+        target (str): Name of the target column, numerical for
+        regression models and categorical for classification models.
+        metrics (List[Metric]): The metrics.
+        name (str): Name of the dataset.
+        seed (Optional[int]): Seed of the pipeline.
+        **kwargs: Other arguments of the Pipeline.
+
+    Returns:
+        Pipeline: The pipeline, not executed.
+    """
+    if isinstance(model, str):
+        model = get_model(model)
+    features = [
+        feature if isinstance(feature, Feature) else Feature(
+            name=feature,
+            type="numerical" if pd.api.types.is_numeric_dtype(data[feature])
+            else "categorical")
+        for feature in inputs
+    ]
+    return Pipeline(
+        metrics=metrics,
+        dataset=Dataset.from_dataframe(data, name=name,
+                                       asset_path=f"{name}.csv"),
+        model=model,
+        input_features=features,
+        target_feature=Feature(
+            name=target, type="numerical" if model.type == "regression"
+            else "categorical"),
+        seed=seed,
+        **kwargs,
+    )
@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from autoop.core.ml.bootstrap import bootstrap, bootstrap_indices
+from autoop.core.ml.metric import (
+    METRICS,
+    Accuracy,
+    confusion_matrix,
+    get_metric,
+)
+from autoop.tests.fixtures import synthetic_pipeline
+
+
+class TestBootstrap(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up predictions of a regression and of a classification.
+        """
+        generator = np.random.default_rng(0)
+        self.values = generator.normal(size=500)
+        self.predictions = self.values + generator.normal(size=500)
+        self.labels = generator.integers(0, 3, 500).astype(str)
+        self.predicted_labels = np.where(generator.random(500) < 0.8,
+                                         self.labels, "0")
+
+    def test_regression(self):
+        """
+        Tests that the vectorized intervals are those of evaluating each
+        replicate of the index matrix in turn.
+        """
+        metrics = [get_metric(name) for name in METRICS[:3]]
+        results = bootstrap(metrics, self.values, self.predictions,
+                            replicates=200, seed=0)
+        indices = bootstrap_indices(500, 200, np.random.default_rng(0))
+        for metric, value, low, high in results:
+            replicates = [metric.evaluate(self.values[rows],
+                                          self.predictions[rows])
+                          for rows in indices]
+            expected = np.quantile(replicates, [0.025, 0.975])
+            self.assertAlmostEqual(low, expected[0])
+            self.assertAlmostEqual(high, expected[1])
+            self.assertEqual(value, metric.evaluate(self.values,
+                                                    self.predictions))
+            self.assertLess(low, value)
+            self.assertLess(value, high)
+
+    def test_classification(self):
+        """
+        Tests that the intervals of the classification metrics surround
+        their value, and narrow as the confidence decreases.
+        """
+        metrics = [get_metric(name) for name in METRICS[3:]]
+        wide = bootstrap(metrics, self.labels, self.predicted_labels,
+                         seed=0)
+        narrow = bootstrap(metrics, self.labels, self.predicted_labels,
+                           confidence=0.5, seed=0)
+        for (metric, value, low, high), (_, _, inner_low, inner_high) \
+                in zip(wide, narrow):
+            self.assertEqual(value, metric.evaluate(self.labels,
+                                                    self.predicted_labels))
+            self.assertLess(low, inner_low)
+            self.assertLess(inner_low, value)
+            self.assertLess(value, inner_high)
+            self.assertLess(inner_high, high)
+
+    def test_stacked_confusion(self):
+        """
+        Tests that the classification metrics of a stack of confusion
+        matrices are those of each matrix.
+        """
+        matrix = confusion_matrix(self.labels, self.predicted_labels)[0]
+        stack = np.stack([matrix, matrix.T, np.zeros_like(matrix)])
+        for name in METRICS[3:]:
+            metric = get_metric(name)
+            np.testing.assert_array_equal(
+                metric.from_confusion(stack),
+                [metric.from_confusion(single) for single in stack])
+
+    def test_pipeline(self):
+        """
+        Tests that a pipeline with bootstrap replicates reports an
+        interval for each test metric.
+        """
+        df = pd.DataFrame({"x": self.values, "label": self.labels})
+        pipeline = synthetic_pipeline(
+            df, "decision_tree_classification", ["x"], "label",
+            [Accuracy()], bootstrap=100)
+        results = pipeline.execute()
+        (metric, value), = results["test metrics"]
+        (interval_metric, low, high), = results["test intervals"]
+        self.assertIs(interval_metric, metric)
+        self.assertLessEqual(low, value)
+        self.assertLessEqual(value, high)
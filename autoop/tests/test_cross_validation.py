@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from autoop.core.ml.metric import Accuracy, WeightedPrecision
+from autoop.core.ml.model import get_model
+from autoop.tests.fixtures import synthetic_frame, synthetic_pipeline
+
+
+class TestCrossValidation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up a classification pipeline with two metrics, on inputs that
+        do not determine the label, so that the folds score differently.
+        The tree is seeded, as it breaks ties between splits at random.
+        """
+        self.metrics = [Accuracy(), WeightedPrecision()]
+        self.pipeline = synthetic_pipeline(
+            synthetic_frame(200),
+            get_model("decision_tree_classification", random_state=0),
+            ["noise", "color"], "label", self.metrics)
+
+    def test_folds(self):
+        """
+        Tests that every repeat has k folds, each with the result of every
+        metric, and that the metrics are the mean and standard deviation
+        over the folds.
+        """
+        results = self.pipeline.cross_validate(k=4, repeats=2, n_jobs=1,
+                                               seed=0)
+        folds = results["folds"]
+        self.assertEqual([(fold["repeat"], fold["fold"]) for fold in folds],
+                         [(repeat, fold) for repeat in range(2)
+                          for fold in range(4)])
+        values = np.array([[result for _, result in fold["metrics"]]
+                           for fold in folds])
+        self.assertEqual(values.shape, (8, 2))
+        for fold in folds:
+            self.assertEqual([metric for metric, _ in fold["metrics"]],
+                             self.metrics)
+        self.assertTrue(np.all((values >= 0) & (values <= 1)))
+        self.assertGreater(len(np.unique(values[:, 0])), 1)
+        self.assertEqual([metric for metric, *_ in results["metrics"]],
+                         self.metrics)
+        means = [mean for _, mean, _ in results["metrics"]]
+        stds = [std for *_, std in results["metrics"]]
+        np.testing.assert_allclose(means, values.mean(axis=0))
+        np.testing.assert_allclose(stds, values.std(axis=0))
+
+    def test_n_jobs(self):
+        """
+        Tests that the folds give the same results on a process pool as in
+        the calling process.
+        """
+        serial = self.pipeline.cross_validate(k=4, repeats=2, n_jobs=1,
+                                              seed=0)
+        pooled = self.pipeline.cross_validate(k=4, repeats=2, n_jobs=2,
+                                              seed=0)
+        for expected, fold in zip(serial["folds"], pooled["folds"]):
+            self.assertEqual(fold["fold"], expected["fold"])
+            self.assertEqual([result for _, result in fold["metrics"]],
+                             [result for _, result in expected["metrics"]])
+        self.assertEqual([result[1:] for result in pooled["metrics"]],
+                         [result[1:] for result in serial["metrics"]])
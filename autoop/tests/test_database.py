@@ -1,9 +1,23 @@
 import unittest
 
-from autoop.core.database import Database
+from autoop.core.database import Database, SQLiteDatabase
 from autoop.core.storage import LocalStorage
 import random
 import tempfile
+import threading
+import os
+
+
+class CountingStorage(LocalStorage):
+    """LocalStorage that records the keys written through save."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.saved = []
+
+    def save(self, data: bytes, key: str):
+        self.saved.append(key)
+        super().save(data, key)
 
 
 class TestDatabase(unittest.TestCase):
@@ -96,3 +110,250 @@ class TestDatabase(unittest.TestCase):
         self.db.set("collection", key, value)
         # collection should now contain the key
         self.assertIn((key, value), self.db.list("collection"))
+
+    def test_persist_only_changed(self):
+        """
+        Tests that setting an entry only writes that entry to storage,
+        regardless of how many entries the collection already holds,
+        and the generation token that other instances poll on refresh.
+        """
+        storage = CountingStorage(tempfile.mkdtemp())
+        db = Database(storage)
+        for i in range(20):
+            db.set("collection", str(i), {"key": i})
+        storage.saved.clear()
+        db.set("collection", "new", {"key": -1})
+        self.assertEqual(storage.saved, [f"collection{os.sep}new",
+                                         Database.GENERATION_KEY])
+
+    def test_delete_persisted(self):
+        """
+        Tests that a deleted entry is removed from storage, so a new
+        instance of the Database class does not see it.
+        """
+        self.db.set("collection", "a", {"key": 1})
+        self.db.set("collection", "b", {"key": 2})
+        self.db.delete("collection", "a")
+        other_db = Database(self.storage)
+        self.assertIsNone(other_db.get("collection", "a"))
+        self.assertEqual(other_db.get("collection", "b")["key"], 2)
+
+    def test_journaled_persistance(self):
+        """
+        Tests that a journaled database writes a single journal and that a
+        new instance replays it, including deletions.
+        """
+        storage = CountingStorage(tempfile.mkdtemp())
+        db = Database(storage, journaled=True)
+        with db.batch():
+            for i in range(10):
+                db.set("collection", str(i), {"key": i})
+        db.delete("collection", "3")
+        self.assertEqual(storage.saved, [])
+        self.assertEqual(storage.list(""), [Database.JOURNAL_KEY])
+        other_db = Database(storage, journaled=True)
+        self.assertEqual(len(other_db.list("collection")), 9)
+        self.assertIsNone(other_db.get("collection", "3"))
+
+    def test_journaled_compaction(self):
+        """
+        Tests that compaction folds the journal into a snapshot and drops
+        it, without losing entries written afterwards.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        db = Database(storage, journaled=True, compact_threshold=10 ** 6)
+        for i in range(5):
+            db.set("collection", str(i), {"key": i})
+        db.compact()
+        self.assertEqual(storage.list(""), [Database.SNAPSHOT_KEY])
+        db.set("collection", "5", {"key": 5})
+        db.delete("collection", "0")
+        other_db = Database(storage, journaled=True)
+        self.assertEqual(sorted(id for id, _ in other_db.list("collection")),
+                         ["1", "2", "3", "4", "5"])
+
+    def test_journaled_two_writers(self):
+        """
+        Tests that two journaled instances on the same storage both have
+        their records replayed, in the order they were appended, also
+        after one of them compacts the journal.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        db = Database(storage, journaled=True, compact_threshold=10 ** 6)
+        other_db = Database(storage, journaled=True,
+                            compact_threshold=10 ** 6)
+        db.set("collection", "k", {"key": 1})
+        other_db.set("collection", "k2", {"key": 2})
+        other_db.set("collection", "k", {"key": 3})
+        fresh_db = Database(storage, journaled=True)
+        self.assertEqual(sorted(id for id, _ in fresh_db.list("collection")),
+                         ["k", "k2"])
+        self.assertEqual(fresh_db.get("collection", "k")["key"], 3)
+        db.compact()
+        other_db.set("collection", "k3", {"key": 4})
+        db.delete("collection", "k2")
+        fresh_db = Database(storage, journaled=True)
+        self.assertEqual(sorted(id for id, _ in fresh_db.list("collection")),
+                         ["k", "k3"])
+        self.assertEqual(fresh_db.get("collection", "k")["key"], 3)
+
+    def test_refresh_incremental(self):
+        """
+        Tests that refresh only reloads entries changed by another
+        instance and does not touch storage entries when nothing changed.
+        """
+        storage = CountingStorage(tempfile.mkdtemp())
+        db = Database(storage)
+        for i in range(5):
+            db.set("collection", str(i), {"key": i})
+        other_db = Database(storage)
+        loaded = []
+        original_load = storage.load
+        storage.load = lambda key: loaded.append(key) or original_load(key)
+        other_db.refresh()
+        self.assertEqual(loaded, [Database.GENERATION_KEY])
+        db.set("collection", "2", {"key": 20})
+        db.delete("collection", "3")
+        loaded.clear()
+        other_db.refresh()
+        self.assertEqual(loaded, [Database.GENERATION_KEY,
+                                  f"collection{os.sep}2"])
+        self.assertEqual(other_db.get("collection", "2")["key"], 20)
+        self.assertIsNone(other_db.get("collection", "3"))
+
+    def test_refresh_without_generation(self):
+        """
+        Tests that a tree written before generation tokens gets one when
+        it is loaded, so refreshing it unchanged is a single small read.
+        """
+        storage = CountingStorage(tempfile.mkdtemp())
+        db = Database(storage)
+        for i in range(5):
+            db.set("collection", str(i), {"key": i})
+        storage.delete(Database.GENERATION_KEY)
+        other_db = Database(storage)
+        loaded = []
+        original_load = storage.load
+        storage.load = lambda key: loaded.append(key) or original_load(key)
+        original_list = storage.list
+        storage.list = lambda prefix: loaded.append("list") or \
+            original_list(prefix)
+        other_db.refresh()
+        self.assertEqual(loaded, [Database.GENERATION_KEY])
+        self.assertEqual(len(other_db.list("collection")), 5)
+
+    def test_refresh_journaled(self):
+        """
+        Tests that a journaled database picks up records appended by
+        another instance, and reloads after a compaction.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        db = Database(storage, journaled=True)
+        db.set("collection", "a", {"key": 1})
+        other_db = Database(storage, journaled=True)
+        db.set("collection", "b", {"key": 2})
+        other_db.refresh()
+        self.assertEqual(other_db.get("collection", "b")["key"], 2)
+        db.compact()
+        db.delete("collection", "a")
+        other_db.refresh()
+        self.assertIsNone(other_db.get("collection", "a"))
+        self.assertEqual(other_db.get("collection", "b")["key"], 2)
+
+    def test_compaction_interleaved(self):
+        """
+        Tests that an instance refreshing while a compaction switches the
+        journal, and an append waiting on the compaction, lose no record.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        db = Database(storage, journaled=True, compact_threshold=10 ** 6)
+        reader = Database(storage, journaled=True)
+        writer = Database(storage, journaled=True)
+        for i in range(5):
+            db.set("collection", str(i), {"key": i})
+        late = threading.Thread(
+            target=writer.set, args=("collection", "late", {"key": 5}))
+        save = storage.save
+
+        def interleave(data: bytes, key: str):
+            save(data, key)
+            if key == Database.SNAPSHOT_KEY:
+                reader.refresh()
+                late.start()
+                late.join(timeout=0.2)
+                # the append waits for the compaction to switch journals
+                self.assertTrue(late.is_alive())
+
+        storage.save = interleave
+        db.compact()
+        late.join()
+        storage.save = save
+        db.set("collection", "after", {"key": 6})
+        reader.refresh()
+        expected = sorted([str(i) for i in range(5)] + ["late", "after"])
+        self.assertEqual(sorted(id for id, _ in reader.list("collection")),
+                         expected)
+        fresh_db = Database(storage, journaled=True)
+        self.assertEqual(sorted(id for id, _ in fresh_db.list("collection")),
+                         expected)
+
+    def test_refresh_two_writers(self):
+        """
+        Tests that refresh picks up the records of two other journaled
+        instances, in the order they were appended.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        reader = Database(storage, journaled=True)
+        db = Database(storage, journaled=True)
+        other_db = Database(storage, journaled=True)
+        db.set("collection", "k", {"key": 1})
+        other_db.set("collection", "k2", {"key": 2})
+        db.set("collection", "k2", {"key": 3})
+        reader.refresh()
+        self.assertEqual(reader.get("collection", "k")["key"], 1)
+        self.assertEqual(reader.get("collection", "k2")["key"], 3)
+        other_db.refresh()
+        self.assertEqual(other_db.get("collection", "k2")["key"], 3)
+
+
+class TestSQLiteDatabase(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a SQLiteDatabase in a temporary directory.
+        """
+        self.path = os.path.join(tempfile.mkdtemp(), "test.sqlite")
+        self.db = SQLiteDatabase(self.path)
+
+    def test_set_get_delete(self):
+        """
+        Tests that entries can be stored, read back by a new instance
+        and deleted.
+        """
+        self.db.set("collection", "a", {"key": 1})
+        other_db = SQLiteDatabase(self.path)
+        self.assertEqual(other_db.get("collection", "a"), {"key": 1})
+        self.db.delete("collection", "a")
+        self.assertIsNone(other_db.get("collection", "a"))
+        self.assertEqual(other_db.list("collection"), [])
+
+    def test_query_and_latest(self):
+        """
+        Tests that query filters on the indexed fields and that latest
+        compares versions numerically.
+        """
+        for version in ["1.2.0", "1.10.0", "1.9.3"]:
+            self.db.set("artifacts", f"model:{version}", {
+                "name": "model", "version": version, "type": "pipeline",
+                "tags": ["prod"] if version == "1.9.3" else []})
+        self.db.set("artifacts", "data:1.0.0", {
+            "name": "data", "version": "1.0.0", "type": "dataset",
+            "tags": []})
+        ids = [id for id, _ in self.db.query("artifacts", type="pipeline")]
+        self.assertEqual(len(ids), 3)
+        self.assertEqual([id for id, _ in
+                          self.db.query("artifacts", tag="prod")],
+                         ["model:1.9.3"])
+        self.assertEqual(self.db.latest("artifacts", "model")[0],
+                         "model:1.10.0")
+        self.assertIsNone(self.db.latest("artifacts", "missing"))
@@ -0,0 +1,220 @@
+import io
+import unittest
+from unittest import mock
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from autoop.core.ml.dataset import Dataset, FrameCache, frame_cache
+from autoop.core.ml.formats import DATASET_FORMATS, get_format
+from autoop.core.storage import LocalStorage
+
+
+class TestDataset(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up a small dataset with a numerical and a categorical column.
+        """
+        frame_cache.clear()
+        self.df = pd.DataFrame({
+            "number": np.arange(10, dtype="int64"),
+            "label": list("abcdeabcde"),
+        })
+        self.dataset = Dataset.from_dataframe(
+            name="small",
+            asset_path="small.csv",
+            data=self.df,
+        )
+
+    def test_read(self):
+        """
+        Tests that reading the dataset returns the original DataFrame.
+        """
+        pd.testing.assert_frame_equal(self.dataset.read(), self.df,
+                                      check_dtype=False)
+
+    def test_read_parses_once(self):
+        """
+        Tests that repeated reads of the same payload parse it only once,
+        and that modifying a returned frame does not change later reads.
+        """
+        with mock.patch("pandas.read_csv", wraps=pd.read_csv) as read_csv:
+            first = self.dataset.read()
+            first.loc[0, "number"] = 100
+            second = self.dataset.read()
+        self.assertEqual(read_csv.call_count, 1)
+        self.assertEqual(second.loc[0, "number"], 0)
+
+    def test_read_without_copy_on_write(self):
+        """
+        Tests that without pandas copy-on-write the frame read is a deep
+        copy of the cached one, sharing no memory with it.
+        """
+        cached = self.dataset.read()
+        with mock.patch("autoop.core.ml.dataset._copy_on_write",
+                        return_value=False):
+            frame = self.dataset.read()
+        self.assertFalse(np.shares_memory(frame["number"].to_numpy(),
+                                          cached["number"].to_numpy()))
+
+    def test_frame_cache_eviction(self):
+        """
+        Tests that the cache evicts the least recently used frame once
+        its memory budget is exceeded.
+        """
+        frame = pd.DataFrame({"x": np.zeros(100)})
+        size = int(frame.memory_usage(deep=True).sum())
+        cache = FrameCache(max_bytes=2 * size)
+        cache.put("a", frame)
+        cache.put("b", frame)
+        cache.get("a")
+        cache.put("c", frame)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.size, 2 * size)
+
+    def test_columnar_round_trip(self):
+        """
+        Tests that the columnar format preserves values and dtypes,
+        including nullable, categorical and datetime columns.
+        """
+        df = self.df.assign(
+            ratio=np.linspace(0, 1, 10),
+            flag=np.arange(10) % 2 == 0,
+            count=pd.array([1, None] * 5, dtype="Int64"),
+            level=pd.Categorical(list("xyzxyzxyzx"), ordered=True),
+            when=pd.date_range("2024-01-01", periods=10),
+        )
+        dataset = Dataset.from_dataframe(
+            name="typed",
+            asset_path="typed.columnar",
+            data=df,
+            format="columnar",
+        )
+        self.assertEqual(dataset.format, "columnar")
+        pd.testing.assert_frame_equal(dataset.read(), df)
+
+    def test_read_legacy_csv(self):
+        """
+        Tests that datasets registered without a format in their metadata
+        are read as CSV.
+        """
+        dataset = Dataset(
+            name="legacy",
+            asset_path="legacy.csv",
+            version="1.0.0",
+            data=self.df.to_csv(index=False).encode(),
+        )
+        self.assertEqual(dataset.format, "csv")
+        pd.testing.assert_frame_equal(dataset.read(), self.df,
+                                      check_dtype=False)
+
+    def test_read_mapped_columns(self):
+        """
+        Tests that a projection of a memory-mapped columnar payload only
+        decodes the requested columns, as views on the mapping.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        encoded = Dataset.from_dataframe(
+            name="mapped",
+            asset_path="mapped.columnar",
+            data=self.df.assign(ratio=np.linspace(0, 1, 10)),
+            format="columnar",
+        )
+        storage.save(encoded.data, encoded.asset_path)
+        dataset = Dataset(
+            name="mapped",
+            asset_path="mapped.columnar",
+            version="1.0.0",
+            data=storage.map("mapped.columnar"),
+            metadata=encoded.metadata,
+        )
+        frame = dataset.read(columns=["ratio", "number"])
+        self.assertEqual(list(frame.columns), ["ratio", "number"])
+        arrays = dataset.read_arrays(["number"])
+        np.testing.assert_array_equal(arrays["number"], np.arange(10))
+        self.assertFalse(arrays["number"].flags.writeable)
+        self.assertFalse(arrays["number"].flags.owndata)
+
+    def test_read_csv_columns(self):
+        """
+        Tests that projections of a CSV payload keep the requested order
+        and are served from the cached full frame.
+        """
+        self.dataset.read()
+        with mock.patch("pandas.read_csv", wraps=pd.read_csv) as read_csv:
+            frame = self.dataset.read(columns=["label", "number"])
+        self.assertEqual(read_csv.call_count, 0)
+        self.assertEqual(list(frame.columns), ["label", "number"])
+
+    def test_read_rows(self):
+        """
+        Tests that reading some rows gives the same frame as taking them
+        from a full read, in every format, and that the columnar format
+        only gathers them, across row groups.
+        """
+        df = self.df.assign(
+            count=pd.array([1, None] * 5, dtype="Int64"),
+            level=pd.Categorical(list("xyzxyzxyzx")),
+        )
+        rows = np.array([0, 3, 4, 9])
+        for format in ["csv", "columnar"]:
+            dataset = Dataset.from_dataframe(
+                name="rows", asset_path=f"rows.{format}", data=df,
+                format=format)
+            self.assertEqual(dataset.num_rows, 10)
+            pd.testing.assert_frame_equal(
+                dataset.read_rows(rows, columns=["label", "number"]),
+                df[["label", "number"]].iloc[rows].reset_index(drop=True),
+                check_dtype=False)
+        storage = LocalStorage(tempfile.mkdtemp())
+        with storage.open_write("rows.columnar") as stream:
+            with get_format("columnar").writer(stream) as writer:
+                writer.write(df[:4])
+                writer.write(df[4:])
+        frame = get_format("columnar").decode_rows(
+            storage.load("rows.columnar"), rows)
+        pd.testing.assert_frame_equal(
+            frame, df.iloc[rows].reset_index(drop=True), check_dtype=False)
+
+    @unittest.skipIf(pyarrow is None, "parquet needs pyarrow")
+    def test_parquet_writer(self):
+        """
+        Tests that the parquet writer stores every chunk as a row group,
+        casting chunks read with other dtypes to the first chunk's.
+        """
+        first = pd.DataFrame({"count": [1.0, None], "label": ["a", "b"]})
+        second = pd.DataFrame({"count": [3, 4], "label": ["c", "d"]})
+        stream = io.BytesIO()
+        with get_format("parquet").writer(stream) as writer:
+            writer.write(first)
+            writer.write(second)
+        payload = stream.getvalue()
+        self.assertEqual(
+            pyarrow.parquet.ParquetFile(io.BytesIO(payload)).num_row_groups,
+            2)
+        pd.testing.assert_frame_equal(
+            get_format("parquet").decode(payload),
+            pd.concat([first, second], ignore_index=True),
+            check_dtype=False)
+        with self.assertRaises(ValueError):
+            with get_format("parquet").writer(io.BytesIO()) as writer:
+                writer.write(first)
+                writer.write(first.rename(columns={"label": "name"}))
+
+    def test_formats(self):
+        """
+        Tests that parquet is offered exactly when pyarrow is installed.
+        """
+        self.assertEqual("parquet" in DATASET_FORMATS, pyarrow is not None)
+        self.assertEqual(get_format("parquet") is not None,
+                         pyarrow is not None)
+
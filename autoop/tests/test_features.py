@@ -1,10 +1,16 @@
 import unittest
+from unittest import mock
 from sklearn.datasets import load_iris, fetch_openml
+import numpy as np
 import pandas as pd
 
 from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.feature import Feature
-from autoop.functional.feature import detect_feature_types
+from autoop.functional.feature import (
+    detect_feature_types,
+    infer_schema,
+    sample_size,
+)
 
 
 class TestFeatures(unittest.TestCase):
@@ -86,3 +92,90 @@ class TestFeatures(unittest.TestCase):
         for detected_feature in filter(lambda x: x.name in
                                        categorical_columns, features):
             self.assertEqual(detected_feature.type, "categorical")
+
+    def test_detect_high_cardinality(self):
+        """
+        Test that categorical features with many levels are hashed, and
+        those with few are one-hot encoded.
+        """
+        df = pd.DataFrame({
+            "id": [f"user{i}" for i in range(500)],
+            "group": ["a", "b"] * 250,
+        })
+        dataset = Dataset.from_dataframe(name="users",
+                                         asset_path="users.csv", data=df)
+        encodings = {feature.name: feature.encoding
+                     for feature in detect_feature_types(dataset)}
+        self.assertEqual(encodings, {"id": "hashing", "group": "onehot"})
+
+    def test_schema_cached(self):
+        """
+        Test that the schema is cached in the metadata, and dropped when
+        the data changes.
+        """
+        df = pd.DataFrame({"x": np.arange(50.0), "group": ["a", "b"] * 25})
+        dataset = Dataset.from_dataframe(name="cached",
+                                         asset_path="cached.csv", data=df)
+        detect_feature_types(dataset)
+        self.assertEqual(dataset.metadata["schema"]["x"]["type"],
+                         "numerical")
+        dataset.metadata["schema"]["x"]["type"] = "categorical"
+        types = {feature.name: feature.type
+                 for feature in detect_feature_types(dataset)}
+        self.assertEqual(types["x"], "categorical")
+        dataset.save(df)
+        self.assertNotIn("schema", dataset.metadata)
+
+    def test_sampled_schema(self):
+        """
+        Test that a sample gives the schema of the whole table when every
+        level is frequent, and that levels are counted on the sample.
+        """
+        self.assertEqual(sample_size(0.99, 0.001), 11513)
+        size = sample_size(0.99, 0.01)
+        generator = np.random.default_rng(0)
+        df = pd.DataFrame({
+            "x": generator.normal(size=10 * size),
+            "digit": generator.integers(0, 5, size=10 * size),
+            "id": [f"id{i}" for i in range(10 * size)],
+        })
+        exact = infer_schema(df)
+        sampled = infer_schema(df, sample=True, tolerance=0.01)
+        for column in df.columns:
+            self.assertEqual(sampled[column]["type"],
+                             exact[column]["type"])
+            self.assertEqual(sampled[column]["encoding"],
+                             exact[column]["encoding"])
+        self.assertEqual(exact["digit"]["type"], "categorical")
+        self.assertEqual(sampled["id"]["levels"], size)
+        self.assertTrue(sampled["id"]["sampled"])
+        self.assertFalse(exact["id"]["sampled"])
+
+    def test_sampled_detection(self):
+        """
+        Test that a sampled detection reads only the sampled rows, that
+        an exact detection does not reuse a sampled schema, and that
+        inferred schemas are persisted.
+        """
+        size = sample_size()
+        df = pd.DataFrame({"x": np.arange(2 * size, dtype=float),
+                           "group": ["a", "b"] * size})
+        dataset = Dataset.from_dataframe(name="big", asset_path="big.bin",
+                                         data=df, format="columnar")
+        persisted = []
+        with mock.patch.object(Dataset, "read",
+                               side_effect=AssertionError("full read")):
+            detect_feature_types(dataset, sample=True,
+                                 persist=persisted.append)
+        schema = dataset.metadata["schema"]
+        self.assertTrue(schema["x"]["sampled"])
+        self.assertEqual(schema["x"]["levels"], size)
+        self.assertEqual(persisted, [dataset])
+        detect_feature_types(dataset, sample=True, persist=persisted.append)
+        self.assertEqual(len(persisted), 1)
+        detect_feature_types(dataset, persist=persisted.append)
+        self.assertFalse(dataset.metadata["schema"]["x"]["sampled"])
+        self.assertEqual(dataset.metadata["schema"]["x"]["levels"],
+                         2 * size)
+        self.assertEqual(len(persisted), 2)
+
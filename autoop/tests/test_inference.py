@@ -0,0 +1,180 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from autoop.core.ml.feature import ENCODINGS, Feature
+from autoop.core.ml.metric import MeanSquaredError
+from autoop.core.ml.model.model import SklearnWrapperModel
+from autoop.core.ml.pipeline import Pipeline
+from autoop.functional.preprocessing import PreprocessingExecutor
+from autoop.functional.split import holdout_split
+from autoop.tests.fixtures import synthetic_frame, synthetic_pipeline
+
+
+class TestInferencePlan(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up a trained regression pipeline on a synthetic dataset with
+        a categorical and numerical features, and a noiseless target.
+        """
+        self.df = synthetic_frame(300, scale=3, noise=0)
+        self.pipeline = synthetic_pipeline(
+            self.df, "multiple_linear_regression", ["x", "color", "noise"],
+            "y", [MeanSquaredError()])
+        self.pipeline.execute()
+
+    @staticmethod
+    def _design_matrix(pipeline: Pipeline) -> np.ndarray:
+        """
+        Encodes the rows of a pipeline's dataset, in order, as in
+        training.
+        """
+        pipeline._preprocess_features()
+        pipeline._build_design_matrix(np.arange(len(pipeline._raw)))
+        X = pipeline._X
+        return X.toarray() if sparse.issparse(X) else X
+
+    def test_transform(self):
+        """
+        Tests that the plan encodes raw data as in training.
+        """
+        plan = self.pipeline.inference_plan()
+        self.assertEqual(plan.input_features, ["color", "noise", "x"])
+        np.testing.assert_allclose(plan.transform(self.df),
+                                   self._design_matrix(self.pipeline))
+
+    def test_predict(self):
+        """
+        Tests that regression predictions are in the units of the target,
+        and that unseen categories are rejected.
+        """
+        plan = self.pipeline.inference_plan()
+        np.testing.assert_allclose(plan.predict(self.df[:10]),
+                                   self.df["y"][:10], atol=1e-6)
+        unseen = self.df[:1].assign(color="purple")
+        with self.assertRaises(ValueError):
+            plan.predict(unseen)
+
+    def test_metrics(self):
+        """
+        Tests that the pipeline reports its regression metrics, their
+        bootstrap intervals and its predictions in the units of the
+        target, as the plan does.
+        """
+        df = synthetic_frame(300, scale=3)
+        pipeline = synthetic_pipeline(df, "multiple_linear_regression",
+                                      ["x", "color"], "y",
+                                      [MeanSquaredError()], bootstrap=100)
+        results = pipeline.execute()
+        _, test = holdout_split(len(df), pipeline._split, pipeline._seed)
+        predictions = pipeline.inference_plan().predict(df.iloc[test])
+        np.testing.assert_allclose(results["predictions"], predictions)
+        truth = df["y"].to_numpy()[test]
+        (_, mse), = results["test metrics"]
+        self.assertAlmostEqual(mse, np.mean((truth - predictions) ** 2))
+        self.assertGreater(mse, 0.5)
+        (_, low, high), = results["test intervals"]
+        self.assertLessEqual(low, mse)
+        self.assertGreaterEqual(high, mse)
+
+    def test_sparse(self):
+        """
+        Tests that a high-cardinality categorical feature stays sparse
+        from preprocessing to the model and the plan, and that models
+        that do not accept sparse input get it dense.
+        """
+        df = self.df.assign(id=[f"id{i}" for i in range(len(self.df))])
+        pipeline = synthetic_pipeline(df, "ridge_regression", ["x", "id"],
+                                      "y", [MeanSquaredError()], name="ids")
+        pipeline.execute()
+        self.assertTrue(sparse.issparse(pipeline._train_X))
+        plan = pipeline.inference_plan()
+        X = plan.transform(df)
+        self.assertTrue(sparse.issparse(X))
+        np.testing.assert_allclose(X.toarray(),
+                                   self._design_matrix(pipeline))
+        dense = SklearnWrapperModel(None, "regression", accepts_sparse=False)
+        self.assertIsInstance(dense._input(X), np.ndarray)
+
+    def test_encodings(self):
+        """
+        Tests that the bounded encodings have the expected widths, that
+        the plan reproduces them, and that unseen levels are accepted.
+        """
+        df = self.df.assign(id=[f"id{i % 200}" for i in range(300)])
+        widths = {"hashing": 16, "topk": 6, "ordinal": 1}
+        for encoding, params in [("hashing", {"buckets": 16}),
+                                 ("topk", {"k": 5}),
+                                 ("ordinal", {})]:
+            pipeline = synthetic_pipeline(
+                df, "ridge_regression",
+                [Feature(name="id", type="categorical", encoding=encoding,
+                         encoding_params=params)],
+                "y", [MeanSquaredError()], name="ids")
+            pipeline.execute()
+            self.assertEqual(pipeline._X.shape[1], widths[encoding])
+            plan = pipeline.inference_plan()
+            X = plan.transform(df)
+            X = X.toarray() if sparse.issparse(X) else X
+            np.testing.assert_array_equal(X, self._design_matrix(pipeline))
+            plan.predict(df[:1].assign(id="unseen"))
+
+    def test_float_levels(self):
+        """
+        Tests that a numeric categorical column read as floats, because of
+        missing values, when training, has the same levels when it is read
+        as integers at inference, for every encoding.
+        """
+        grade = np.arange(300) % 3 + 1
+        df = self.df.assign(grade=np.where(np.arange(300) % 50 == 0, np.nan,
+                                           grade))
+        scored = self.df.assign(grade=grade)
+        known = df["grade"].notna().to_numpy()
+        for encoding in ENCODINGS:
+            pipeline = synthetic_pipeline(
+                df, "ridge_regression",
+                [Feature(name="grade", type="categorical",
+                         encoding=encoding)],
+                "y", [MeanSquaredError()])
+            pipeline.execute()
+            plan = pipeline.inference_plan()
+            X = plan.transform(scored)
+            X = X.toarray() if sparse.issparse(X) else X
+            expected = self._design_matrix(pipeline)
+            np.testing.assert_array_equal(X[known], expected[known],
+                                          err_msg=encoding)
+
+    def test_executor(self):
+        """
+        Tests that the executor builds the same matrix on threads and in
+        the calling thread, dense and sparse, and with missing levels.
+        """
+        df = self.df.assign(color=self.df["color"].where(self.df["x"] > -1))
+        features = [Feature(name="x", type="numerical"),
+                    Feature(name="color", type="categorical"),
+                    Feature(name="color", type="categorical",
+                            encoding="hashing",
+                            encoding_params={"buckets": 8})]
+        steps = PreprocessingExecutor(n_jobs=1).fit(features, df)
+        rows = np.arange(len(df))[::-1]
+        expected = PreprocessingExecutor(n_jobs=1).transform(steps, df, rows)
+        self.assertEqual(expected.shape, (300, 1 + 4 + 8))
+        for n_jobs in [1, 3]:
+            executor = PreprocessingExecutor(n_jobs=n_jobs)
+            np.testing.assert_array_equal(
+                executor.transform(steps, df, rows), expected)
+            np.testing.assert_array_equal(
+                executor.transform(steps, df, rows,
+                                   sparse_output=True).toarray(), expected)
+
+    def test_not_executed(self):
+        """
+        Tests that an untrained pipeline cannot be compiled.
+        """
+        pipeline = synthetic_pipeline(self.df, "multiple_linear_regression",
+                                      ["x"], "y", [MeanSquaredError()])
+        with self.assertRaises(RuntimeError):
+            pipeline.inference_plan()
@@ -0,0 +1,123 @@
+import unittest
+import io
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.feature import Feature
+from autoop.core.ml.formats import ColumnarFormat
+from autoop.core.storage import LocalStorage
+from autoop.functional.ingestion import (
+    DISTINCT_SKETCH_SIZE,
+    ingest_csv,
+)
+from autoop.functional.preprocessing import fit_step
+
+
+class TestIngestion(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up a CSV whose later rows have missing values, so the chunks
+        are parsed with different dtypes.
+        """
+        self.storage = LocalStorage(tempfile.mkdtemp())
+        self.df = pd.DataFrame({
+            "number": [float(i) if i < 20 else np.nan for i in range(25)],
+            "count": np.arange(25),
+            "label": list("abcde") * 5,
+        })
+        self.csv = self.df.to_csv(index=False).encode()
+
+    def _read(self, metadata: dict, asset_path: str) -> pd.DataFrame:
+        """
+        Reads an ingested dataset back from storage.
+        """
+        return Dataset(name="ingested", asset_path=asset_path,
+                       version="1.0.0", metadata=metadata,
+                       data=self.storage.map(asset_path)).read()
+
+    def test_ingest_columnar(self):
+        """
+        Tests that chunked ingestion into the columnar format gives the
+        same frame as parsing the whole CSV, with one row group per chunk.
+        """
+        metadata = ingest_csv(io.BytesIO(self.csv), self.storage,
+                              "data.columnar", chunksize=10)
+        pd.testing.assert_frame_equal(
+            self._read(metadata, "data.columnar"),
+            pd.read_csv(io.BytesIO(self.csv)), check_dtype=False)
+        footer = ColumnarFormat().read_footer(
+            self.storage.load("data.columnar"))
+        self.assertEqual(len(footer["row_groups"]), 3)
+
+    def test_ingest_csv(self):
+        """
+        Tests that chunked ingestion into CSV writes the header once.
+        """
+        metadata = ingest_csv(io.BytesIO(self.csv), self.storage,
+                              "data.csv", format="csv", chunksize=10)
+        pd.testing.assert_frame_equal(self._read(metadata, "data.csv"),
+                                      pd.read_csv(io.BytesIO(self.csv)))
+
+    def test_statistics(self):
+        """
+        Tests the schema and statistics computed while streaming.
+        """
+        metadata = ingest_csv(io.BytesIO(self.csv), self.storage,
+                              "data.columnar", chunksize=10)
+        self.assertEqual(metadata["format"], "columnar")
+        self.assertEqual(metadata["num_rows"], 25)
+        number = metadata["columns"]["number"]
+        self.assertEqual(number["dtype"], "float64")
+        self.assertEqual((number["count"], number["nulls"]), (20, 5))
+        self.assertEqual((number["min"], number["max"]), (0.0, 19.0))
+        self.assertEqual(metadata["columns"]["count"]["max"], 24)
+        self.assertNotIn("min", metadata["columns"]["label"])
+        schema = metadata["schema"]
+        self.assertEqual(schema["number"]["type"], "numerical")
+        self.assertEqual(schema["label"]["type"], "categorical")
+        self.assertEqual(schema["label"]["levels"], 5)
+        self.assertFalse(schema["label"]["sampled"])
+
+    def test_profile(self):
+        """
+        Tests that the profile merged chunk by chunk matches the whole
+        columns, and that scalers are fitted from it.
+        """
+        metadata = ingest_csv(io.BytesIO(self.csv), self.storage,
+                              "data.columnar", chunksize=10)
+        number = metadata["columns"]["number"]
+        self.assertAlmostEqual(number["mean"], self.df["number"].mean())
+        self.assertAlmostEqual(number["var"],
+                               self.df["number"].var(ddof=0))
+        self.assertEqual(number["distinct"], 20)
+        label = metadata["columns"]["label"]
+        self.assertEqual(label["distinct"], 5)
+        self.assertEqual(label["top"], [[level, 5] for level in "abcde"])
+        self.assertEqual(metadata["columns"]["count"]["top"][0][0], 0)
+        feature = Feature(name="number", type="numerical")
+        values = self.df["number"].to_numpy()
+        fitted, profiled = fit_step(feature, values), \
+            fit_step(feature, values, number)
+        self.assertAlmostEqual(fitted["mean"], profiled["mean"])
+        self.assertAlmostEqual(fitted["scale"], profiled["scale"])
+        self.assertEqual(fit_step(feature, values[:5], number)["mean"], 2.0)
+
+    def test_distinct_estimate(self):
+        """
+        Tests that the number of distinct values is estimated within a
+        few percent past the size of the sketch, and that the schema is
+        inferred from it.
+        """
+        values = np.random.default_rng(0).integers(0, 20000, size=50000)
+        csv = pd.DataFrame({"id": [f"id{value}" for value in values]}) \
+            .to_csv(index=False).encode()
+        metadata = ingest_csv(io.BytesIO(csv), self.storage,
+                              "ids.columnar", chunksize=4096)
+        distinct = metadata["columns"]["id"]["distinct"]
+        self.assertGreater(len(np.unique(values)), DISTINCT_SKETCH_SIZE)
+        self.assertLess(abs(distinct / len(np.unique(values)) - 1), 0.1)
+        self.assertEqual(metadata["schema"]["id"]["encoding"], "hashing")
@@ -0,0 +1,38 @@
+import unittest
+
+from autoop.core.ml.leaderboard import leaderboard
+from autoop.core.ml.metric import Accuracy
+from autoop.core.ml.model import CLASSIFICATION_MODELS
+from autoop.tests.fixtures import synthetic_frame, synthetic_pipeline
+
+
+class TestLeaderboard(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up a classification pipeline on a small synthetic dataset.
+        """
+        self.pipeline = synthetic_pipeline(
+            synthetic_frame(200), "decision_tree_classification",
+            ["x", "noise"], "label", [Accuracy()])
+
+    def test_leaderboard(self):
+        """
+        Tests that every classification model is ranked, best first,
+        by a metric where greater is better.
+        """
+        rows = leaderboard(self.pipeline, metric=Accuracy(), n_jobs=1)
+        self.assertEqual(sorted(row["model"] for row in rows),
+                         sorted(CLASSIFICATION_MODELS))
+        scores = [row["score"] for row in rows]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(row["status"] == "ok" for row in rows))
+        self.assertGreater(scores[0], 0.9)
+
+    def test_time_budget(self):
+        """
+        Tests that candidates are cancelled once the budget is spent.
+        """
+        rows = leaderboard(self.pipeline, n_jobs=1, time_budget=-1)
+        self.assertTrue(all(row["status"] == "cancelled" for row in rows))
+        self.assertTrue(all(row["score"] is None for row in rows))
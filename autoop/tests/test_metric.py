@@ -0,0 +1,121 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from autoop.core.ml import metric
+from autoop.core.ml.metric import (
+    BLOCK_SIZE,
+    METRICS,
+    MetricSuite,
+    confusion_matrix,
+    evaluate_many,
+    get_metric
+)
+
+
+class TestMetric(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up labels where "c" is predicted but never true and "a" is
+        true but never predicted.
+        """
+        self.y_true = np.array(["a", "a", "b", "b", "b", "d"])
+        self.y_pred = np.array(["b", "c", "b", "b", "c", "d"])
+
+    def test_confusion_matrix(self):
+        """
+        Tests the counts and label order of the confusion matrix.
+        """
+        matrix, labels = confusion_matrix(self.y_true, self.y_pred)
+        self.assertEqual(labels.tolist(), ["a", "b", "c", "d"])
+        np.testing.assert_array_equal(matrix, [[0, 1, 1, 0],
+                                               [0, 2, 1, 0],
+                                               [0, 0, 0, 0],
+                                               [0, 0, 0, 1]])
+
+    def test_classification_metrics(self):
+        """
+        Tests the metrics derived from the confusion matrix, with labels
+        that are never predicted counting as 0.
+        """
+        self.assertAlmostEqual(
+            get_metric("accuracy").evaluate(self.y_true, self.y_pred), 0.5)
+        # precision: a 0, b 2/3, d 1, weighted by support 2, 3, 1
+        self.assertAlmostEqual(
+            get_metric("weighted_precision").evaluate(self.y_true,
+                                                      self.y_pred),
+            (3 * 2 / 3 + 1) / 6)
+        # recall: a 0, b 2/3, d 1
+        self.assertAlmostEqual(
+            get_metric("weighted_recall").evaluate(self.y_true,
+                                                   self.y_pred),
+            (3 * 2 / 3 + 1) / 6)
+        with self.assertRaises(ValueError):
+            get_metric("accuracy").evaluate(self.y_true, self.y_pred[:2])
+
+    def test_regression_metrics(self):
+        """
+        Tests the chunked regression metrics against the direct formulas,
+        over several blocks and with column-shaped predictions.
+        """
+        generator = np.random.default_rng(0)
+        y_true = generator.normal(size=2 * BLOCK_SIZE + 5)
+        y_pred = (y_true + generator.normal(size=len(y_true)))[:, None]
+        residuals = y_true - y_pred.ravel()
+        results = dict((m.name, value) for m, value in evaluate_many(
+            [get_metric(name) for name in ["mean_squared_error",
+                                           "mean_absolute_error",
+                                           "root_mean_squared_error"]],
+            y_true, y_pred))
+        self.assertAlmostEqual(results["mean_squared_error"],
+                               np.mean(residuals ** 2), places=12)
+        self.assertAlmostEqual(results["mean_absolute_error"],
+                               np.mean(np.abs(residuals)), places=12)
+        self.assertAlmostEqual(results["root_mean_squared_error"],
+                               np.sqrt(np.mean(residuals ** 2)), places=12)
+
+    def test_suite_shares_confusion_matrix(self):
+        """
+        Tests that a suite computes the confusion matrix once for all its
+        classification metrics, and gives the same results as each
+        metric alone.
+        """
+        names = ["accuracy", "weighted_precision", "weighted_recall"]
+        suite = MetricSuite([get_metric(name) for name in names])
+        with mock.patch.object(metric, "confusion_matrix",
+                               wraps=confusion_matrix) as counted:
+            results = suite.evaluate(self.y_true, self.y_pred)
+        self.assertEqual(counted.call_count, 1)
+        for result_metric, value in results:
+            self.assertEqual(value, result_metric.evaluate(self.y_true,
+                                                           self.y_pred))
+
+    def test_accumulators(self):
+        """
+        Tests that accumulating chunks that straddle the blocks gives the
+        exact batch results for every metric.
+        """
+        generator = np.random.default_rng(1)
+        size = 2 * BLOCK_SIZE + 11
+        cuts = np.sort(generator.integers(0, size, 8)).tolist()
+        bounds = list(zip([0] + cuts, cuts + [size]))
+        values = generator.normal(size=size) * 1e4
+        labels = generator.integers(0, 5, size).astype(str)
+        cases = [(values, values + generator.normal(size=size)),
+                 (labels, np.roll(labels, 1))]
+        for name in METRICS:
+            y_true, y_pred = cases[get_metric(name).greater_is_better]
+            accumulator = get_metric(name).accumulator()
+            for start, stop in bounds:
+                accumulator.update(y_true[start:stop], y_pred[start:stop])
+            self.assertEqual(accumulator.result(),
+                             get_metric(name).evaluate(y_true, y_pred),
+                             name)
+        suite = MetricSuite([get_metric(name) for name in METRICS[3:]])
+        accumulator = suite.accumulator()
+        for start, stop in bounds:
+            accumulator.update(labels[start:stop], cases[1][1][start:stop])
+        self.assertEqual(accumulator.result(),
+                         suite.evaluate(labels, cases[1][1]))
@@ -61,9 +61,9 @@ class TestPipeline(unittest.TestCase):
         """
         self.pipeline._preprocess_features()
         self.pipeline._split_data()
-        self.assertEqual(self.pipeline._train_X[0].shape[0],
+        self.assertEqual(self.pipeline._train_X.shape[0],
                          int(0.8 * self.ds_size))
-        self.assertEqual(self.pipeline._test_X[0].shape[0],
+        self.assertEqual(self.pipeline._test_X.shape[0],
                          self.ds_size - int(0.8 * self.ds_size))
 
     def test_train(self):
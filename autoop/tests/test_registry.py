@@ -0,0 +1,121 @@
+import pickle
+import unittest
+import tempfile
+
+import pandas as pd
+
+from app.core.system import ArtifactRegistry
+from autoop.core.database import Database
+from autoop.core.ml.artifact import Artifact, ArtifactHandle
+from autoop.core.ml.dataset import Dataset
+from autoop.core.storage import LocalStorage
+
+
+class CountingStorage(LocalStorage):
+    """LocalStorage that records the keys whose data is loaded or mapped."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read = []
+        self.mapped = []
+
+    def load(self, key: str) -> bytes:
+        self.read.append(key)
+        return super().load(key)
+
+    def map(self, key: str):
+        self.mapped.append(key)
+        return super().map(key)
+
+
+class TestArtifactRegistry(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up a registry on temporary storage, with a tagged dataset
+        and a model.
+        """
+        self.storage = CountingStorage(tempfile.mkdtemp())
+        self.database = Database(LocalStorage(tempfile.mkdtemp()))
+        self.registry = ArtifactRegistry(self.database, self.storage)
+        self.dataset = Dataset.from_dataframe(
+            name="small", asset_path="small.csv",
+            data=pd.DataFrame({"x": [1, 2, 3]}))
+        self.dataset.tags = ["raw"]
+        self.registry.register(self.dataset)
+        self.model = Artifact(name="model", asset_path="model.pkl",
+                              version="1.0.0", data=b"weights",
+                              type="model", metadata={"task": "regression"})
+        self.registry.register(self.model)
+
+    def test_list_is_lazy(self):
+        """
+        Tests that listing the artifacts reads no payload, and that a
+        handle loads its payload once, on first access.
+        """
+        handles = self.registry.list()
+        self.assertEqual(self.storage.read, [])
+        self.assertTrue(all(isinstance(handle, ArtifactHandle)
+                            for handle in handles))
+        handle = next(handle for handle in handles if handle.type == "model")
+        self.assertEqual(handle.metadata, {"task": "regression"})
+        self.assertFalse(handle.loaded)
+        self.assertEqual(handle.data, b"weights")
+        self.assertEqual(handle.data, b"weights")
+        artifact = handle.load()
+        self.assertEqual(artifact.data, b"weights")
+        self.assertEqual(artifact.id, self.model.id)
+        self.assertEqual(self.storage.read, ["model.pkl"])
+        datasets = self.registry.list(type="dataset")
+        self.assertEqual([handle.name for handle in datasets], ["small"])
+        self.assertEqual(self.storage.read, ["model.pkl"])
+
+    def test_list_metadata(self):
+        """
+        Tests that list_metadata returns the stored entries with their
+        ids, without reading any payload.
+        """
+        listed = self.registry.list_metadata()
+        self.assertEqual(
+            listed, [{"id": id, **entry}
+                     for id, entry in self.database.list("artifacts")])
+        self.assertEqual([entry["id"] for entry in
+                          self.registry.list_metadata(type="model")],
+                         [self.model.id])
+        self.assertEqual(self.storage.read, [])
+
+    def test_map_columnar(self):
+        """
+        Tests that only columnar datasets are memory-mapped, and that a
+        handle pickles without its mapped payload and fetches it again.
+        """
+        frame = pd.DataFrame({"x": [1.0, 2.0, 3.0]})
+        columnar = Dataset.from_dataframe(name="wide", asset_path="wide.col",
+                                          data=frame, format="columnar")
+        self.registry.register(columnar)
+        handles = {handle.name: handle
+                   for handle in self.registry.list(type="dataset")}
+        self.assertEqual(handles["small"].data, self.dataset.data)
+        self.assertEqual(self.storage.read, ["small.csv"])
+        self.assertEqual(bytes(handles["wide"].data), columnar.data)
+        self.assertEqual(self.storage.mapped, ["wide.col"])
+        copy = pickle.loads(pickle.dumps(handles["wide"]))
+        self.assertFalse(copy.loaded)
+        self.assertEqual(bytes(copy.data), columnar.data)
+
+    def test_save_metadata(self):
+        """
+        Tests that saving metadata keeps the other fields of the entry,
+        and that unregistered artifacts are rejected.
+        """
+        dataset = Dataset(name="small", asset_path="small.csv",
+                          version="1.0.0", data=None,
+                          metadata={"schema": {}})
+        self.registry.save_metadata(dataset)
+        entry = self.database.get("artifacts", dataset.id)
+        self.assertEqual(entry["metadata"], {"schema": {}})
+        self.assertEqual(entry["tags"], ["raw"])
+        missing = Dataset(name="other", asset_path="other.csv",
+                          version="1.0.0", data=None)
+        with self.assertRaises(KeyError):
+            self.registry.save_metadata(missing)
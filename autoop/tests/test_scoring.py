@@ -0,0 +1,67 @@
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from autoop.core.ml.metric import (
+    MeanAbsoluteError,
+    MeanSquaredError,
+    MetricSuite,
+)
+from autoop.core.ml.scoring import BatchScorer
+from autoop.tests.fixtures import synthetic_frame, synthetic_pipeline
+
+
+class TestBatchScorer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up the inference plan of a trained regression pipeline, and
+        a CSV to score with it, with columns the plan does not read.
+        """
+        self.df = synthetic_frame(1000)
+        self.metrics = [MeanSquaredError(), MeanAbsoluteError()]
+        pipeline = synthetic_pipeline(
+            self.df, "multiple_linear_regression", ["x", "color"], "y",
+            self.metrics)
+        pipeline.execute()
+        self.plan = pipeline.inference_plan()
+        self.csv = self.df.to_csv(index=False).encode()
+
+    def test_score(self):
+        """
+        Tests that the chunks are scored in order, in this process and
+        on a pool, with the metrics of all the rows.
+        """
+        expected = self.plan.predict(self.df)
+        for n_jobs in [1, 2]:
+            output = io.BytesIO()
+            progress = []
+            summary = BatchScorer(self.plan, chunksize=64, n_jobs=n_jobs,
+                                  window=3).score(
+                io.BytesIO(self.csv), output, metrics=self.metrics,
+                target="y",
+                progress=lambda rows, rate: progress.append(rows))
+            output.seek(0)
+            predictions = pd.read_csv(output)["prediction"]
+            np.testing.assert_allclose(predictions, expected)
+            self.assertEqual(summary["num_rows"], 1000)
+            self.assertEqual(progress[-1], 1000)
+            self.assertEqual(len(progress), 16)
+            for (metric, result), (_, batch) in zip(
+                    summary["metrics"],
+                    MetricSuite(self.metrics).evaluate(self.df["y"],
+                                                       expected)):
+                self.assertAlmostEqual(result, batch)
+
+    def test_without_target(self):
+        """
+        Tests that a dataset without the target is only scored.
+        """
+        csv = self.df.drop(columns="y").to_csv(index=False).encode()
+        output = io.BytesIO()
+        summary = BatchScorer(self.plan, n_jobs=1).score(io.BytesIO(csv),
+                                                         output)
+        self.assertEqual(summary["metrics"], [])
+        self.assertEqual(summary["num_rows"], 1000)
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from autoop.core.ml.metric import MeanSquaredError
+from autoop.core.ml.search import IntUniform, Uniform, search
+from autoop.tests.fixtures import synthetic_frame, synthetic_pipeline
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up a regression pipeline on a small synthetic dataset.
+        """
+        self.pipeline = synthetic_pipeline(
+            synthetic_frame(300), "ridge_regression", ["x", "color"], "y",
+            [MeanSquaredError()])
+
+    def test_grid(self):
+        """
+        Tests that a grid search tries every combination on all rows and
+        prefers weak regularization on this linear problem.
+        """
+        result = search(self.pipeline, "ridge_regression", strategy="grid",
+                        space={"alpha": Uniform(1e-2, 1e4, log=True),
+                               "fit_intercept": [True, False]},
+                        n_jobs=1, seed=0)
+        self.assertEqual(len(result["trials"]), 10)
+        self.assertLess(result["params"]["alpha"], 10)
+        self.assertEqual(len({trial["resources"]
+                              for trial in result["trials"]}), 1)
+
+    def test_halving(self):
+        """
+        Tests that successive halving cuts the candidates by eta per round
+        while growing the rows they are fitted on.
+        """
+        result = search(self.pipeline, "ridge_regression",
+                        strategy="halving", num_candidates=9, eta=3,
+                        n_jobs=1, seed=0)
+        resources = [trial["resources"] for trial in result["trials"]]
+        self.assertEqual([resources.count(r) for r in sorted(set(resources))],
+                         [9, 3, 1])
+        self.assertIn(result["params"],
+                      [trial["params"] for trial in result["trials"]])
+        self.assertEqual(result["metrics"][0][0].name, "mean_squared_error")
+
+    def test_int_uniform(self):
+        """
+        Tests that integer ranges sample and grid integers within bounds.
+        """
+        values = IntUniform(1, 5)
+        generator = np.random.default_rng(0)
+        samples = [values.sample(generator) for _ in range(50)]
+        self.assertTrue(all(1 <= value <= 5 for value in samples))
+        self.assertEqual(values.grid(5), [1, 2, 3, 4, 5])
@@ -0,0 +1,83 @@
+import unittest
+
+import numpy as np
+
+from autoop.functional.split import (
+    holdout_split,
+    kfold_split,
+    stratified_kfold_split,
+    stratified_split
+)
+
+
+class TestSplit(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Sets up interleaved labels with unequal class sizes.
+        """
+        self.labels = np.array(["a", "b", "c", "a", "b", "a"] * 10)
+
+    def test_stratified_split(self):
+        """
+        Tests that every label keeps its proportion, that the first rows
+        of each label are used for training without a seed, and that the
+        indices partition the rows.
+        """
+        train, test = stratified_split(self.labels, 0.8)
+        for label, count in [("a", 30), ("b", 20), ("c", 10)]:
+            rows = np.flatnonzero(self.labels == label)
+            np.testing.assert_array_equal(
+                np.intersect1d(train, rows), rows[:int(0.8 * count)])
+        np.testing.assert_array_equal(np.sort(np.concatenate([train, test])),
+                                      np.arange(len(self.labels)))
+
+    def test_stratified_split_seed(self):
+        """
+        Tests that a seed shuffles reproducibly and keeps the proportions.
+        """
+        train, test = stratified_split(self.labels, 0.8, seed=3)
+        again, _ = stratified_split(self.labels, 0.8, seed=3)
+        np.testing.assert_array_equal(train, again)
+        self.assertEqual(len(test), 12)
+        self.assertEqual(np.sum(self.labels[test] == "c"), 2)
+        self.assertFalse(np.array_equal(train,
+                                        stratified_split(self.labels,
+                                                         0.8)[0]))
+
+    def test_holdout_split(self):
+        """
+        Tests the unstratified split with and without a seed.
+        """
+        train, test = holdout_split(10, 0.8)
+        np.testing.assert_array_equal(train, np.arange(8))
+        train, test = holdout_split(10, 0.8, seed=0)
+        self.assertEqual((len(train), len(test)), (8, 2))
+        self.assertEqual(len(np.union1d(train, test)), 10)
+
+    def test_kfold_split(self):
+        """
+        Tests that the test sets of the folds partition the rows into
+        blocks of nearly equal size.
+        """
+        folds = kfold_split(11, 3, seed=1)
+        tests = np.concatenate([test for _, test in folds])
+        np.testing.assert_array_equal(np.sort(tests), np.arange(11))
+        self.assertEqual(sorted(len(test) for _, test in folds), [3, 4, 4])
+        for train, test in folds:
+            self.assertEqual(len(np.intersect1d(train, test)), 0)
+        np.testing.assert_array_equal(kfold_split(4, 2)[0][1], [0, 1])
+        with self.assertRaises(ValueError):
+            kfold_split(2, 3)
+
+    def test_stratified_kfold_split(self):
+        """
+        Tests that every fold holds its share of every label.
+        """
+        folds = stratified_kfold_split(self.labels, 5, seed=2)
+        for _, test in folds:
+            counts = [np.sum(self.labels[test] == label) for label in "abc"]
+            self.assertEqual(counts, [6, 4, 2])
+        tests = np.concatenate([test for _, test in folds])
+        np.testing.assert_array_equal(np.sort(tests),
+                                      np.arange(len(self.labels)))
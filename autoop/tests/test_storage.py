@@ -1,9 +1,10 @@
 
 import unittest
 
-from autoop.core.storage import LocalStorage, NotFoundError
+from autoop.core.storage import LocalStorage, NotFoundError, SQLiteStorage
 import random
 import tempfile
+import threading
 import os
 
 
@@ -75,3 +76,65 @@ class TestStorage(unittest.TestCase):
         keys = self.storage.list("test")
         keys = [f"{os.sep}".join(key.split(f"{os.sep}")[-2:]) for key in keys]
         self.assertEqual(set(keys), set(random_keys))
+
+    def test_open_write(self):
+        """
+        Tests that streamed writes are stored once the block exits, and
+        discarded when it raises.
+        """
+        with self.storage.open_write("streamed") as stream:
+            stream.write(b"first ")
+            stream.write(b"second")
+        self.assertEqual(self.storage.load("streamed"), b"first second")
+        with self.assertRaises(RuntimeError):
+            with self.storage.open_write("failed") as stream:
+                stream.write(b"partial")
+                raise RuntimeError("interrupted")
+        with self.assertRaises(NotFoundError):
+            self.storage.load("failed")
+
+    def test_lock(self):
+        """
+        Tests that a lock excludes other holders until its block exits,
+        and that the lock itself is not listed as a key.
+        """
+        acquired = threading.Event()
+
+        def hold():
+            with self.storage.lock("journal"):
+                acquired.set()
+
+        with self.storage.lock("journal"):
+            self.storage.append(b"data", "journal")
+            holder = threading.Thread(target=hold)
+            holder.start()
+            self.assertFalse(acquired.wait(timeout=0.2))
+        holder.join()
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(self.storage.list(""), ["journal"])
+
+
+class TestSQLiteStorage(TestStorage):
+    def setUp(self):
+        """
+        Set up a SQLiteStorage object in a temporary directory.
+
+        Runs the LocalStorage tests against the SQLite backend.
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.storage = SQLiteStorage(os.path.join(temp_dir, "test.sqlite"))
+
+    def test_init(self):
+        """
+        Tests that the object created is an instance of SQLiteStorage.
+        """
+        self.assertIsInstance(self.storage, SQLiteStorage)
+
+    def test_append(self):
+        """
+        Tests that append concatenates binary data in place.
+        """
+        test_bytes = bytes(range(256))
+        self.storage.append(test_bytes, "journal")
+        self.storage.append(test_bytes, "journal")
+        self.assertEqual(self.storage.load("journal"), test_bytes * 2)